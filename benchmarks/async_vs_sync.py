@@ -0,0 +1,217 @@
+"""
+Concurrencia por worker: vistas de lectura síncronas (WSGI) vs async (ASGI).
+
+Levanta dos servidores con un solo worker cada uno:
+  - sync:  gunicorn (workers sync) + plataform_back.wsgi
+  - async: gunicorn + uvicorn_worker.UvicornWorker + plataform_back.asgi, DJANGO_ASYNC_VIEWS=True
+y mide, para cada nivel de concurrencia, requests/s y latencias p50/p95/p99
+contra los mismos endpoints con el token JWT de un estudiante.
+
+Uso (con la base y Redis de docker-compose, o los de DJANGO_SETTINGS_MODULE):
+    python -m benchmarks.async_vs_sync --concurrency 1 8 32 --duration 10
+    python -m benchmarks.async_vs_sync --sync-url http://127.0.0.1:8000 --async-url http://127.0.0.1:8001
+
+Los números solo son comparables con Postgres y Redis reales: con SQLite las
+consultas se serializan y el modo async no tiene esperas que solapar.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+ENDPOINTS = {
+    "ranking": "/api/ranking/?page_size=50",
+    "profile": "/api/students/profile/{user_id}/",
+    "student-courses": "/api/courses/student/courses/",
+    "grades": "/api/grades/?student_id={user_id}",
+}
+
+
+# ---------------------------
+# Servidores
+# ---------------------------
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, threads):
+    env = dict(os.environ)
+    command = [sys.executable, "-m", "gunicorn", "--workers", "1", "--bind", f"127.0.0.1:{port}"]
+    if mode == "async":
+        env["DJANGO_ASYNC_VIEWS"] = "True"
+        command += ["--worker-class", "uvicorn_worker.UvicornWorker", "plataform_back.asgi:application"]
+    else:
+        env["DJANGO_ASYNC_VIEWS"] = "False"
+        if threads > 1:
+            command += ["--worker-class", "gthread", "--threads", str(threads)]
+        command += ["plataform_back.wsgi:application"]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+
+# ---------------------------
+# Cliente HTTP/1.1 mínimo (keep-alive cuando el servidor lo permite)
+# ---------------------------
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed")
+    status = int(status_line.split()[1])
+    length, chunked, keep_alive = 0, False, True
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value:
+            chunked = True
+        elif name == "connection" and value == "close":
+            keep_alive = False
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def client(host, port, request, deadline, latencies, errors):
+    connection = None
+    while time.monotonic() < deadline:
+        if connection is None:
+            connection = await asyncio.open_connection(host, port)
+        reader, writer = connection
+        started = time.perf_counter()
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            connection = None
+            errors.append("connection")
+            continue
+        latencies.append(time.perf_counter() - started)
+        if status != 200:
+            errors.append(status)
+        if not keep_alive:
+            writer.close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def run_load(base_url, path, token, concurrency, duration):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    request = (
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAuthorization: Bearer {token}\r\n"
+        f"Connection: keep-alive\r\n\r\n"
+    ).encode()
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(client(host, port, request, deadline, latencies, errors) for _ in range(concurrency)))
+    return summarize(latencies, errors, duration)
+
+
+def summarize(latencies, errors, duration):
+    if not latencies:
+        return {"requests": 0, "rps": 0.0, "errors": len(errors)}
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+        "errors": len(errors),
+    }
+
+
+# ---------------------------
+# Main
+# ---------------------------
+def student_token(email=None):
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "plataform_back.settings")
+    django.setup()
+    from django.contrib.auth import get_user_model
+    from students.serializers import MyTokenObtainPairSerializer
+
+    students = get_user_model().objects.filter(role="student")
+    user = students.get(email=email) if email else students.order_by("-aura").first()
+    if user is None:
+        raise SystemExit("No students in the database (see benchmarks seed data)")
+    return str(MyTokenObtainPairSerializer.get_token(user).access_token), str(user.pk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos por medición")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS))
+    parser.add_argument("--email", help="Estudiante con el que se firma el token (por defecto, el de más aura)")
+    parser.add_argument("--sync-url", help="Servidor sync ya levantado (si no, se levanta uno)")
+    parser.add_argument("--async-url", help="Servidor async ya levantado (si no, se levanta uno)")
+    parser.add_argument("--sync-threads", type=int, default=1, help="Hilos del worker sync (gthread si > 1)")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    token, user_id = student_token(args.email)
+    processes = []
+    urls = {}
+    try:
+        for mode, url in (("sync", args.sync_url), ("async", args.async_url)):
+            if not url:
+                port = free_port()
+                processes.append(start_server(mode, port, args.sync_threads))
+                url = f"http://127.0.0.1:{port}"
+            urls[mode] = url
+
+        results = []
+        for endpoint in args.endpoints:
+            path = ENDPOINTS[endpoint].format(user_id=user_id)
+            for concurrency in args.concurrency:
+                for mode, url in urls.items():
+                    stats = asyncio.run(run_load(url, path, token, concurrency, args.duration))
+                    results.append({"endpoint": endpoint, "mode": mode, "concurrency": concurrency, **stats})
+                    if not args.json:
+                        print(
+                            f"{endpoint:16} {mode:5} c={concurrency:<4} {stats['rps']:>8} req/s  "
+                            f"p50={stats.get('p50_ms', '-')}ms p95={stats.get('p95_ms', '-')}ms "
+                            f"errors={stats['errors']}"
+                        )
+        if args.json:
+            print(json.dumps(results, indent=2))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Auditoría de planes de consulta.
+
+capture_queries() guarda el SQL (con sus parámetros) que corre dentro del
+bloque; plan_problems() le pasa EXPLAIN a cada SELECT y devuelve los pasos
+que recorren una tabla entera o que ordenan en memoria:
+
+  - PostgreSQL: nodos "Seq Scan" y "Sort" de EXPLAIN (FORMAT JSON), con
+    enable_seqscan/enable_sort apagados para que, con pocas filas, el
+    planificador igual elija un índice si existe uno que sirva
+  - SQLite: "SCAN <tabla>" sin índice y "USE TEMP B-TREE FOR ... ORDER BY"
+    de EXPLAIN QUERY PLAN
+
+Los tests de planes de cada app usan QueryPlanAssertions sobre el dataset de
+benchmarks/seed.py.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+
+SQLITE_TABLE_SCAN = re.compile(r"^SCAN (?!.*USING (COVERING )?INDEX)(?!.*VIRTUAL TABLE)(?!\(|CONSTANT ROW)")
+# También "USE TEMP B-TREE FOR RIGHT PART OF ORDER BY" (orden parcial)
+SQLITE_SORT = re.compile(r"USE TEMP B-TREE FOR .*ORDER BY")
+
+
+@contextmanager
+def capture_queries():
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        yield queries
+
+
+def explain(sql, params):
+    """Líneas del plan de sql (una por paso)."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SET enable_seqscan = off; SET enable_sort = off")
+            try:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+            finally:
+                cursor.execute("RESET enable_seqscan; RESET enable_sort")
+            return list(postgres_nodes(plan[0]["Plan"]))
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def postgres_nodes(node):
+    relation = node.get("Relation Name") or node.get("Sort Key") or ""
+    yield f"{node['Node Type']} {relation}".strip()
+    for child in node.get("Plans", ()):
+        yield from postgres_nodes(child)
+
+
+def is_problem(step):
+    if connection.vendor == "postgresql":
+        return step.startswith(("Seq Scan", "Sort"))
+    return bool(SQLITE_TABLE_SCAN.match(step) or SQLITE_SORT.search(step))
+
+
+def plan_problems(queries, allow=()):
+    """
+    [(sql, paso)] con los pasos problemáticos de los SELECT de queries.
+    allow: fragmentos de SQL cuyas consultas se aceptan tal cual (justificadas en el test).
+    """
+    problems = []
+    for sql, params in queries:
+        if not sql.lstrip().upper().startswith("SELECT") or any(fragment in sql for fragment in allow):
+            continue
+        problems += [(sql, step) for step in explain(sql, params) if is_problem(step)]
+    return problems
+
+
+class QueryPlanAssertions:
+    """Mixin para TestCase: falla si el SQL de un request recorre tablas enteras u ordena."""
+
+    def assertPlansUseIndexes(self, request, allow=()):
+        with capture_queries() as queries:
+            response = request()
+        self.assertLess(response.status_code, 400)
+        problems = plan_problems(queries, allow)
+        if problems:
+            self.fail("Query plan problems:\n" + "\n".join(f"  {step}\n    {sql}" for sql, step in problems))
+        return response
@@ -0,0 +1,286 @@
+"""
+Benchmark de los endpoints de lectura de la API, en proceso.
+
+Cada request pasa por las rutas reales de plataform_back/urls.py y todo el
+stack de middleware (django.test.Client, sin servidor ni red), firmada con
+el JWT de un estudiante o profesor del seed. Para cada endpoint y nivel de
+concurrencia (hilos) reporta requests/s, latencias p50/p95/p99 y las
+consultas SQL por request (del header Server-Timing de
+plataform_back/instrumentation.py).
+
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python -m benchmarks.seed --reset
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python -m benchmarks.run --output base.json
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python -m benchmarks.run --compare base.json
+
+Con SQLite y locmem (benchmarks/settings.py) los números sirven para
+comparar commits entre sí, no como capacidad de producción; para eso, los
+settings de docker-compose. El modo ASGI se mide con benchmarks.async_vs_sync.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from .async_vs_sync import summarize
+
+# nombre -> (rol del usuario, path); {user_id}, {other_id} y {course_id} se
+# completan con un usuario del pool y uno de sus cursos
+ENDPOINTS = {
+    "ranking": ("student", "/api/ranking/?page_size=50"),
+    "ranking-around": ("student", "/api/ranking/?around=10"),
+    "ranking-search": ("student", "/api/ranking/?search=student1"),
+    "profile": ("student", "/api/students/profile/{other_id}/"),
+    "student-courses": ("student", "/api/courses/student/courses/"),
+    "student-course-detail": ("student", "/api/courses/student/courses/{course_id}/"),
+    "grades": ("student", "/api/grades/?student_id={user_id}"),
+    "teacher-courses": ("teacher", "/api/courses/teacher/courses/"),
+    "teacher-course-detail": ("teacher", "/api/courses/teacher/courses/{course_id}/"),
+    "teacher-course-students": ("teacher", "/api/courses/teacher/courses/{course_id}/students/"),
+}
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+# ---------------------------
+# Usuarios y requests
+# ---------------------------
+def user_pool(size, seed):
+    """Por rol, una muestra de {token, user_id, other_id, course_id}."""
+    from django.contrib.auth import get_user_model
+
+    from courses.models import Course, Enrollment
+
+    User = get_user_model()
+    rng = random.Random(seed)
+    student_ids = list(User.objects.filter(role="student").values_list("id", flat=True))
+    if not student_ids:
+        raise SystemExit("No students in the database: run python -m benchmarks.seed first")
+
+    pool = {"student": [], "teacher": []}
+    course_of = dict(
+        Enrollment.objects.filter(student_id__in=rng.sample(student_ids, min(size, len(student_ids))))
+        .values_list("student_id", "course_id")
+    )
+    teacher_course = dict(Course.objects.filter(teacher__isnull=False).values_list("teacher_id", "id"))
+    users = User.objects.in_bulk([*course_of, *list(teacher_course)[:size]])
+
+    for user_id, course_id in course_of.items():
+        pool["student"].append(context(users[user_id], course_id, rng.choice(student_ids)))
+    for user_id, course_id in list(teacher_course.items())[:size]:
+        pool["teacher"].append(context(users[user_id], course_id, rng.choice(student_ids)))
+    return pool
+
+
+def context(user, course_id, other_id):
+    from students.serializers import MyTokenObtainPairSerializer
+
+    return {
+        "token": str(MyTokenObtainPairSerializer.get_token(user).access_token),
+        "user_id": user.pk,
+        "other_id": other_id,
+        "course_id": course_id,
+    }
+
+
+def build_requests(endpoint, pool, count, rng):
+    role, template = ENDPOINTS[endpoint]
+    users = pool[role]
+    if not users:
+        return []
+    return [
+        (template.format(**user), user["token"])
+        for user in (rng.choice(users) for _ in range(count))
+    ]
+
+
+# ---------------------------
+# Carga
+# ---------------------------
+def run_requests(requests, concurrency):
+    """Ejecuta requests [(path, token)] con concurrency hilos; devuelve métricas."""
+    from django.db import connections
+    from django.test import Client
+
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+    pending = iter(requests)
+
+    def send(client, path, token):
+        started = time.perf_counter()
+        response = client.get(path, HTTP_AUTHORIZATION=f"Bearer {token}")
+        elapsed = time.perf_counter() - started
+        match = QUERIES_RE.search(response.get("Server-Timing", ""))
+        with lock:
+            latencies.append(elapsed)
+            if match:
+                queries.append(int(match.group(1)))
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    def worker():
+        client = Client(raise_request_exception=False)
+        try:
+            while True:
+                with lock:
+                    request = next(pending, None)
+                if request is None:
+                    return
+                send(client, *request)
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        # En el hilo actual (así corre también dentro de un TestCase)
+        client = Client(raise_request_exception=False)
+        for path, token in requests:
+            send(client, path, token)
+    else:
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    duration = time.perf_counter() - started
+
+    stats = summarize(latencies, errors, duration)
+    stats["mean_ms"] = round(statistics.fmean(latencies) * 1000, 2) if latencies else None
+    stats["queries_p50"] = statistics.median_low(queries) if queries else None
+    stats["queries_max"] = max(queries) if queries else None
+    return stats
+
+
+def run_benchmark(endpoints, concurrency_levels, requests=200, warmup=10, users=50, seed=42, progress=None):
+    """Corre cada endpoint a cada nivel de concurrencia; devuelve una lista de resultados."""
+    rng = random.Random(seed)
+    pool = user_pool(users, seed)
+    results = []
+    for endpoint in endpoints:
+        if warmup:
+            run_requests(build_requests(endpoint, pool, warmup, rng), 1)
+        for concurrency in concurrency_levels:
+            batch = build_requests(endpoint, pool, requests, rng)
+            if not batch:
+                continue
+            result = {"endpoint": endpoint, "concurrency": concurrency, **run_requests(batch, concurrency)}
+            results.append(result)
+            if progress:
+                progress(result)
+    return results
+
+
+# ---------------------------
+# Reporte y comparación
+# ---------------------------
+def environment():
+    import django
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    from courses.models import Course, Enrollment
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "cache": settings.CACHES["default"]["BACKEND"].rsplit(".", 1)[-1],
+        "rank_index": settings.RANK_INDEX_BACKEND,
+        "dataset": {
+            "students": get_user_model().objects.filter(role="student").count(),
+            "courses": Course.objects.count(),
+            "enrollments": Enrollment.objects.count(),
+        },
+    }
+
+
+def format_result(result):
+    return (
+        f"{result['endpoint']:24} c={result['concurrency']:<3} {result['rps']:>8} req/s  "
+        f"p50={result.get('p50_ms', '-')}ms p95={result.get('p95_ms', '-')}ms "
+        f"p99={result.get('p99_ms', '-')}ms queries={result['queries_p50']}/{result['queries_max']} "
+        f"errors={result['errors']}"
+    )
+
+
+def compare(results, baseline):
+    """Líneas con la diferencia de rps, p95 y consultas contra un JSON anterior."""
+    previous = {(r["endpoint"], r["concurrency"]): r for r in baseline["results"]}
+    lines = [f"vs {baseline['environment'].get('commit') or 'baseline'}:"]
+    for result in results:
+        before = previous.get((result["endpoint"], result["concurrency"]))
+        if not before or not before.get("p95_ms") or not result.get("p95_ms"):
+            continue
+        rps = (result["rps"] - before["rps"]) / before["rps"] * 100 if before["rps"] else 0.0
+        p95 = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        queries = (result["queries_max"] or 0) - (before["queries_max"] or 0)
+        lines.append(
+            f"{result['endpoint']:24} c={result['concurrency']:<3} rps {rps:+6.1f}%  p95 {p95:+6.1f}%  "
+            f"queries {queries:+d}"
+        )
+    return lines
+
+
+# ---------------------------
+# Main
+# ---------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="Requests por endpoint y nivel de concurrencia")
+    parser.add_argument("--warmup", type=int, default=10, help="Requests previas (cachés calientes); 0 = en frío")
+    parser.add_argument("--users", type=int, default=50, help="Usuarios distintos por rol")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    parser.add_argument("--output", help="Guardar los resultados en este archivo JSON")
+    parser.add_argument("--compare", help="JSON de una corrida anterior contra el que comparar")
+    args = parser.parse_args()
+
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    django.setup()
+    from ranking.rank_index import rebuild_student_index
+
+    # Con el índice en memoria cada proceso arranca vacío
+    rebuild_student_index()
+
+    results = run_benchmark(
+        args.endpoints,
+        args.concurrency,
+        requests=args.requests,
+        warmup=args.warmup,
+        users=args.users,
+        seed=args.seed,
+        progress=None if args.json else lambda result: print(format_result(result)),
+    )
+    report = {"environment": environment(), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare) as file:
+            lines = compare(results, json.load(file))
+        print("\n".join(lines), file=sys.stderr if args.json else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
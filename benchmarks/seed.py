@@ -0,0 +1,163 @@
+"""
+Datos de prueba realistas para los benchmarks.
+
+Crea estudiantes (con aura), profesores, cursos con su estructura de
+3 módulos x 4 semanas, recursos por semana, inscripciones y notas por
+módulo. Todo se inserta con bulk_create y con una semilla fija, así que dos
+corridas con los mismos parámetros generan el mismo dataset (salvo los
+UUID de los usuarios).
+
+Los usuarios del seed usan el dominio @bench.test; --reset los borra (y en
+cascada sus cursos, inscripciones y notas) antes de volver a sembrar.
+
+    python -m benchmarks.seed --students 5000 --courses 50 --reset
+"""
+import argparse
+import os
+import random
+import time
+
+BENCH_DOMAIN = "bench.test"
+BENCH_PASSWORD = "benchmark"
+SEED_BATCH_SIZE = 2000
+
+
+def reset():
+    from django.contrib.auth import get_user_model
+
+    get_user_model().objects.filter(email__endswith=f"@{BENCH_DOMAIN}").delete()
+
+
+def seed_dataset(students=2000, teachers=20, courses=40, courses_per_student=3,
+                 resources_per_block=1, seed=42):
+    """Siembra el dataset y devuelve un dict con lo que se creó."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+
+    from courses.models import Course, CourseBlock, Enrollment, Module, Resource
+    from courses.structure import build_course_structure
+    from grades.models import ModuleGrade
+    from ranking.rank_index import rebuild_student_index
+
+    User = get_user_model()
+    rng = random.Random(seed)
+    started = time.monotonic()
+    # Mismo hash para todos: hashear miles de contraseñas no es lo que se mide
+    password = make_password(BENCH_PASSWORD)
+
+    def make_user(role, number, **extra):
+        user = User(
+            email=f"{role}{number}@{BENCH_DOMAIN}",
+            username=f"bench_{role}{number}",
+            first_name=f"{role.capitalize()}{number}",
+            last_name=rng.choice(("García", "López", "Martínez", "Rodríguez", "Pérez", "Gómez")),
+            role=role,
+            password=password,
+            **extra,
+        )
+        user.search_text = user.build_search_text()
+        return user
+
+    with transaction.atomic():
+        admin = make_user("admin", 0)
+        teacher_users = [make_user("teacher", n, verified=True) for n in range(teachers)]
+        student_users = [make_user("student", n, aura=rng.randint(0, 5000)) for n in range(students)]
+        User.objects.bulk_create([admin, *teacher_users, *student_users], batch_size=SEED_BATCH_SIZE)
+
+        levels = [level for level, _ in Course.LEVEL_CHOICES]
+        course_objs = Course.objects.bulk_create([
+            Course(
+                title=f"Curso {n}",
+                description=f"Curso de prueba {n}.",
+                level=rng.choice(levels),
+                created_by=admin,
+                teacher=teacher_users[n % teachers] if teachers else None,
+            )
+            for n in range(courses)
+        ])
+        # bulk_create no dispara post_save: la estructura se crea aquí
+        build_course_structure(course_objs)
+
+        blocks = CourseBlock.objects.filter(module__course__in=course_objs).select_related("module__course")
+        Resource.objects.bulk_create(
+            [
+                Resource(
+                    block=block,
+                    uploaded_by_id=block.module.course.teacher_id,
+                    title=f"Semana {block.week_number} - material {n}",
+                    file=f"course_resources/bench_{block.pk}_{n}.pdf",
+                    filename=f"material_{n}.pdf",
+                )
+                for block in blocks
+                if block.module.course.teacher_id
+                for n in range(resources_per_block)
+            ],
+            batch_size=SEED_BATCH_SIZE,
+        )
+
+        per_student = min(courses_per_student, len(course_objs))
+        enrollments = Enrollment.objects.bulk_create(
+            [
+                Enrollment(student=student, course=course, merit_points=rng.randint(0, 300))
+                for student in student_users
+                for course in rng.sample(course_objs, per_student)
+            ],
+            batch_size=SEED_BATCH_SIZE,
+        )
+
+        modules_by_course = {}
+        for module_id, course_id in Module.objects.filter(course__in=course_objs).values_list("id", "course_id"):
+            modules_by_course.setdefault(course_id, []).append(module_id)
+        ModuleGrade.objects.bulk_create(
+            [
+                ModuleGrade(enrollment=enrollment, module_id=module_id, grade=rng.randint(0, 5))
+                for enrollment in enrollments
+                for module_id in modules_by_course.get(enrollment.course_id, [])
+            ],
+            batch_size=SEED_BATCH_SIZE,
+        )
+
+    rebuild_student_index()
+    return {
+        "students": len(student_users),
+        "teachers": len(teacher_users),
+        "courses": len(course_objs),
+        "enrollments": len(enrollments),
+        "seconds": round(time.monotonic() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--courses-per-student", type=int, default=3)
+    parser.add_argument("--resources-per-block", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Borrar antes los datos de un seed anterior")
+    args = parser.parse_args()
+
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    django.setup()
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    if args.reset:
+        reset()
+    summary = seed_dataset(
+        students=args.students,
+        teachers=args.teachers,
+        courses=args.courses,
+        courses_per_student=args.courses_per_student,
+        resources_per_block=args.resources_per_block,
+        seed=args.seed,
+    )
+    print(", ".join(f"{key}={value}" for key, value in summary.items()))
+
+
+if __name__ == "__main__":
+    main()
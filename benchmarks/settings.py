@@ -0,0 +1,43 @@
+"""
+Settings para correr los benchmarks sin Postgres ni Redis:
+SQLite en un archivo, caché locmem e índice de ranking en memoria.
+
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python -m benchmarks.seed
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python -m benchmarks.run --json
+
+Con otros settings (p. ej. los de docker-compose) los mismos comandos miden
+contra la base y el Redis reales.
+"""
+import os
+
+from plataform_back.settings import *  # noqa: F401,F403
+from plataform_back.settings import BASE_DIR
+
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.getenv("BENCHMARK_DB", str(BASE_DIR / "benchmarks" / "bench.sqlite3")),
+        # Los hilos del runner comparten el archivo: esperar el lock en vez de fallar
+        "OPTIONS": {"timeout": 30},
+    }
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmarks",
+    }
+}
+
+RANK_INDEX_BACKEND = "memory"
+
+# El seed crea miles de usuarios con la misma contraseña: un hasher rápido
+# solo para este entorno (el login no forma parte de los endpoints medidos)
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# El runner lee el conteo de consultas del header Server-Timing
+REQUEST_METRICS_HEADER = True
+QUERY_BUDGET_STRICT = False
@@ -1,9 +1,10 @@
 from django.contrib import admin
 from django import forms
-from django.contrib.auth import get_user_model
-from .models import Course, CourseBlock, Resource, Enrollment
+from django.urls import reverse
+from django.utils.html import format_html
 
-User = get_user_model()
+from plataform_back.pagination import EstimatedCountPaginator
+from .models import Course, CourseBlock, CourseTemplate, Resource, Enrollment, StoredFile
 
 
 # ---------------------------
@@ -13,13 +14,19 @@ class CourseAdminForm(forms.ModelForm):
     class Meta:
         model = Course
         fields = '__all__'
+        labels = {'teacher': "Profesor asignado"}
 
-    # Limitar el campo teacher solo a usuarios con rol teacher
-    teacher = forms.ModelChoiceField(
-        queryset=User.objects.filter(role='teacher'),
-        required=True,
-        label="Profesor asignado"
-    )
+    # Usuario que crea el curso, lo asigna CourseAdmin.get_form en el alta
+    creator = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # El widget de autocompletado ya limita a rol teacher (limit_choices_to del modelo)
+        self.fields['teacher'].required = True
+        # created_by es de solo lectura: se asigna antes de full_clean para
+        # que Course.clean() valide el rol de quien crea el curso
+        if self.instance.pk is None and self.creator is not None:
+            self.instance.created_by = self.creator
 
 
 # ---------------------------
@@ -28,15 +35,36 @@ class CourseAdminForm(forms.ModelForm):
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     form = CourseAdminForm
-    list_display = ('title', 'teacher', 'created_by', 'duration', 'created_at')
-    list_filter = ('teacher', 'level')
+    list_display = ('title', 'teacher', 'created_by', 'duration', 'created_at', 'enrollments_link')
+    list_select_related = ('teacher', 'created_by')
+    # Solo los profesores que tienen cursos, no todos los usuarios con rol teacher
+    list_filter = (('teacher', admin.RelatedOnlyFieldListFilter), 'level')
     search_fields = ('title', 'teacher__username')
+    autocomplete_fields = ('teacher',)
+    # Lo asigna el form al crear (ver get_form)
+    readonly_fields = ('created_by',)
+
+    @admin.display(description='Enrollments')
+    def enrollments_link(self, obj):
+        # Las inscripciones de un curso se filtran por URL, sin lista de cursos en el filtro
+        url = reverse('admin:courses_enrollment_changelist')
+        return format_html('<a href="{}?course__id__exact={}">Ver</a>', url, obj.pk)
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        if obj is None:
+            # Asigna automáticamente al usuario que crea el curso
+            form = type(form.__name__, (form,), {'creator': request.user})
+        return form
 
-    def save_model(self, request, obj, form, change):
-        if not obj.pk:
-            # Asigna automáticamente al admin que crea el curso
-            obj.created_by = request.user
-        super().save_model(request, obj, form, change)
+
+# ---------------------------
+# Admin de CourseTemplate
+# ---------------------------
+@admin.register(CourseTemplate)
+class CourseTemplateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'created_at')
+    search_fields = ('name',)
 
 
 # ---------------------------
@@ -45,12 +73,16 @@ class CourseAdmin(admin.ModelAdmin):
 @admin.register(CourseBlock)
 class CourseBlockAdmin(admin.ModelAdmin):
     list_display = ('get_course_title', 'week_number', 'title')
-    list_filter = ('course',)
-    search_fields = ('title',)
+    list_filter = (('module__course', admin.RelatedOnlyFieldListFilter),)
+    search_fields = ('title', 'module__course__title')
+
+    def get_queryset(self, request):
+        # __str__ y get_course_title siguen module.course: changelist y autocompletado de Resource
+        return super().get_queryset(request).select_related('module__course')
 
     def get_course_title(self, obj):
-        return obj.course.title
-    get_course_title.admin_order_field = 'course'  # Permite ordenar por curso
+        return obj.module.course.title
+    get_course_title.admin_order_field = 'module__course'  # Permite ordenar por curso
     get_course_title.short_description = 'Course'
 
 
@@ -60,20 +92,41 @@ class CourseBlockAdmin(admin.ModelAdmin):
 @admin.register(Resource)
 class ResourceAdmin(admin.ModelAdmin):
     list_display = ('title', 'get_block_info', 'uploaded_by', 'uploaded_at')
-    list_filter = ('uploaded_by', 'block')
-    search_fields = ('title',)
+    list_select_related = ('block__module__course', 'uploaded_by')
+    list_filter = (('uploaded_by', admin.RelatedOnlyFieldListFilter),)
+    search_fields = ('title', 'block__module__course__title')
+    autocomplete_fields = ('block', 'uploaded_by')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # El archivo compartido se asigna al subir; cambiarlo aquí desajustaría ref_count
+    readonly_fields = ('blob', 'filename')
 
     def get_block_info(self, obj):
-        return f"{obj.block.course.title} - Semana {obj.block.week_number}"
+        return f"{obj.block.module.course.title} - Semana {obj.block.week_number}"
     get_block_info.admin_order_field = 'block'
     get_block_info.short_description = 'Block'
 
 
+# ---------------------------
+# Admin de StoredFile (archivos compartidos por contenido)
+# ---------------------------
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'size', 'content_type', 'ref_count', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'file', 'size', 'content_type', 'ref_count', 'created_at')
+
+
 # ---------------------------
 # Admin de Enrollment
 # ---------------------------
 @admin.register(Enrollment)
 class EnrollmentAdmin(admin.ModelAdmin):
-    list_display = ('student', 'course', 'completed', 'merit_points', 'completed_at')
-    list_filter = ('course', 'completed')
+    list_display = ('student', 'course', 'completed', 'merit_points', 'progress', 'completed_at')
+    list_select_related = ('student', 'course')
+    # Por curso: ?course__id__exact=<id> (enlace en el listado de cursos)
+    list_filter = ('completed',)
     search_fields = ('student__username', 'course__title')
+    autocomplete_fields = ('student', 'course')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,138 @@
+"""
+Caché del payload de CourseSerializer por curso.
+
+Llaves en Redis:
+  course-tree:<id>:version             → versión actual del curso
+  course-tree:<id>:<version>:<estado>:f<formato>  → payload serializado
+El estado es lo único que cambia entre usuarios: "teacher" o "w<semanas completadas>".
+
+Los signals de Course, Module, CourseBlock y Resource incrementan la versión,
+así que los payloads viejos simplemente dejan de leerse y expiran solos.
+
+Delante de Redis hay un nivel L1 en memoria del proceso con TTL corto.
+Para evitar estampidas solo quien obtiene el lock reconstruye el payload;
+el resto espera brevemente a que aparezca en Redis.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from plataform_back import metrics
+from plataform_back.instrumentation import record_cache
+
+L1_MAX_ENTRIES = 1000
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 0.05
+LOCK_RETRIES = 20
+# Subir al cambiar la forma del payload (p. ej. los serializers del árbol)
+PAYLOAD_FORMAT = 3
+
+
+class LocalCache:
+    """L1: diccionario en memoria con TTL y tamaño acotado."""
+
+    def __init__(self, max_entries=L1_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                # Descarta la entrada más antigua (los dict conservan el orden de inserción)
+                self._data.pop(next(iter(self._data)), None)
+            self._data[key] = (time.monotonic() + timeout, value)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LocalCache()
+
+
+def version_key(course_id):
+    return f"course-tree:{course_id}:version"
+
+
+def get_version(course_id):
+    key = version_key(course_id)
+    version = local_cache.get(key)
+    if version is None:
+        version = cache.get(key)
+        if version is None:
+            # Valor inicial único: si Redis pierde la llave no se reutilizan versiones viejas
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        local_cache.set(key, version, settings.COURSE_TREE_L1_TIMEOUT)
+    return version
+
+
+def invalidate_course_tree(course_id):
+    key = version_key(course_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+    local_cache.delete(key)
+
+
+def enrollment_state(enrollment):
+    if enrollment is None:
+        return "teacher"
+    return f"w{enrollment.completed_weeks}"
+
+
+def get_course_tree(course_id, state, build):
+    """Devuelve el payload cacheado o lo construye con build() (una sola vez por versión)."""
+    key = f"course-tree:{course_id}:{get_version(course_id)}:{state}:f{PAYLOAD_FORMAT}"
+
+    payload = local_cache.get(key)
+    if payload is not None:
+        metrics.incr("course_tree_cache_requests_total", result="l1_hit")
+        record_cache(hit=True)
+        return payload
+
+    payload = cache.get(key)
+    if payload is not None:
+        metrics.incr("course_tree_cache_requests_total", result="l2_hit")
+        record_cache(hit=True)
+        local_cache.set(key, payload, settings.COURSE_TREE_L1_TIMEOUT)
+        return payload
+
+    metrics.incr("course_tree_cache_requests_total", result="miss")
+    record_cache(hit=False)
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        # Otro proceso lo está construyendo: esperamos a que lo publique
+        metrics.incr("course_tree_cache_lock_waits_total")
+        for _ in range(LOCK_RETRIES):
+            time.sleep(LOCK_WAIT)
+            payload = cache.get(key)
+            if payload is not None:
+                local_cache.set(key, payload, settings.COURSE_TREE_L1_TIMEOUT)
+                return payload
+        return build()
+
+    try:
+        payload = build()
+        cache.set(key, payload, settings.COURSE_TREE_CACHE_TIMEOUT)
+        local_cache.set(key, payload, settings.COURSE_TREE_L1_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    return payload
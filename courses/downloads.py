@@ -0,0 +1,167 @@
+"""
+Descarga protegida de recursos.
+
+La vista valida el acceso y delega la transferencia según RESOURCE_DOWNLOAD_BACKEND:
+  - "nginx":    X-Accel-Redirect a una location internal (RESOURCE_ACCEL_PREFIX)
+  - "sendfile": X-Sendfile con la ruta absoluta (Apache mod_xsendfile, lighttpd)
+  - "local":    FileResponse servido por Django, con soporte de Range
+
+En modo local el archivo se entrega a wsgi.file_wrapper con su fileno, así
+gunicorn usa os.sendfile (copia cero) también para respuestas parciales.
+"""
+import mimetypes
+import os
+import re
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import parse_etags, parse_http_date_safe
+
+from plataform_back.conditional import make_etag, not_modified, with_validators
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFile:
+    """
+    Vista de solo lectura de [start, start + length) de un archivo.
+    Expone fileno() para que el servidor use sendfile: gunicorn arranca en
+    la posición actual del descriptor y envía Content-Length bytes.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Devuelve (inicio, fin) inclusivo para un único rango, None si no hay
+    rango utilizable (se sirve completo) o "unsatisfiable" para un 416.
+    Los rangos múltiples se ignoran y se sirve el archivo completo.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: los últimos N bytes
+        length = int(last)
+        if length == 0:
+            return "unsatisfiable"
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, end
+
+
+def resource_validators(resource, stat):
+    # El hash del contenido es un validador fuerte; los archivos legados usan mtime + tamaño
+    if resource.blob_id:
+        etag = f'"{resource.blob.sha256}"'
+    else:
+        etag = make_etag(resource.file.name, stat.st_mtime_ns, stat.st_size)
+    return etag, datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return etag in parse_etags(if_range) and not etag.startswith("W/")
+    since = parse_http_date_safe(if_range)
+    return since is not None and last_modified.timestamp() <= since
+
+
+def content_disposition(filename):
+    return f"inline; filename*=UTF-8''{quote(filename)}"
+
+
+def resource_filename(resource):
+    return resource.filename or os.path.basename(resource.file.name)
+
+
+def resource_content_type(resource):
+    if resource.blob_id and resource.blob.content_type:
+        return resource.blob.content_type
+    return mimetypes.guess_type(resource_filename(resource))[0] or "application/octet-stream"
+
+
+def offloaded_response(resource, header, value):
+    # El servidor web maneja Range, sendfile y Content-Length
+    response = HttpResponse(content_type=resource_content_type(resource))
+    response[header] = value
+    response["Content-Disposition"] = content_disposition(resource_filename(resource))
+    return response
+
+
+def serve_resource(request, resource):
+    backend = settings.RESOURCE_DOWNLOAD_BACKEND
+    if backend == "nginx":
+        prefix = settings.RESOURCE_ACCEL_PREFIX.rstrip("/")
+        return offloaded_response(resource, "X-Accel-Redirect", f"{prefix}/{quote(resource.file.name)}")
+    if backend == "sendfile":
+        return offloaded_response(resource, "X-Sendfile", resource.file.path)
+    return serve_local(request, resource)
+
+
+def serve_local(request, resource):
+    path = resource.file.path
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    etag, last_modified = resource_validators(resource, stat)
+    cached = not_modified(request, etag=etag, last_modified=last_modified)
+    if cached is not None:
+        return cached
+
+    size = stat.st_size
+    byte_range = None
+    if if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.headers.get("Range"), size)
+
+    if byte_range == "unsatisfiable":
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    file = open(path, "rb")
+    if byte_range is None:
+        response = FileResponse(file, content_type=resource_content_type(resource))
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(RangeFile(file, start, length), content_type=resource_content_type(resource))
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(length)
+
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = content_disposition(resource_filename(resource))
+    return with_validators(response, etag, last_modified)
@@ -0,0 +1,150 @@
+"""
+Importación masiva de inscripciones desde un CSV de pares (email, course_id).
+
+El archivo se lee en streaming y se procesa por lotes: cada lote resuelve los
+emails en una consulta, inserta las inscripciones nuevas con bulk_create y
+crea las notas en 0 de sus módulos (bulk_create no dispara post_save). Cada
+lote va en su propia transacción, así que repetir la importación tras un
+corte solo agrega lo que falta.
+"""
+import csv
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from grades.models import ModuleGrade
+from ranking.rank_index import invalidate_course_indexes
+from .models import Course, Enrollment
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.existing = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.unknown_students = 0
+        self.unknown_courses = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def error(self, line, message):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "existing": self.existing,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "unknown_students": self.unknown_students,
+            "unknown_courses": self.unknown_courses,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "errors": self.errors,
+        }
+
+
+def read_pairs(lines, report):
+    """Genera (línea, email, course_id) a partir de un CSV; ignora una cabecera."""
+    for line, row in enumerate(csv.reader(lines), start=1):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if line == 1 and "@" not in row[0]:
+            continue
+        report.rows += 1
+        try:
+            email, course_id = row[0].strip(), int(row[1])
+        except (IndexError, ValueError):
+            report.invalid += 1
+            report.error(line, "Expected: email,course_id")
+            continue
+        yield line, email, course_id
+
+
+def import_batch(batch, course_ids, report):
+    User = get_user_model()
+    students = dict(
+        User.objects.filter(role="student", email__in={email for _, email, _ in batch}).values_list("email", "id")
+    )
+
+    pairs = {}
+    for line, email, course_id in batch:
+        student_id = students.get(email)
+        if student_id is None:
+            report.unknown_students += 1
+            report.error(line, f"Unknown student: {email}")
+        elif course_id not in course_ids:
+            report.unknown_courses += 1
+            report.error(line, f"Unknown course: {course_id}")
+        elif (student_id, course_id) in pairs:
+            report.duplicates += 1
+        else:
+            pairs[(student_id, course_id)] = line
+    if not pairs:
+        return
+
+    student_ids = {student_id for student_id, _ in pairs}
+    batch_course_ids = {course_id for _, course_id in pairs}
+    candidates = Enrollment.objects.filter(student_id__in=student_ids, course_id__in=batch_course_ids)
+
+    with transaction.atomic():
+        existing = {
+            pair for pair in candidates.values_list("student_id", "course_id") if pair in pairs
+        }
+        new_pairs = [pair for pair in pairs if pair not in existing]
+        Enrollment.objects.bulk_create(
+            [Enrollment(student_id=student_id, course_id=course_id) for student_id, course_id in new_pairs],
+            batch_size=IMPORT_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        # ignore_conflicts no devuelve pk: se releen para crear las notas en 0
+        created = [
+            enrollment
+            for enrollment in candidates.only("id", "student_id", "course_id")
+            if (enrollment.student_id, enrollment.course_id) in pairs
+            and (enrollment.student_id, enrollment.course_id) not in existing
+        ]
+        ModuleGrade.objects.create_missing(created)
+        # bulk_create no dispara post_save: los leaderboards se reconstruyen al leerlos
+        transaction.on_commit(lambda: invalidate_course_indexes(batch_course_ids))
+
+    report.existing += len(existing)
+    report.created += len(new_pairs)
+
+
+def import_enrollments(lines, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Importa inscripciones desde un iterable de líneas CSV. Devuelve un
+    ImportReport; progress(report) se llama después de cada lote.
+    """
+    report = ImportReport()
+    course_ids = set(Course.objects.values_list("id", flat=True))
+    batch = []
+    for item in read_pairs(lines, report):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            import_batch(batch, course_ids, report)
+            batch = []
+            if progress:
+                progress(report)
+    if batch:
+        import_batch(batch, course_ids, report)
+        if progress:
+            progress(report)
+    return report
@@ -0,0 +1,42 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import Course, CourseTemplate
+from courses.structure import apply_template
+
+
+class Command(BaseCommand):
+    help = "Aplica una plantilla de módulos/semanas a varios cursos en una sola operación."
+
+    def add_arguments(self, parser):
+        parser.add_argument("template", help="Nombre de la plantilla")
+        parser.add_argument("course_ids", nargs="*", type=int, help="IDs de los cursos (vacío = todos)")
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Reemplaza la estructura existente (borra módulos, semanas y recursos)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Con --replace, permite cursos con inscripciones: BORRA sus notas por módulo "
+                 "y las semanas completadas, y reinicia el avance de los estudiantes",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            template = CourseTemplate.objects.get(name=options["template"])
+        except CourseTemplate.DoesNotExist:
+            raise CommandError(f"No existe la plantilla '{options['template']}'")
+
+        courses = Course.objects.all()
+        if options["course_ids"]:
+            courses = courses.filter(pk__in=options["course_ids"])
+
+        try:
+            applied = apply_template(
+                template, courses.only("pk"), replace=options["replace"], force=options["force"]
+            )
+        except ValidationError as exc:
+            raise CommandError(" ".join(exc.messages) + " Usa --force para reemplazarla igual.")
+        self.stdout.write(self.style.SUCCESS(f"Plantilla '{template.name}' aplicada a {len(applied)} cursos"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from courses.uploads import expire_uploads, purge_blobs
+
+
+class Command(BaseCommand):
+    help = "Borra subidas abandonadas y archivos sin recursos que los referencien."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=None, help="Antigüedad mínima de una subida abandonada")
+
+    def handle(self, *args, **options):
+        expired = expire_uploads(options["hours"])
+        purged = purge_blobs()
+        self.stdout.write(f"{expired} subidas abandonadas, {purged} archivos sin referencias borrados")
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.imports import IMPORT_BATCH_SIZE, import_enrollments
+
+
+class Command(BaseCommand):
+    help = "Importa inscripciones desde un CSV (email,course_id) en lotes. Usa '-' para leer de stdin."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        def progress(report):
+            self.stderr.write(
+                f"{report.rows} filas, {report.created} creadas, {report.rows_per_second:.0f} filas/s"
+            )
+
+        path = options["csv_path"]
+        try:
+            lines = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8-sig")
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with lines:
+            report = import_enrollments(lines, options["batch_size"], progress)
+
+        summary = report.as_dict()
+        for error in summary.pop("errors"):
+            self.stderr.write(f"línea {error['line']}: {error['error']}")
+        self.stdout.write(", ".join(f"{key}={value}" for key, value in summary.items()))
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_blocks_to_modules(apps, schema_editor):
+    # Las semanas existentes pasan a los 3 módulos por defecto (1-4, 5-8, 9-12)
+    Module = apps.get_model("courses", "Module")
+    CourseBlock = apps.get_model("courses", "CourseBlock")
+    course_ids = CourseBlock.objects.order_by().values_list("course_id", flat=True).distinct()
+    for course_id in course_ids:
+        modules = {
+            number: Module.objects.create(
+                course_id=course_id,
+                number=number,
+                title=f"Módulo {number}",
+                description=f"Contenido del módulo {number}.",
+            )
+            for number in (1, 2, 3)
+        }
+        blocks = list(CourseBlock.objects.filter(course_id=course_id))
+        for block in blocks:
+            block.module = modules[min(max((block.week_number - 1) // 4 + 1, 1), 3)]
+        CourseBlock.objects.bulk_update(blocks, ["module"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_course_teacher'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Module',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='modules', to='courses.course')),
+            ],
+            options={
+                'ordering': ['number'],
+                'unique_together': {('course', 'number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='courseblock',
+            name='module',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='blocks', to='courses.module'),
+        ),
+        migrations.RunPython(move_blocks_to_modules, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='courseblock',
+            unique_together=set(),
+        ),
+        migrations.RemoveField(
+            model_name='courseblock',
+            name='course',
+        ),
+        migrations.AlterField(
+            model_name='courseblock',
+            name='module',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocks', to='courses.module'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='courseblock',
+            unique_together={('module', 'week_number')},
+        ),
+    ]
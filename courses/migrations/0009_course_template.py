@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_module_courseblock_module'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('layout', models.JSONField(help_text='Lista de módulos: [{"title": "...", "weeks": [1, 2, 3, 4]}, ...]')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='courses', to='courses.coursetemplate'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_block_completion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', '-merit_points', 'student'], name='enrollment_course_merit_idx'),
+        ),
+    ]
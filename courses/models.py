@@ -1,12 +1,38 @@
+import threading
+import uuid
+import weakref
+
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidate_course_tree
 
 User = settings.AUTH_USER_MODEL
 
 
+class CourseTemplate(models.Model):
+    """
+    Estructura reutilizable de módulos y semanas.
+    layout: [{"title": "Módulo 1", "weeks": [1, 2, 3, 4]}, ...]
+    """
+    name = models.CharField(max_length=100, unique=True)
+    description = models.TextField(blank=True)
+    layout = models.JSONField(help_text='Lista de módulos: [{"title": "...", "weeks": [1, 2, 3, 4]}, ...]')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def clean(self):
+        from .structure import validate_layout
+        validate_layout(self.layout)
+
+    def __str__(self):
+        return self.name
+
+
 class Course(models.Model):
     LEVEL_CHOICES = [
         ("beginner", "Beginner"),
@@ -34,6 +60,14 @@ class Course(models.Model):
         limit_choices_to={"role": "teacher"},
         related_name="courses_teaching",
     )
+    # Plantilla usada para generar módulos y semanas (None = estructura por defecto)
+    template = models.ForeignKey(
+        CourseTemplate,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="courses",
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -78,6 +112,23 @@ class CourseBlock(models.Model):
         return f"{self.module.course.title} - Módulo {self.module.number} - Semana {self.week_number}: {self.title}"
 
 
+class StoredFile(models.Model):
+    """
+    Contenido de un archivo guardado una sola vez, identificado por su SHA-256.
+    Varios Resource pueden apuntar al mismo; ref_count lleva la cuenta y el
+    archivo se borra cuando llega a 0 (ver courses/uploads.py).
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to="blobs/", max_length=255)
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)"
+
+
 class Resource(models.Model):
     block = models.ForeignKey(
         CourseBlock, on_delete=models.CASCADE, related_name="resources"
@@ -89,13 +140,43 @@ class Resource(models.Model):
         limit_choices_to={"role": "teacher"},
     )
     title = models.CharField(max_length=200)
-    file = models.FileField(upload_to="course_resources/")
+    # Con blob, file apunta al archivo compartido (blobs/...); sin blob es un archivo legado
+    file = models.FileField(upload_to="course_resources/", max_length=255)
+    blob = models.ForeignKey(
+        StoredFile,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="resources",
+    )
+    filename = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.block} - {self.title}"
 
 
+class UploadSession(models.Model):
+    """
+    Subida por partes de un recurso. Los bytes se escriben en un archivo
+    temporal (RESOURCE_UPLOAD_DIR) hasta que offset == size.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    block = models.ForeignKey(CourseBlock, on_delete=models.CASCADE, related_name="upload_sessions")
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    title = models.CharField(max_length=200)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    # Hash esperado (opcional), se verifica al terminar
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
 class Enrollment(models.Model):
     student = models.ForeignKey(
         User,
@@ -106,37 +187,145 @@ class Enrollment(models.Model):
     completed = models.BooleanField(default=False)
     merit_points = models.IntegerField(default=0)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Contadores desnormalizados de BlockCompletion (courses/progress.py):
+    # semanas completadas en orden y porcentaje del curso
+    completed_weeks = models.PositiveSmallIntegerField(default=0)
+    progress = models.PositiveSmallIntegerField(default=0)
+    # Validador para GET condicional; los UPDATE masivos deben fijarlo también
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("student", "course")
+        indexes = [
+            # Leaderboard por curso (reconstrucción del índice y consulta de respaldo)
+            models.Index(fields=["course", "-merit_points", "student"], name="enrollment_course_merit_idx"),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.course.title}"
 
 
+class BlockCompletion(models.Model):
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name="block_completions")
+    block = models.ForeignKey(CourseBlock, on_delete=models.CASCADE, related_name="completions")
+    completed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("enrollment", "block")
+
+    def __str__(self):
+        return f"{self.enrollment} - Semana {self.block.week_number}"
+
+
 # ---------------------------
 # Signals
 # ---------------------------
 @receiver(post_save, sender=Course)
 def create_course_structure(sender, instance, created, **kwargs):
     if created:
-        modules = [
-            (1, range(1, 5)),   # semanas 1-4
-            (2, range(5, 9)),   # semanas 5-8
-            (3, range(9, 13)),  # semanas 9-12
-        ]
+        from .structure import build_course_structure
+        build_course_structure([instance])
+
+
+# CourseChanges ya registrado en on_commit por la transacción en curso de este
+# hilo. Es una referencia débil: si la transacción (o el savepoint en el que se
+# registró) se revierte, Django descarta el callback, el objeto se libera y el
+# próximo cambio registra uno nuevo.
+_pending = threading.local()
+
+
+class CourseChanges:
+    """
+    Cursos modificados en la transacción actual. Se registra un solo
+    on_commit por transacción, así un borrado en cascada de cientos de
+    semanas o recursos toca e invalida cada curso una sola vez.
+    """
+
+    def __init__(self):
+        self.touched = set()
+        self.course_ids = set()
+        # Cursos con semanas agregadas o borradas: cambia el porcentaje de avance
+        self.resized = set()
+
+    def __call__(self):
+        if current_course_changes() is self:
+            del _pending.changes
+        if self.resized:
+            from .progress import refresh_progress
+            refresh_progress(self.resized)
+        for course_id in self.course_ids:
+            invalidate_course_tree(course_id)
+
+
+def current_course_changes():
+    ref = getattr(_pending, "changes", None)
+    return ref() if ref is not None else None
+
+
+def pending_course_changes():
+    """CourseChanges de la transacción actual (lo registra en on_commit la primera vez)."""
+    changes = current_course_changes()
+    if changes is None:
+        changes = CourseChanges()
+        transaction.on_commit(changes)
+        _pending.changes = weakref.ref(changes)
+    return changes
+
+
+def invalidate_on_commit(course_id, touch=True, resized=False):
+    if not course_id:
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        changes = CourseChanges()
+    else:
+        changes = pending_course_changes()
+    # Los cambios en módulos/semanas/recursos también mueven Course.updated_at (Last-Modified)
+    if touch and course_id not in changes.touched:
+        Course.objects.filter(pk=course_id).update(updated_at=timezone.now())
+        changes.touched.add(course_id)
+    changes.course_ids.add(course_id)
+    if resized:
+        changes.resized.add(course_id)
+    if not connection.in_atomic_block:
+        changes()
+
+
+@receiver([post_save, post_delete], sender=Course)
+def invalidate_course(sender, instance, **kwargs):
+    invalidate_on_commit(instance.pk, touch=False)
+
+
+@receiver([post_save, post_delete], sender=Module)
+def invalidate_module(sender, instance, **kwargs):
+    invalidate_on_commit(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=CourseBlock)
+def invalidate_block(sender, instance, created=True, **kwargs):
+    # created no viene en post_delete: un borrado también cambia la cantidad de semanas
+    course_id = Module.objects.filter(pk=instance.module_id).values_list("course_id", flat=True).first()
+    invalidate_on_commit(course_id, resized=created)
+
+
+@receiver([post_save, post_delete], sender=Resource)
+def invalidate_resource(sender, instance, **kwargs):
+    course_id = (
+        CourseBlock.objects.filter(pk=instance.block_id)
+        .values_list("module__course_id", flat=True)
+        .first()
+    )
+    invalidate_on_commit(course_id)
+
+
+@receiver(post_save, sender=Resource)
+def retain_resource_blob(sender, instance, created, **kwargs):
+    if created and instance.blob_id:
+        StoredFile.objects.filter(pk=instance.blob_id).update(ref_count=models.F("ref_count") + 1)
+
 
-        for number, weeks in modules:
-            module = Module.objects.create(
-                course=instance,
-                number=number,
-                title=f"Módulo {number}",
-                description=f"Contenido del módulo {number}.",
-            )
-            for week in weeks:
-                CourseBlock.objects.create(
-                    module=module,
-                    week_number=week,
-                    title=f"Semana {week}",
-                    description=f"Contenido de la semana {week}.",
-                )
+@receiver(post_delete, sender=Resource)
+def release_resource_blob(sender, instance, **kwargs):
+    if instance.blob_id:
+        from .uploads import release_blob
+        release_blob(instance.blob_id)
@@ -0,0 +1,89 @@
+"""
+Avance de los estudiantes por semana.
+
+Cada semana completada es una fila de BlockCompletion y además incrementa
+Enrollment.completed_weeks con un UPDATE atómico (F() + 1), que también fija
+Enrollment.progress (porcentaje del curso). Así el listado y el detalle de
+cursos leen el avance directamente de la inscripción, sin contar semanas.
+
+Las semanas se completan en orden: el UPDATE solo aplica si completed_weeks
+sigue siendo la posición anterior a la semana, de modo que dos requests
+simultáneas no pueden contar la misma semana dos veces.
+
+Si cambia la cantidad de semanas de un curso (alta o baja de una semana),
+refresh_progress recalcula el porcentaje de sus inscripciones.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .models import BlockCompletion, CourseBlock, Enrollment
+
+
+class BlockLocked(Exception):
+    pass
+
+
+def block_position(block):
+    """(posición 1..n de la semana en su curso por número de semana, total de semanas)."""
+    counts = CourseBlock.objects.filter(module__course_id=block.module.course_id).aggregate(
+        position=Count("id", filter=Q(week_number__lte=block.week_number)),
+        total=Count("id"),
+    )
+    return counts["position"], counts["total"]
+
+
+def progress_for(completed_weeks, total_weeks):
+    if not total_weeks:
+        return 0
+    return min(100, completed_weeks * 100 // total_weeks)
+
+
+def complete_block(enrollment, block):
+    """
+    Marca block como completado para enrollment. Devuelve True si se
+    completó ahora y False si ya lo estaba; BlockLocked si faltan semanas previas.
+    """
+    position, total = block_position(block)
+
+    with transaction.atomic():
+        updated = Enrollment.objects.filter(pk=enrollment.pk, completed_weeks=position - 1).update(
+            completed_weeks=F("completed_weeks") + 1,
+            progress=progress_for(position, total),
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            current = Enrollment.objects.values_list("completed_weeks", flat=True).get(pk=enrollment.pk)
+            if current >= position:
+                return False
+            raise BlockLocked("Previous weeks must be completed first")
+        # La fila puede existir si un admin reinició completed_weeks
+        BlockCompletion.objects.bulk_create(
+            [BlockCompletion(enrollment=enrollment, block=block)], ignore_conflicts=True
+        )
+
+    enrollment.refresh_from_db(fields=["completed_weeks", "progress", "updated_at"])
+    return True
+
+
+def refresh_progress(course_ids):
+    """Recalcula Enrollment.progress en los cursos dados: un UPDATE por curso, solo filas que cambian."""
+    totals = dict(
+        CourseBlock.objects.filter(module__course_id__in=course_ids)
+        .values("module__course_id")
+        .annotate(total=Count("id"))
+        .values_list("module__course_id", "total")
+    )
+    for course_id in course_ids:
+        total = totals.get(course_id, 0)
+        if total:
+            progress = Case(
+                When(completed_weeks__gte=total, then=Value(100)),
+                default=F("completed_weeks") * 100 / total,
+                output_field=IntegerField(),
+            )
+        else:
+            progress = Value(0)
+        Enrollment.objects.filter(course_id=course_id).exclude(progress=progress).update(
+            progress=progress, updated_at=timezone.now()
+        )
@@ -1,14 +1,21 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Course, CourseBlock, Resource, Enrollment
+from .models import Course, CourseBlock, Module, Resource
 
 # -----------------------
 # 🔹 Resource Serializer
 # -----------------------
 class ResourceSerializer(serializers.ModelSerializer):
+    # URL de descarga protegida (valida inscripción o profesor), no la ruta en MEDIA_ROOT
+    file = serializers.SerializerMethodField()
+
     class Meta:
         model = Resource
         fields = ["id", "title", "file", "uploaded_at"]
 
+    def get_file(self, resource):
+        return reverse("resource-download", args=[resource.pk])
+
 
 # -----------------------
 # 🔹 CourseBlock Serializer
@@ -16,44 +23,59 @@ class ResourceSerializer(serializers.ModelSerializer):
 # -----------------------
 class CourseBlockSerializer(serializers.ModelSerializer):
     resources = ResourceSerializer(many=True, read_only=True)
+    module = serializers.IntegerField(source="module.number", read_only=True)
     status = serializers.SerializerMethodField()
 
     class Meta:
         model = CourseBlock
-        fields = ["week_number", "title", "description", "resources", "status"]
+        fields = ["week_number", "module", "title", "description", "resources", "status"]
 
     def get_status(self, block):
-        # Obtenemos al estudiante desde el contexto
-        student = self.context.get("student")
-        if not student:
-            return "locked"
-
-        # Obtenemos la inscripción del estudiante en el curso
-        enrollment = Enrollment.objects.filter(student=student, course=block.course).first()
+        # La inscripción viene precargada en el contexto (ver courses/tree.py)
+        enrollment = self.context.get("enrollment")
         if not enrollment:
             return "locked"
 
-        # Contamos las semanas completadas (puedes almacenar completed_weeks en el modelo Enrollment)
-        completed_weeks = getattr(enrollment, "completed_weeks", 0)
+        # completed_weeks cuenta semanas en orden (courses/progress.py): se
+        # compara con la posición de la semana, no con su número
+        completed_weeks = enrollment.completed_weeks
+        position = getattr(block, "position", block.week_number)
 
-        if block.week_number <= completed_weeks:
+        if position <= completed_weeks:
             return "completed"
-        elif block.week_number == completed_weeks + 1:
+        elif position == completed_weeks + 1:
             return "current"
         else:
             return "locked"
 
 
+# -----------------------
+# 🔹 Module Serializer
+# -----------------------
+class ModuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Module
+        fields = ["id", "number", "title", "description"]
+
+
 # -----------------------
 # 🔹 Course Serializer
+# Espera el árbol precargado (courses/tree.py) para no hacer consultas por semana
 # -----------------------
 class CourseSerializer(serializers.ModelSerializer):
-    blocks = CourseBlockSerializer(many=True, read_only=True)
+    modules = ModuleSerializer(many=True, read_only=True)
+    blocks = serializers.SerializerMethodField()
     teacher_name = serializers.CharField(source='teacher.username', read_only=True)  # 👈 nombre del profesor
 
     class Meta:
         model = Course
-        fields = ["id", "title", "description", "duration", "level", "blocks", "teacher_name"]
+        fields = ["id", "title", "description", "duration", "level", "modules", "blocks", "teacher_name"]
+
+    def get_blocks(self, course):
+        blocks = [block for module in course.modules.all() for block in module.blocks.all()]
+        for position, block in enumerate(sorted(blocks, key=lambda b: b.week_number), start=1):
+            block.position = position
+        return CourseBlockSerializer(blocks, many=True, context=self.context).data
 
 
 # -----------------------
@@ -67,3 +89,15 @@ class CourseCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = ["id", "title", "description", "duration", "level"]
+
+
+# -----------------------
+# 🔹 Merit Points Row Serializer (Teacher)
+# -----------------------
+class MeritPointsRowSerializer(serializers.Serializer):
+    """
+    Fila de TeacherAddPointsView. delta debe ser entero: 5, "5" o 5.0 sirven;
+    5.5, "5.5" o true no (int() los truncaría en silencio).
+    """
+    student_id = serializers.UUIDField()
+    delta = serializers.IntegerField()
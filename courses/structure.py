@@ -0,0 +1,132 @@
+"""
+Creación de la estructura de cursos (módulos + semanas) con inserciones masivas.
+
+Cada módulo se crea con un solo bulk_create para todos los cursos y lo mismo
+para las semanas, así que crear la estructura cuesta 2 consultas sin importar
+cuántos cursos se procesen.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_course_tree
+from .models import Course, CourseBlock, Enrollment, Module
+
+# Estructura por defecto: 3 módulos de 4 semanas
+DEFAULT_LAYOUT = [
+    {"weeks": [1, 2, 3, 4]},    # semanas 1-4
+    {"weeks": [5, 6, 7, 8]},    # semanas 5-8
+    {"weeks": [9, 10, 11, 12]},  # semanas 9-12
+]
+MAX_WEEK = 12
+
+
+def validate_layout(layout):
+    if not isinstance(layout, list) or not layout:
+        raise ValidationError("La plantilla debe tener al menos un módulo.")
+    seen = set()
+    for module in layout:
+        weeks = module.get("weeks") if isinstance(module, dict) else None
+        if not isinstance(weeks, list) or not weeks:
+            raise ValidationError("Cada módulo debe tener una lista de semanas.")
+        for week in weeks:
+            if not isinstance(week, int) or week < 1 or week > MAX_WEEK:
+                raise ValidationError(f"El número de semana debe estar entre 1 y {MAX_WEEK}.")
+            if week in seen:
+                raise ValidationError(f"La semana {week} está repetida.")
+            seen.add(week)
+
+
+def get_layout(course):
+    if course.template_id:
+        return course.template.layout
+    return DEFAULT_LAYOUT
+
+
+def build_course_structure(courses, layout=None):
+    """
+    Crea módulos y semanas para los cursos dados en 2 INSERTs.
+    Si no se pasa layout, cada curso usa el de su plantilla o el por defecto.
+    """
+    courses = list(courses)
+    modules = []
+    module_weeks = []
+    for course in courses:
+        for number, spec in enumerate(layout or get_layout(course), start=1):
+            modules.append(Module(
+                course=course,
+                number=number,
+                title=spec.get("title") or f"Módulo {number}",
+                description=spec.get("description") or f"Contenido del módulo {number}.",
+            ))
+            module_weeks.append(spec["weeks"])
+
+    with transaction.atomic():
+        Module.objects.bulk_create(modules)
+        CourseBlock.objects.bulk_create([
+            CourseBlock(
+                module=module,
+                week_number=week,
+                title=f"Semana {week}",
+                description=f"Contenido de la semana {week}.",
+            )
+            for module, weeks in zip(modules, module_weeks)
+            for week in weeks
+        ])
+    return modules
+
+
+def bulk_create_courses(courses, template=None):
+    """
+    Importa muchos cursos de una vez: un INSERT para los cursos y 2 para su
+    estructura. bulk_create no dispara post_save, por eso se arma aquí.
+    """
+    with transaction.atomic():
+        if template:
+            for course in courses:
+                course.template = template
+        courses = Course.objects.bulk_create(courses)
+        build_course_structure(courses, layout=template.layout if template else None)
+    return courses
+
+
+def apply_template(template, courses, replace=False, force=False):
+    """
+    Estampa una plantilla en varios cursos en una sola operación.
+    Sin replace solo se aplica a cursos que todavía no tienen módulos.
+
+    Con replace=True borra la estructura existente y, en cascada, sus
+    recursos, las notas por módulo (grades.ModuleGrade) y las semanas
+    completadas (BlockCompletion). Por eso rechaza (ValidationError) los
+    cursos con inscripciones salvo con force=True, que además reinicia el
+    avance de esas inscripciones y les crea las notas en 0 de los módulos nuevos.
+    """
+    validate_layout(template.layout)
+    course_ids = [course.pk for course in courses]
+    with transaction.atomic():
+        if replace:
+            enrolled = Enrollment.objects.filter(course_id__in=course_ids)
+            if not force:
+                blocked = sorted(set(enrolled.values_list("course_id", flat=True)))
+                if blocked:
+                    raise ValidationError(
+                        "Reemplazar la estructura borra las notas y el avance de los estudiantes; "
+                        f"cursos con inscripciones: {', '.join(map(str, blocked))}."
+                    )
+            Module.objects.filter(course_id__in=course_ids).delete()
+            enrolled.update(completed_weeks=0, progress=0, updated_at=timezone.now())
+        else:
+            with_modules = Module.objects.filter(course_id__in=course_ids).values("course_id")
+            course_ids = list(
+                Course.objects.filter(pk__in=course_ids).exclude(pk__in=with_modules).values_list("pk", flat=True)
+            )
+        Course.objects.filter(pk__in=course_ids).update(template=template, updated_at=timezone.now())
+        targets = [Course(pk=pk) for pk in course_ids]
+        build_course_structure(targets, layout=template.layout)
+        if replace:
+            from grades.models import ModuleGrade
+            ModuleGrade.objects.create_missing(Enrollment.objects.filter(course_id__in=course_ids))
+        # bulk_create no dispara signals: invalidamos la caché a mano
+        for course_id in course_ids:
+            transaction.on_commit(lambda course_id=course_id: invalidate_course_tree(course_id))
+    return course_ids
@@ -1,3 +1,1314 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import SyncToAsync, async_to_sync, iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import AsyncClient, AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from benchmarks.explain import QueryPlanAssertions, capture_queries
+from benchmarks.seed import seed_dataset
+from grades.models import ModuleGrade
+from grades.views import AsyncStudentGradesView, StudentGradesView
+from plataform_back import metrics
+from plataform_back.instrumentation import QueryBudgetExceeded
+from plataform_back.pagination import encode_cursor
+from ranking.rank_index import course_index_name, get_rank_index, rebuild_student_index
+from ranking.views import AsyncRankingView, RankingView
+from students.models import User
+from students.views import AsyncProfileView, ProfileView
+from . import models as course_models, uploads, views
+from .cache import (
+    LOCK_RETRIES, PAYLOAD_FORMAT, LocalCache, get_course_tree, get_version, invalidate_course_tree, local_cache,
+)
+from .imports import import_enrollments
+from .models import (
+    BlockCompletion, Course, CourseBlock, CourseChanges, CourseTemplate, Enrollment, Module, Resource, StoredFile,
+    UploadSession,
+)
+from .structure import apply_template, bulk_create_courses, validate_layout
+from .views import AsyncStudentCourseListView, StudentCourseDetailView, StudentCourseListView
+
+
+def forget_pending_course_changes():
+    # El CourseChanges registrado en setUpTestData queda en la transacción de la
+    # clase, que nunca se confirma: sin esto los tests le agregarían sus cambios
+    course_models._pending.__dict__.clear()
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class CourseTreeQueryBudgetTests(TestCase):
+    """El detalle de curso debe costar un número fijo de consultas."""
+
+    # permiso + (curso + módulos + semanas + recursos) cuando no está en caché
+    QUERY_BUDGET = 5
+    # solo la verificación de permiso cuando el payload está en caché
+    CACHED_QUERY_BUDGET = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.teacher = User.objects.create_user("teacher@test.com", "teacher", "x", role="teacher")
+        cls.student = User.objects.create_user("student@test.com", "student", "x")
+        cls.course = Course.objects.create(title="Álgebra", created_by=cls.admin, teacher=cls.teacher)
+        cls.enrollment = Enrollment.objects.create(student=cls.student, course=cls.course)
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        forget_pending_course_changes()
+
+    def add_resources(self, per_block):
+        blocks = CourseBlock.objects.filter(module__course=self.course)
+        Resource.objects.bulk_create([
+            Resource(block=block, uploaded_by=self.teacher, title=f"R{i}", file=f"course_resources/r{i}.pdf")
+            for block in blocks
+            for i in range(per_block)
+        ])
+
+    def get_as(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(url)
+
+    def test_student_detail_query_budget(self):
+        url = reverse("student-course-detail", args=[self.course.id])
+        for per_block in (1, 3):
+            self.add_resources(per_block)
+            invalidate_course_tree(self.course.id)
+            with self.assertNumQueries(self.QUERY_BUDGET):
+                response = self.get_as(self.student, url)
+            self.assertEqual(response.status_code, 200)
+
+        data = response.json()
+        self.assertEqual(len(data["modules"]), 3)
+        self.assertEqual([b["week_number"] for b in data["blocks"]], list(range(1, 13)))
+        self.assertEqual(len(data["blocks"][0]["resources"]), 4)
+        self.assertEqual(data["blocks"][0]["status"], "current")
+        self.assertEqual(data["blocks"][1]["status"], "locked")
+
+    def test_teacher_detail_query_budget(self):
+        self.add_resources(2)
+        url = reverse("teacher-course-detail", args=[self.course.id])
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.get_as(self.teacher, url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["teacher_name"], "teacher")
+
+        with self.assertNumQueries(self.CACHED_QUERY_BUDGET):
+            response = self.get_as(self.teacher, url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_cache_invalidated_on_resource_change(self):
+        url = reverse("student-course-detail", args=[self.course.id])
+        self.assertEqual(self.get_as(self.student, url).json()["blocks"][0]["resources"], [])
+        with self.assertNumQueries(self.CACHED_QUERY_BUDGET):
+            self.get_as(self.student, url)
+
+        block = CourseBlock.objects.get(module__course=self.course, week_number=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Resource.objects.create(block=block, uploaded_by=self.teacher, title="Nuevo", file="course_resources/n.pdf")
+
+        resources = self.get_as(self.student, url).json()["blocks"][0]["resources"]
+        self.assertEqual([r["title"] for r in resources], ["Nuevo"])
+
+    def test_student_not_enrolled(self):
+        other = User.objects.create_user("other@test.com", "other", "x")
+        response = self.get_as(other, reverse("student-course-detail", args=[self.course.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class CourseTreeCacheTests(TestCase):
+    """get_course_tree: niveles L1/L2, contadores y espera cuando otro tiene el lock."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.course = Course.objects.create(title="Álgebra", created_by=cls.admin)
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+
+    def tree_key(self):
+        return f"course-tree:{self.course.id}:{get_version(self.course.id)}:teacher:f{PAYLOAD_FORMAT}"
+
+    def requests_by_result(self):
+        return {
+            result: metrics.get_counter("course_tree_cache_requests_total", result=result)
+            for result in ("miss", "l1_hit", "l2_hit")
+        }
+
+    def test_hit_and_miss_counters(self):
+        build = mock.Mock(return_value={"title": "Álgebra"})
+        before = self.requests_by_result()
+        for _ in range(2):
+            self.assertEqual(get_course_tree(self.course.id, "teacher", build), {"title": "Álgebra"})
+        local_cache.clear()
+        self.assertEqual(get_course_tree(self.course.id, "teacher", build), {"title": "Álgebra"})
+
+        after = self.requests_by_result()
+        self.assertEqual({result: after[result] - before[result] for result in after}, {
+            "miss": 1, "l1_hit": 1, "l2_hit": 1,
+        })
+        build.assert_called_once_with()
+
+    def test_l1_expires(self):
+        local = LocalCache()
+        with mock.patch("courses.cache.time.monotonic", return_value=100.0):
+            local.set("key", "value", 5)
+        with mock.patch("courses.cache.time.monotonic", return_value=104.0):
+            self.assertEqual(local.get("key"), "value")
+        with mock.patch("courses.cache.time.monotonic", return_value=106.0):
+            self.assertIsNone(local.get("key"))
+        self.assertNotIn("key", local._data)
+
+    def test_lock_held_waits_then_builds(self):
+        # Otro proceso tiene el lock y nunca publica: tras los reintentos se construye sin cachear
+        key = self.tree_key()
+        cache.add(f"{key}:lock", 1, 10)
+        build = mock.Mock(return_value={"title": "Álgebra"})
+        waits = metrics.get_counter("course_tree_cache_lock_waits_total")
+        with mock.patch("courses.cache.time.sleep") as sleep:
+            self.assertEqual(get_course_tree(self.course.id, "teacher", build), {"title": "Álgebra"})
+        self.assertEqual(sleep.call_count, LOCK_RETRIES)
+        build.assert_called_once_with()
+        self.assertEqual(metrics.get_counter("course_tree_cache_lock_waits_total"), waits + 1)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.get(f"{key}:lock"), 1)
+
+    def test_lock_held_waits_for_payload(self):
+        key = self.tree_key()
+        cache.add(f"{key}:lock", 1, 10)
+        build = mock.Mock()
+        # El dueño del lock publica el payload durante la segunda espera
+        publish = [None, lambda: cache.set(key, {"title": "Publicado"})]
+
+        def sleep(seconds):
+            step = publish.pop(0) if publish else None
+            if step:
+                step()
+
+        with mock.patch("courses.cache.time.sleep", side_effect=sleep) as sleep_mock:
+            self.assertEqual(get_course_tree(self.course.id, "teacher", build), {"title": "Publicado"})
+        self.assertEqual(sleep_mock.call_count, 2)
+        build.assert_not_called()
+        self.assertEqual(local_cache.get(key), {"title": "Publicado"})
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, REQUEST_METRICS_HEADER=True)
+class RequestInstrumentationTests(TestCase):
+    """Middleware de métricas: Server-Timing, histogramas y query_budget."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.student = User.objects.create_user("student@test.com", "student", "x")
+        cls.course = Course.objects.create(title="Álgebra", created_by=cls.admin)
+        Enrollment.objects.create(student=cls.student, course=cls.course)
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.url = reverse("student-course-detail", args=[self.course.id])
+
+    def test_server_timing_header(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        self.assertIn('desc="5 queries"', timing)
+        self.assertIn('cache;desc="0 hits, 1 misses"', timing)
+        self.assertIn("serialize;dur=", timing)
+
+        timing = self.client.get(self.url)["Server-Timing"]
+        self.assertIn('desc="1 queries"', timing)
+        self.assertIn('cache;desc="1 hits, 0 misses"', timing)
+
+    def test_budget_exceeded_raises(self):
+        with mock.patch.object(StudentCourseDetailView, "query_budget", 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(self.url)
+            # Con el payload en caché la vista vuelve a estar dentro del presupuesto
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_budget_exceeded_logs(self):
+        with mock.patch.object(StudentCourseDetailView, "query_budget", 1):
+            with self.assertLogs("plataform_back.instrumentation", level="WARNING"):
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_histograms(self):
+        self.client.get(self.url)
+        body = self.client.get("/metrics/").content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn('http_request_db_queries_bucket{view="student-course-detail",le="5"}', body)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.5"], METRICS_TOKEN="s3cret")
+    def test_metrics_endpoint_restricted(self):
+        self.assertEqual(self.client.get("/metrics/", REMOTE_ADDR="10.0.0.9").status_code, 403)
+        self.assertEqual(
+            self.client.get("/metrics/", REMOTE_ADDR="10.0.0.9", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403
+        )
+        self.assertEqual(
+            self.client.get("/metrics/", REMOTE_ADDR="10.0.0.9", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200
+        )
+        self.assertEqual(self.client.get("/metrics/", REMOTE_ADDR="10.0.0.5").status_code, 200)
+
+    def test_asgi_chain_not_wrapped_in_sync_to_async(self):
+        chain = ASGIHandler()._middleware_chain
+        self.assertNotIsInstance(chain, SyncToAsync)
+        self.assertTrue(iscoroutinefunction(chain))
+
+    async def test_async_request_server_timing(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.student).access_token))()
+        response = await AsyncClient().get(self.url, headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        # 5 de la vista + el usuario del JWT (sin force_authenticate)
+        self.assertIn('desc="6 queries"', response["Server-Timing"])
+
+
+class CourseQueryPlanTests(QueryPlanAssertions, TestCase):
+    """Planes de las consultas de cursos sobre el dataset de los benchmarks."""
+
+    # Prefetch de semanas de varios módulos (module_id IN ...): se ordenan las
+    # semanas del curso, a lo sumo 12 filas
+    BLOCK_PREFETCH = '"courses_courseblock"."module_id" IN'
+    # Listado de estudiantes por nombre de usuario: orden sobre la tabla unida
+    ROSTER_ORDER = 'ORDER BY "students_user"."username"'
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(students=40, teachers=2, courses=4, courses_per_student=2, resources_per_block=1)
+        cls.student = User.objects.get(email="student0@bench.test")
+        cls.teacher = User.objects.get(email="teacher0@bench.test")
+        cls.course_id = Enrollment.objects.filter(student=cls.student).values_list("course_id", flat=True).first()
+        cls.teacher_course_id = Course.objects.filter(teacher=cls.teacher).values_list("id", flat=True).first()
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+
+    def get_as(self, user, url, allow=()):
+        client = APIClient()
+        client.force_authenticate(user)
+        return self.assertPlansUseIndexes(lambda: client.get(url), allow)
+
+    def test_student_views(self):
+        self.get_as(self.student, reverse("student-courses"))
+        self.get_as(self.student, reverse("student-course-detail", args=[self.course_id]), [self.BLOCK_PREFETCH])
+        self.get_as(self.student, reverse("student-course-leaderboard", args=[self.course_id]))
+
+    def test_teacher_views(self):
+        course_id = self.teacher_course_id
+        self.get_as(self.teacher, reverse("teacher-course-detail", args=[course_id]), [self.BLOCK_PREFETCH])
+        self.get_as(self.teacher, reverse("teacher-course-students", args=[course_id]), [self.ROSTER_ORDER])
+        self.get_as(self.teacher, reverse("teacher-courses"))
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Los changelists del admin deben costar lo mismo con más filas."""
+
+    CHANGELISTS = (
+        "admin:courses_course_changelist",
+        "admin:courses_courseblock_changelist",
+        "admin:courses_resource_changelist",
+        "admin:courses_enrollment_changelist",
+        "admin:students_user_changelist",
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin@test.com", "admin", "x")
+        cls.added = 0
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_course(self):
+        n = AdminChangelistQueryTests.added = self.added + 1
+        teacher = User.objects.create_user(f"teacher{n}@test.com", f"teacher{n}", "x", role="teacher")
+        course = Course.objects.create(title=f"Curso {n}", created_by=self.admin, teacher=teacher)
+        for i in range(3):
+            student = User.objects.create_user(f"student{n}-{i}@test.com", f"student{n}-{i}", "x")
+            Enrollment.objects.create(student=student, course=course)
+        Resource.objects.bulk_create([
+            Resource(block=block, uploaded_by=teacher, title="R", file="course_resources/r.pdf")
+            for block in CourseBlock.objects.filter(module__course=course)
+        ])
+
+    def changelist_queries(self, name, query=""):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name) + query)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_independent_of_rows(self):
+        self.add_course()
+        before = {name: self.changelist_queries(name) for name in self.CHANGELISTS}
+        self.add_course()
+        self.add_course()
+        after = {name: self.changelist_queries(name) for name in self.CHANGELISTS}
+        self.assertEqual(after, before)
+
+    def test_enrollments_by_course_link(self):
+        self.add_course()
+        course = Course.objects.get()
+        response = self.client.get(reverse("admin:courses_enrollment_changelist"), {"course__id__exact": course.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["cl"].result_list), 3)
+
+
+class CourseAdminTests(TestCase):
+    """Alta de cursos desde el admin: created_by se asigna antes de validar."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin@test.com", "admin", "x")
+        cls.teacher = User.objects.create_user("teacher@test.com", "teacher", "x", role="teacher")
+        # Staff con todos los permisos pero sin rol admin
+        cls.staff_teacher = User.objects.create_user(
+            "staff@test.com", "staff", "x", role="teacher", is_staff=True, is_superuser=True,
+        )
+
+    def add(self, user):
+        self.client.force_login(user)
+        return self.client.post(reverse("admin:courses_course_add"), {
+            "title": "Álgebra", "description": "", "level": "beginner", "duration": 12, "teacher": self.teacher.pk,
+        })
+
+    def test_admin_creates_course(self):
+        self.assertEqual(self.add(self.admin).status_code, 302)
+        self.assertEqual(Course.objects.get().created_by, self.admin)
+
+    def test_non_admin_role_rejected(self):
+        response = self.add(self.staff_teacher)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["adminform"].form.non_field_errors(), ["Solo un administrador puede crear cursos."])
+        self.assertFalse(Course.objects.exists())
+
+
+class ResourceUploadTests(TestCase):
+    """Subidas por partes, deduplicación por contenido y purga por ref_count."""
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, directory, ignore_errors=True)
+        cls.enterClassContext(override_settings(
+            MEDIA_ROOT=os.path.join(directory, "media"),
+            RESOURCE_UPLOAD_DIR=os.path.join(directory, "uploads"),
+            RESOURCE_UPLOAD_CHUNK_SIZE=4,
+        ))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.teacher = User.objects.create_user("teacher@test.com", "teacher", "x", role="teacher")
+        cls.other = User.objects.create_user("other@test.com", "other", "x", role="teacher")
+        cls.course = Course.objects.create(title="Álgebra", created_by=cls.admin, teacher=cls.teacher)
+        cls.other_course = Course.objects.create(title="Física", created_by=cls.admin, teacher=cls.other)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def start(self, user, course, content, **extra):
+        url = reverse("resource-upload-create", args=[course.id, 1])
+        body = {"title": "Clase", "filename": "clase.pdf", "size": len(content), **extra}
+        return self.client_for(user).post(url, body, format="json")
+
+    def send(self, user, upload_id, offset, data):
+        return self.client_for(user).patch(
+            reverse("resource-upload", args=[upload_id]), data,
+            content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def upload(self, user, course, content, **extra):
+        upload_id = self.start(user, course, content, **extra).json()["upload_id"]
+        for offset in range(0, len(content), 4):
+            response = self.send(user, upload_id, offset, content[offset:offset + 4])
+        return response
+
+    def test_chunked_upload(self):
+        content = b"hello world!"
+        upload_id = self.start(self.teacher, self.course, content).json()["upload_id"]
+        self.assertEqual(self.send(self.teacher, upload_id, 0, content[:4]).status_code, 204)
+
+        # Offset equivocado: 409 con el offset esperado para retomar
+        response = self.send(self.teacher, upload_id, 0, content[4:8])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Upload-Offset"], "4")
+        head = self.client_for(self.teacher).head(reverse("resource-upload", args=[upload_id]))
+        self.assertEqual(head["Upload-Offset"], "4")
+
+        self.assertEqual(self.send(self.teacher, upload_id, 4, content[4:8]).status_code, 204)
+        response = self.send(self.teacher, upload_id, 8, content[8:])
+        self.assertEqual(response.status_code, 201)
+
+        resource = Resource.objects.get()
+        self.assertEqual(resource.blob.sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(resource.blob.ref_count, 1)
+        with resource.blob.file.open("rb") as fh:
+            self.assertEqual(fh.read(), content)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_hash_without_in_process_state(self):
+        # Como si cada parte llegara a otro worker: el hash se calcula al completar
+        content = b"0123456789"
+        upload_id = self.start(self.teacher, self.course, content).json()["upload_id"]
+        for offset in range(0, len(content), 4):
+            uploads._hashers.clear()
+            response = self.send(self.teacher, upload_id, offset, content[offset:offset + 4])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(StoredFile.objects.get().sha256, hashlib.sha256(content).hexdigest())
+
+    def test_hasher_cache_is_bounded(self):
+        content = b"abcdefghijkl"
+        upload_ids = [self.start(self.teacher, self.course, content).json()["upload_id"] for _ in range(3)]
+        uploads._hashers.clear()
+        with mock.patch.object(uploads, "MAX_CACHED_HASHERS", 2):
+            for upload_id in upload_ids:
+                self.send(self.teacher, upload_id, 0, content[:4])
+        self.assertEqual([str(pk) for pk in uploads._hashers], upload_ids[1:])
+
+        # Entradas de sesiones abandonadas (sin partes en más de la expiración) se descartan
+        UploadSession.objects.filter(pk=upload_ids[1]).update(updated_at=timezone.now() - timedelta(days=2))
+        stale = UploadSession.objects.get(pk=upload_ids[1])
+        uploads._hashers[stale.pk] = (stale.offset, stale.updated_at, hashlib.sha256())
+        self.send(self.teacher, upload_ids[2], 4, content[4:8])
+        self.assertEqual([str(pk) for pk in uploads._hashers], upload_ids[2:])
+
+        # La primera perdió su hasher: se hashea el archivo al completar
+        self.send(self.teacher, upload_ids[0], 4, content[4:8])
+        self.assertEqual(self.send(self.teacher, upload_ids[0], 8, content[8:]).status_code, 201)
+        self.assertEqual(StoredFile.objects.get().sha256, hashlib.sha256(content).hexdigest())
+
+    def test_chunk_read_before_lock(self):
+        content = b"abcdefgh"
+        upload_id = self.start(self.teacher, self.course, content).json()["upload_id"]
+        calls = []
+        get_session = views.ResourceUploadView.get_session
+
+        def tracked_get_session(view, request, pk, lock=False):
+            calls.append("lock" if lock else "get")
+            return get_session(view, request, pk, lock=lock)
+
+        def tracked_spool(stream, length):
+            calls.append("read")
+            return uploads.spool_chunk(stream, length)
+
+        with mock.patch.object(views.ResourceUploadView, "get_session", tracked_get_session), \
+                mock.patch.object(views, "spool_chunk", tracked_spool):
+            self.assertEqual(self.send(self.teacher, upload_id, 0, content[:4]).status_code, 204)
+            # Offset equivocado: se rechaza sin leer el cuerpo ni bloquear
+            self.assertEqual(self.send(self.teacher, upload_id, 0, content[4:]).status_code, 409)
+        self.assertEqual(calls, ["get", "read", "lock", "get"])
+
+        # Cuerpo más corto que Content-Length: falla antes de tocar la sesión
+        with self.assertRaises(uploads.UploadError):
+            uploads.spool_chunk(io.BytesIO(content[4:6]), 4)
+
+    def test_checksum_mismatch(self):
+        response = self.upload(self.teacher, self.course, b"abcdef", sha256="0" * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Resource.objects.exists())
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_same_bytes_share_blob(self):
+        content = b"same bytes"
+        self.upload(self.teacher, self.course, content)
+        self.upload(self.other, self.other_course, content)
+        blob = StoredFile.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(Resource.objects.filter(blob=blob).count(), 2)
+
+    def test_declared_hash_shortcut_only_for_own_files(self):
+        content = b"private notes"
+        digest = hashlib.sha256(content).hexdigest()
+        self.upload(self.teacher, self.course, content)
+
+        # Otro profesor que conoce el hash debe subir los bytes igual
+        response = self.start(self.other, self.other_course, content, sha256=digest)
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("upload_id", response.json())
+        self.assertNotIn("deduplicated", response.json())
+        self.assertEqual(Resource.objects.filter(uploaded_by=self.other).count(), 0)
+
+        response = self.start(self.teacher, self.course, content, sha256=digest)
+        self.assertTrue(response.json()["deduplicated"])
+        self.assertEqual(StoredFile.objects.get().ref_count, 2)
+
+    def test_concurrent_new_blob(self):
+        # Otra subida creó la fila entre find_blob y el INSERT
+        existing = uploads.store_blob("a" * 64, 3, "x.txt", ContentFile(b"abc"))
+        with mock.patch.object(uploads, "find_blob", side_effect=[None, existing]):
+            blob = uploads.store_blob("a" * 64, 3, "x.txt", ContentFile(b"abc"))
+        self.assertEqual(blob, existing)
+        self.assertEqual(StoredFile.objects.count(), 1)
+        directory = os.path.dirname(default_storage.path(existing.file.name))
+        self.assertEqual(os.listdir(directory), [os.path.basename(existing.file.name)])
+
+    def test_purge_when_last_reference_deleted(self):
+        content = b"shared"
+        self.upload(self.teacher, self.course, content)
+        self.upload(self.other, self.other_course, content)
+        blob = StoredFile.objects.get()
+        path = default_storage.path(blob.file.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Resource.objects.filter(uploaded_by=self.teacher).delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Resource.objects.filter(uploaded_by=self.other).delete()
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+
+class CourseStructureTests(TestCase):
+    """Plantillas de estructura, importación masiva y apply_template."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.student = User.objects.create_user("student@test.com", "student", "x")
+        cls.template = CourseTemplate.objects.create(
+            name="corto", layout=[{"title": "Intro", "weeks": [1, 2]}, {"weeks": [3]}]
+        )
+
+    def layout_of(self, course):
+        return [
+            (module.number, module.title, [block.week_number for block in module.blocks.order_by("week_number")])
+            for module in Module.objects.filter(course=course).order_by("number")
+        ]
+
+    def test_default_structure(self):
+        course = Course.objects.create(title="Álgebra", created_by=self.admin)
+        layout = self.layout_of(course)
+        self.assertEqual([weeks for _, _, weeks in layout], [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]])
+
+    def test_bulk_create_courses(self):
+        courses = bulk_create_courses(
+            [Course(title=f"Curso {i}", created_by=self.admin) for i in range(3)], template=self.template
+        )
+        self.assertEqual(len(courses), 3)
+        for course in courses:
+            self.assertEqual(course.template_id, self.template.pk)
+            self.assertEqual(self.layout_of(course), [(1, "Intro", [1, 2]), (2, "Módulo 2", [3])])
+
+    def test_validate_layout(self):
+        for layout in ([], [{"weeks": []}], [{"weeks": [13]}], [{"weeks": [1]}, {"weeks": [1]}]):
+            with self.assertRaises(ValidationError):
+                validate_layout(layout)
+
+    def test_apply_template_skips_courses_with_structure(self):
+        course = Course.objects.create(title="Álgebra", created_by=self.admin)
+        self.assertEqual(apply_template(self.template, [course]), [])
+        self.assertEqual(len(self.layout_of(course)), 3)
+
+        applied = apply_template(self.template, [course], replace=True)
+        self.assertEqual(applied, [course.pk])
+        self.assertEqual(self.layout_of(course), [(1, "Intro", [1, 2]), (2, "Módulo 2", [3])])
+
+    def test_replace_refused_with_enrollments(self):
+        course = Course.objects.create(title="Álgebra", created_by=self.admin)
+        enrollment = Enrollment.objects.create(student=self.student, course=course)
+        grades = ModuleGrade.objects.filter(enrollment=enrollment)
+        self.assertEqual(grades.count(), 3)
+
+        with self.assertRaises(ValidationError):
+            apply_template(self.template, [course], replace=True)
+        self.assertEqual(grades.count(), 3)
+        with self.assertRaises(CommandError):
+            call_command("apply_course_template", "corto", str(course.pk), "--replace", stdout=io.StringIO())
+
+        Enrollment.objects.filter(pk=enrollment.pk).update(completed_weeks=2, progress=16)
+        apply_template(self.template, [course], replace=True, force=True)
+        enrollment.refresh_from_db()
+        self.assertEqual((enrollment.completed_weeks, enrollment.progress), (0, 0))
+        self.assertEqual(
+            sorted(grades.values_list("module__number", "grade")), [(1, 0), (2, 0)]
+        )
+
+
+class ConditionalGetTests(TestCase):
+    """ETag / Last-Modified de los cursos del estudiante y versión por transacción."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.teacher = User.objects.create_user("teacher@test.com", "teacher", "x", role="teacher")
+        cls.student = User.objects.create_user("student@test.com", "student", "x")
+        cls.course = Course.objects.create(title="Álgebra", created_by=cls.admin, teacher=cls.teacher)
+        cls.enrollment = Enrollment.objects.create(student=cls.student, course=cls.course)
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        forget_pending_course_changes()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        # Last-Modified tiene resolución de segundos: el estado inicial queda en el pasado
+        past = timezone.now() - timedelta(hours=1)
+        Course.objects.filter(pk=self.course.pk).update(updated_at=past)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(updated_at=past)
+
+    def add_resource(self):
+        block = CourseBlock.objects.get(module__course=self.course, week_number=1)
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            Resource.objects.create(block=block, uploaded_by=self.teacher, title="R", file="course_resources/r.pdf")
+
+    def test_course_list(self):
+        url = reverse("student-courses")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(progress=50, updated_at=timezone.now())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_course_detail(self):
+        url = reverse("student-course-detail", args=[self.course.id])
+        response = self.client.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.add_resource()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_cascade_touches_course_once(self):
+        self.add_resource()
+        version = get_version(self.course.id)
+        module = Module.objects.filter(course=self.course).order_by("number").first()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, capture_queries() as queries:
+            with transaction.atomic():
+                module.delete()
+        touches = [sql for sql, _ in queries if sql.startswith('UPDATE "courses_course"')]
+        self.assertEqual(len(touches), 1)
+        self.assertEqual(len([c for c in callbacks if isinstance(c, CourseChanges)]), 1)
+        local_cache.clear()
+        self.assertEqual(get_version(self.course.id), version + 1)
+
+    def test_rolled_back_savepoint(self):
+        module = Module.objects.filter(course=self.course).first()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, transaction.atomic():
+            try:
+                with transaction.atomic():
+                    module.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            # El callback del savepoint revertido se descartó: se registra otro
+            module.save()
+            module.save()
+        self.assertEqual(len([c for c in callbacks if isinstance(c, CourseChanges)]), 1)
+        self.assertGreater(Course.objects.get(pk=self.course.pk).updated_at, timezone.now() - timedelta(minutes=1))
+
+
+    def test_pending_changes_cleared(self):
+        module = Module.objects.filter(course=self.course).first()
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            module.save()
+            self.assertIsNotNone(course_models.current_course_changes())
+        self.assertIsNone(course_models.current_course_changes())
+
+        # Revertido: Django descarta el callback y no queda como pendiente
+        try:
+            with transaction.atomic():
+                module.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertIsNone(course_models.current_course_changes())
+
+class BlockCompletionTests(TestCase):
+    """Semanas completadas en orden y avance desnormalizado en Enrollment."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.student = User.objects.create_user("student@test.com", "student", "x")
+        cls.course = Course.objects.create(title="Álgebra", created_by=cls.admin)
+        cls.enrollment = Enrollment.objects.create(student=cls.student, course=cls.course)
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        forget_pending_course_changes()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def complete(self, week):
+        return self.client.post(reverse("student-complete-block", args=[self.course.id, week]))
+
+    def test_in_order(self):
+        response = self.complete(1)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["completed_weeks"], 1)
+        self.assertEqual(response.json()["progress"], 8)  # 1 de 12 semanas
+
+        response = self.complete(2)
+        self.assertEqual((response.status_code, response.json()["progress"]), (201, 16))
+        self.assertEqual(BlockCompletion.objects.filter(enrollment=self.enrollment).count(), 2)
+
+    def test_locked_week(self):
+        response = self.complete(3)
+        self.assertEqual(response.status_code, 409)
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.completed_weeks, self.enrollment.progress), (0, 0))
+
+    def test_repeat_is_noop(self):
+        self.complete(1)
+        self.complete(2)
+        response = self.complete(1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["completed_weeks"], 2)
+
+    def test_after_admin_reset(self):
+        self.complete(1)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_weeks=0, progress=0)
+        response = self.complete(1)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(BlockCompletion.objects.filter(enrollment=self.enrollment).count(), 1)
+
+    def test_course_list_reflects_progress(self):
+        for week in (1, 2, 3):
+            self.complete(week)
+        course = self.client.get(reverse("student-courses")).json()[0]
+        self.assertEqual(course["progress"], 25)
+        detail = self.client.get(reverse("student-course-detail", args=[self.course.id])).json()
+        self.assertEqual([block["status"] for block in detail["blocks"][:5]],
+                         ["completed", "completed", "completed", "current", "locked"])
+
+    def test_progress_refreshed_when_weeks_change(self):
+        for week in (1, 2, 3):
+            self.complete(week)
+        blocks = CourseBlock.objects.filter(module__course=self.course, week_number__gt=6)
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            for block in blocks:
+                block.delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.progress, 50)  # 3 de 6 semanas
+
+
+class CourseLeaderboardTests(TestCase):
+    """Leaderboard de mérito por curso: empates, vistas e índice al día tras cada escritura."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.teacher = User.objects.create_user("teacher@test.com", "teacher", "x", role="teacher")
+        cls.other_teacher = User.objects.create_user("other@test.com", "other", "x", role="teacher")
+        cls.course = Course.objects.create(title="Física", created_by=cls.admin, teacher=cls.teacher)
+        cls.students = []
+        for i, points in enumerate([30, 20, 20, 5]):
+            student = User.objects.create_user(f"s{i}@test.com", f"s{i}", "x")
+            Enrollment.objects.create(student=student, course=cls.course, merit_points=points)
+            cls.students.append(student)
+        cls.late = User.objects.create_user("late@test.com", "late", "x")
+
+    def setUp(self):
+        cache.clear()
+        # El índice en memoria sobrevive al rollback de cada test
+        get_rank_index(course_index_name(self.course.id)).invalidate()
+        self.client = APIClient()
+
+    def leaderboard(self, user=None, **params):
+        user = user or self.students[3]
+        self.client.force_authenticate(user)
+        name = "teacher-course-leaderboard" if user.role == "teacher" else "student-course-leaderboard"
+        return self.client.get(reverse(name, args=[self.course.id]), params)
+
+    def ranking(self):
+        # Dentro de un empate el orden depende del id: se compara ordenado por nombre
+        rows = self.leaderboard().json()["leaderboard"]
+        return sorted(((row["username"], row["merit_points"], row["rank"]) for row in rows), key=lambda r: (r[2], r[0]))
+
+    def test_student_view(self):
+        self.assertEqual(self.ranking(), [("s0", 30, 1), ("s1", 20, 2), ("s2", 20, 2), ("s3", 5, 4)])
+        self.assertEqual(self.leaderboard().json()["me"], {"merit_points": 5, "rank": 4})
+        self.assertTrue(get_rank_index(course_index_name(self.course.id)).is_ready())
+
+        self.assertEqual(len(self.leaderboard(top=2).json()["leaderboard"]), 2)
+        self.assertEqual(self.leaderboard(top="x").status_code, 400)
+
+        self.client.force_authenticate(self.late)
+        response = self.client.get(reverse("student-course-leaderboard", args=[self.course.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_teacher_view(self):
+        response = self.leaderboard(self.teacher, top=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["username"] for row in response.json()["leaderboard"]], ["s0"])
+        self.assertNotIn("me", response.json())
+        self.assertEqual(self.leaderboard(self.other_teacher).status_code, 404)
+
+    def test_add_points_updates_index(self):
+        self.ranking()
+        self.client.force_authenticate(self.teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("teacher-course-add-points", args=[self.course.id]),
+                {"points": [{"student_id": str(self.students[3].id), "delta": 40}]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ranking()[:2], [("s3", 45, 1), ("s0", 30, 2)])
+
+    def test_import_invalidates_index(self):
+        self.ranking()
+        with self.captureOnCommitCallbacks(execute=True):
+            report = import_enrollments([f"late@test.com,{self.course.id}"])
+        self.assertEqual(report.created, 1)
+        self.assertFalse(get_rank_index(course_index_name(self.course.id)).is_ready())
+        self.assertEqual(self.ranking()[-1], ("late", 0, 5))
+
+    def test_delete_removes_member(self):
+        self.ranking()
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.get(student=self.students[0]).delete()
+        self.assertTrue(get_rank_index(course_index_name(self.course.id)).is_ready())
+        self.assertEqual(self.ranking(), [("s1", 20, 1), ("s2", 20, 1), ("s3", 5, 3)])
+
+
+class TeacherRosterTests(TestCase):
+    """Listado de cursos del profesor con conteos y estudiantes paginados por cursor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.teacher = User.objects.create_user("teacher@test.com", "teacher", "x", role="teacher")
+        cls.other_teacher = User.objects.create_user("other@test.com", "other", "x", role="teacher")
+        cls.course = Course.objects.create(title="Química", created_by=cls.admin, teacher=cls.teacher)
+        Course.objects.create(title="Biología", created_by=cls.admin, teacher=cls.teacher)
+        for i in range(5):
+            student = User.objects.create_user(f"s{i}@test.com", f"s{i}", "x")
+            Enrollment.objects.create(student=student, course=cls.course, completed=i < 2, merit_points=i * 10)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def test_course_list_counts_only(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(reverse("teacher-courses")).json()
+        data.sort(key=lambda course: course["id"])
+        self.assertEqual([course["title"] for course in data], ["Química", "Biología"])
+        self.assertEqual(data[0]["stats"], {"enrolled": 5, "completed": 2, "avg_merit_points": 20.0})
+        self.assertEqual(data[1]["stats"]["enrolled"], 0)
+        self.assertNotIn("students", data[0])
+        self.assertEqual(data[0]["students_url"], reverse("teacher-course-students", args=[self.course.id]))
+
+    def test_roster_pages(self):
+        url = reverse("teacher-course-students", args=[self.course.id])
+        names, params = [], {"page_size": 2}
+        while True:
+            data = self.client.get(url, params).json()
+            self.assertLessEqual(len(data["students"]), 2)
+            names += [student["student_name"] for student in data["students"]]
+            if not data["next_cursor"]:
+                break
+            params["cursor"] = data["next_cursor"]
+        self.assertEqual(names, ["s0", "s1", "s2", "s3", "s4"])
+        self.assertEqual(data["stats"]["enrolled"], 5)
+
+    def test_roster_errors(self):
+        url = reverse("teacher-course-students", args=[self.course.id])
+        for cursor in ("nope", encode_cursor([["s0"], 1]), encode_cursor(["s0", "1"]), encode_cursor(["s0"])):
+            self.assertEqual(self.client.get(url, {"cursor": cursor}).status_code, 400, cursor)
+        self.client.force_authenticate(self.other_teacher)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class TeacherAddPointsTests(TestCase):
+    """Puntos de mérito en lote: un UPDATE con F(), resultado por fila y deltas enteros."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.teacher = User.objects.create_user("teacher@test.com", "teacher", "x", role="teacher")
+        cls.course = Course.objects.create(title="Historia", created_by=cls.admin, teacher=cls.teacher)
+        cls.ana = User.objects.create_user("ana@test.com", "ana", "x")
+        cls.beto = User.objects.create_user("beto@test.com", "beto", "x")
+        cls.outsider = User.objects.create_user("out@test.com", "out", "x")
+        for student, points in ((cls.ana, 10), (cls.beto, 0)):
+            Enrollment.objects.create(student=student, course=cls.course, merit_points=points)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.url = reverse("teacher-course-add-points", args=[self.course.id])
+
+    def post(self, points):
+        return self.client.post(self.url, {"points": points}, format="json")
+
+    def points(self, student):
+        return Enrollment.objects.get(student=student, course=self.course).merit_points
+
+    def test_single_update_with_f(self):
+        with capture_queries() as queries:
+            response = self.post([
+                {"student_id": str(self.ana.id), "delta": 5},
+                {"student_id": str(self.beto.id), "delta": -2},
+            ])
+        self.assertEqual(response.status_code, 200)
+        updates = [sql for sql, _ in queries if sql.startswith('UPDATE "courses_enrollment"')]
+        self.assertEqual(len(updates), 1)
+        # El incremento se calcula en la base, no sobre el valor leído
+        self.assertIn('"courses_enrollment"."merit_points" +', updates[0])
+        self.assertEqual((self.points(self.ana), self.points(self.beto)), (15, -2))
+        self.assertEqual(response.json()["updated"], 2)
+
+    def test_row_status(self):
+        response = self.post([
+            {"student_id": str(self.ana.id), "delta": 3},
+            {"student_id": str(self.ana.id), "delta": 4},
+            {"student_id": str(self.outsider.id), "delta": 1},
+            {"student_id": "not-a-uuid", "delta": 1},
+            {"delta": 1},
+            {"student_id": str(self.beto.id), "delta": "7"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["status"] for row in response.json()["results"]],
+            ["ok", "duplicate", "not_enrolled", "invalid", "invalid", "ok"],
+        )
+        self.assertEqual(response.json()["results"][0]["merit_points"], 13)
+        self.assertEqual((self.points(self.ana), self.points(self.beto)), (13, 7))
+
+    def test_unknown_student(self):
+        response = self.post([{"student_id": "00000000-0000-0000-0000-000000000000", "delta": 5}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated"], 0)
+        self.assertEqual(response.json()["results"][0]["status"], "not_enrolled")
+
+    def test_non_integer_delta(self):
+        # Decimal o booleano, como número o como texto: la fila queda invalid, el resto se aplica
+        for delta in (2.7, "2.7", True, "abc"):
+            response = self.post([
+                {"student_id": str(self.beto.id), "delta": 1},
+                {"student_id": str(self.ana.id), "delta": delta},
+            ])
+            self.assertEqual(response.status_code, 200)
+            results = response.json()["results"]
+            self.assertEqual(results[0]["status"], "ok")
+            self.assertEqual(results[1], {
+                "student_id": str(self.ana.id), "status": "invalid", "errors": {"delta": ["A valid integer is required."]},
+            })
+        self.assertEqual((self.points(self.ana), self.points(self.beto)), (10, 4))
+
+    def test_integer_like_delta(self):
+        for delta in ("5", 5.0, "5.0"):
+            response = self.post([{"student_id": str(self.beto.id), "delta": delta}])
+            self.assertEqual(response.json()["results"][0]["delta"], 5)
+        self.assertEqual(self.points(self.beto), 15)
+
+    def test_invalid_row_errors(self):
+        results = self.post([{"student_id": "not-a-uuid", "delta": 1}, {"delta": 1}, "row"]).json()["results"]
+        self.assertEqual([row["status"] for row in results], ["invalid"] * 3)
+        self.assertEqual(results[0]["errors"], {"student_id": ["Must be a valid UUID."]})
+        self.assertEqual(results[1]["errors"], {"student_id": ["This field is required."]})
+        self.assertIn("non_field_errors", results[2]["errors"])
+
+    def test_body_validation(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.client.post(self.url, {"points": "x"}, format="json").status_code, 400)
+        rows = [{"student_id": str(self.ana.id), "delta": 1}] * 1001
+        self.assertEqual(self.post(rows).status_code, 400)
+
+
+class ResourceDownloadTests(TestCase):
+    """Descarga protegida: acceso, rangos (206/416) y delegación a nginx."""
+
+    CONTENT = b"0123456789"
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, directory, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=directory, RESOURCE_DOWNLOAD_BACKEND="local"))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.teacher = User.objects.create_user("teacher@test.com", "teacher", "x", role="teacher")
+        cls.student = User.objects.create_user("student@test.com", "student", "x")
+        cls.outsider = User.objects.create_user("outsider@test.com", "outsider", "x")
+        course = Course.objects.create(title="Álgebra", created_by=cls.admin, teacher=cls.teacher)
+        Enrollment.objects.create(student=cls.student, course=course)
+        block = CourseBlock.objects.get(module__course=course, week_number=1)
+        cls.resource = Resource.objects.create(
+            block=block, uploaded_by=cls.teacher, title="Apunte", filename="apunte de clase.txt",
+            file=ContentFile(cls.CONTENT, name="apunte.txt"),
+        )
+        cls.url = reverse("resource-download", args=[cls.resource.id])
+
+    def setUp(self):
+        # test_access borra el archivo
+        with open(self.resource.file.path, "wb") as file:
+            file.write(self.CONTENT)
+
+    def get(self, user=None, **headers):
+        client = APIClient()
+        client.force_authenticate(user or self.student)
+        response = client.get(self.url, headers=headers)
+        if response.streaming:
+            self.body = b"".join(response.streaming_content)
+            response.close()
+        return response
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body, self.CONTENT)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Content-Disposition"], "inline; filename*=UTF-8''apunte%20de%20clase.txt")
+        self.assertTrue(response["ETag"])
+        self.assertEqual(self.get(self.teacher).status_code, 200)
+
+    def test_ranges(self):
+        for header, body, content_range in (
+            ("bytes=2-5", b"2345", "bytes 2-5/10"),
+            ("bytes=7-", b"789", "bytes 7-9/10"),
+            ("bytes=-3", b"789", "bytes 7-9/10"),
+            ("bytes=8-99", b"89", "bytes 8-9/10"),
+        ):
+            response = self.get(Range=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(self.body, body)
+            self.assertEqual(response["Content-Range"], content_range)
+            self.assertEqual(response["Content-Length"], str(len(body)))
+
+        # Rangos múltiples o mal formados: se sirve completo
+        self.assertEqual(self.get(Range="bytes=0-1,4-5").status_code, 200)
+        self.assertEqual(self.get(Range="items=0-1").status_code, 200)
+
+    def test_unsatisfiable(self):
+        for header in ("bytes=10-", "bytes=5-2", "bytes=-0"):
+            response = self.get(Range=header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response["Content-Range"], "bytes */10")
+
+    def test_if_range(self):
+        etag = self.get()["ETag"]
+        self.assertEqual(self.get(Range="bytes=0-1", **{"If-Range": etag}).status_code, 206)
+        response = self.get(Range="bytes=0-1", **{"If-Range": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body, self.CONTENT)
+        self.assertEqual(self.get(**{"If-None-Match": etag}).status_code, 304)
+
+    @override_settings(RESOURCE_DOWNLOAD_BACKEND="nginx", RESOURCE_ACCEL_PREFIX="/protected-media/")
+    def test_nginx_accel_redirect(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.resource.file.name}")
+        self.assertEqual(response["Content-Type"], "text/plain")
+        self.assertEqual(response.content, b"")
+
+    def test_access(self):
+        self.assertEqual(self.get(self.outsider).status_code, 404)
+        os.remove(self.resource.file.path)
+        self.assertEqual(self.get().status_code, 404)
+
+
+class EnrollmentImportTests(TestCase):
+    """Importación por lotes: filas repetidas, existentes, desconocidas y notas en 0."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.teacher = User.objects.create_user("teacher@test.com", "teacher", "x", role="teacher")
+        cls.course = Course.objects.create(title="Álgebra", created_by=cls.admin, teacher=cls.teacher)
+        cls.other_course = Course.objects.create(title="Física", created_by=cls.admin, teacher=cls.teacher)
+        cls.ana = User.objects.create_user("ana@test.com", "ana", "x")
+        cls.beto = User.objects.create_user("beto@test.com", "beto", "x")
+        Enrollment.objects.create(student=cls.beto, course=cls.course)
+
+    def csv(self):
+        c1, c2 = self.course.id, self.other_course.id
+        return [
+            "email,course_id",
+            f"ana@test.com,{c1}",
+            f"ana@test.com,{c2}",
+            f"ana@test.com,{c1}",        # repetida en el archivo
+            f"beto@test.com,{c1}",       # ya inscripto
+            f"beto@test.com,{c2}",
+            f"nadie@test.com,{c1}",      # email desconocido
+            f"teacher@test.com,{c1}",    # no es estudiante
+            "ana@test.com,999999",       # curso desconocido
+            "ana@test.com,abc",
+            "sin coma",
+            "",
+        ]
+
+    def test_report(self):
+        report = import_enrollments(self.csv())
+        summary = report.as_dict()
+        summary["errors"].sort(key=lambda error: error["line"])
+        self.assertEqual(
+            {key: value for key, value in summary.items() if key not in ("elapsed_seconds", "rows_per_second")},
+            {
+                "rows": 10, "created": 3, "existing": 1, "duplicates": 1, "invalid": 2,
+                "unknown_students": 2, "unknown_courses": 1,
+                "errors": [
+                    {"line": 7, "error": "Unknown student: nadie@test.com"},
+                    {"line": 8, "error": "Unknown student: teacher@test.com"},
+                    {"line": 9, "error": "Unknown course: 999999"},
+                    {"line": 10, "error": "Expected: email,course_id"},
+                    {"line": 11, "error": "Expected: email,course_id"},
+                ],
+            },
+        )
+        self.assertEqual(Enrollment.objects.filter(student=self.ana).count(), 2)
+
+    def test_module_grades_created(self):
+        import_enrollments(self.csv())
+        for enrollment in Enrollment.objects.filter(student__in=[self.ana, self.beto]):
+            self.assertEqual(enrollment.module_grades.count(), 3, enrollment)
+        self.assertFalse(ModuleGrade.objects.exclude(grade=0).exists())
+
+    def test_batches_and_rerun(self):
+        # Con lotes de 2 la fila repetida cae en otro lote: cuenta como existente
+        report = import_enrollments(self.csv(), batch_size=2)
+        self.assertEqual((report.created, report.existing, report.duplicates), (3, 2, 0))
+        grades = ModuleGrade.objects.count()
+        report = import_enrollments(self.csv())
+        self.assertEqual((report.created, report.existing), (0, 4))
+        self.assertEqual(ModuleGrade.objects.count(), grades)
+
+    def test_api_and_command(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = reverse("admin-import-enrollments")
+        upload = ContentFile("\n".join(self.csv()).encode("utf-8-sig"), name="inscripciones.csv")
+        response = client.post(url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 3)
+
+        self.assertEqual(client.post(url, {}, format="multipart").status_code, 400)
+        latin1 = ContentFile("ñandú@test.com,1".encode("latin-1"), name="x.csv")
+        self.assertEqual(client.post(url, {"file": latin1}, format="multipart").status_code, 400)
+        client.force_authenticate(self.teacher)
+        self.assertEqual(client.post(url, {}, format="multipart").status_code, 403)
+
+        path = os.path.join(tempfile.mkdtemp(), "inscripciones.csv")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(self.csv()))
+        out = io.StringIO()
+        call_command("import_enrollments", path, stdout=out, stderr=io.StringIO())
+        self.assertIn("created=0, existing=4", out.getvalue())
+
+
+class AsyncReadViewParityTests(TestCase):
+    """Las vistas async (ASYNC_READ_VIEWS) responden lo mismo que sus pares síncronas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(students=20, teachers=2, courses=3, courses_per_student=2, resources_per_block=0)
+        cls.student = User.objects.get(email="student0@bench.test")
+        cls.other = User.objects.get(email="student1@bench.test")
+        cls.teacher = User.objects.get(email="teacher0@bench.test")
+
+    def setUp(self):
+        cache.clear()
+        rebuild_student_index()
+
+    def compare(self, sync_view, async_view, user=None, token=None, data=None, method="get", **kwargs):
+        """Ejecuta las dos vistas con la misma request; devuelve la respuesta síncrona."""
+        headers = {}
+        if user is not None:
+            token = str(RefreshToken.for_user(user).access_token)
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+
+        sync_request = getattr(APIRequestFactory(), method)("/", data, headers=headers)
+        expected = sync_view.as_view()(sync_request, **kwargs)
+        expected.render()
+        async_request = getattr(AsyncRequestFactory(), method)("/", data, headers=headers)
+        got = async_to_sync(async_view.as_view())(async_request, **kwargs)
+
+        self.assertEqual(got.status_code, expected.status_code)
+        self.assertEqual(json.loads(got.content), json.loads(expected.content))
+        for header in ("ETag", "Last-Modified", "WWW-Authenticate"):
+            self.assertEqual(got.get(header), expected.get(header), header)
+        if expected.status_code == 405:
+            # DRF manda Allow en todas las respuestas; la vista async solo en el 405
+            self.assertEqual(got["Allow"], expected["Allow"])
+        return expected
+
+    def test_student_courses(self):
+        response = self.compare(StudentCourseListView, AsyncStudentCourseListView, self.student)
+        self.assertEqual((response.status_code, len(response.data)), (200, 2))
+        self.assertEqual(self.compare(StudentCourseListView, AsyncStudentCourseListView, self.teacher).status_code, 403)
+
+    def test_ranking(self):
+        response = self.compare(RankingView, AsyncRankingView, self.student, data={"page_size": 5})
+        self.compare(RankingView, AsyncRankingView, self.student, data={"cursor": response.data["next_cursor"]})
+        self.compare(RankingView, AsyncRankingView, self.student, data={"search": "student1"})
+        self.compare(RankingView, AsyncRankingView, self.student, data={"around": 2})
+        self.assertEqual(self.compare(RankingView, AsyncRankingView, self.student, data={"around": "x"}).status_code, 400)
+        self.assertEqual(self.compare(RankingView, AsyncRankingView, self.teacher, data={"around": 2}).status_code, 400)
+        self.assertEqual(self.compare(RankingView, AsyncRankingView, self.student, data={"cursor": "x"}).status_code, 400)
+
+    def test_grades(self):
+        data = {"student_id": str(self.student.pk)}
+        self.assertEqual(len(self.compare(StudentGradesView, AsyncStudentGradesView, self.student, data=data).data), 2)
+        self.assertEqual(self.compare(StudentGradesView, AsyncStudentGradesView, self.student).status_code, 400)
+
+    def test_profile(self):
+        for user, target in ((self.student, self.student), (self.student, self.other), (None, self.student)):
+            response = self.compare(ProfileView, AsyncProfileView, user, user_id=target.pk)
+            self.assertEqual(response.status_code, 200)
+        missing = "00000000-0000-0000-0000-000000000000"
+        self.assertEqual(self.compare(ProfileView, AsyncProfileView, self.student, user_id=missing).status_code, 404)
+        # Token inválido: el perfil es público en ambas
+        self.compare(ProfileView, AsyncProfileView, token="nope", user_id=self.student.pk)
+
+    def test_method_not_allowed(self):
+        for method in ("post", "put", "delete"):
+            response = self.compare(RankingView, AsyncRankingView, self.student, method=method)
+            self.assertEqual(response.status_code, 405, method)
+        # Sin credenciales se responde 401 antes de mirar el método, como en DRF
+        self.assertEqual(self.compare(RankingView, AsyncRankingView, method="post").status_code, 401)
+        self.assertEqual(
+            self.compare(ProfileView, AsyncProfileView, self.student, method="post", user_id=self.student.pk).status_code,
+            405,
+        )
+
+    def test_authentication_errors(self):
+        for view, async_view in ((StudentCourseListView, AsyncStudentCourseListView), (RankingView, AsyncRankingView)):
+            self.assertEqual(self.compare(view, async_view).status_code, 401)
+            self.assertEqual(self.compare(view, async_view, token="nope").status_code, 401)
@@ -0,0 +1,31 @@
+"""
+Carga del árbol de un curso (módulos → semanas → recursos) en un número fijo
+de consultas, independiente de cuántas semanas o recursos tenga el curso.
+
+Estudiante: 1 consulta (inscripción + curso + profesor) + 3 prefetch = 4
+Profesor:   1 consulta (curso + profesor) + 3 prefetch = 4
+"""
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+
+from .models import Course, CourseBlock, Enrollment, Module
+
+
+def module_tree_prefetch(prefix=""):
+    blocks = CourseBlock.objects.prefetch_related("resources")
+    modules = Module.objects.prefetch_related(Prefetch("blocks", queryset=blocks))
+    return Prefetch(f"{prefix}modules", queryset=modules)
+
+
+def load_student_course(student, course_id):
+    """Inscripción del estudiante con el árbol del curso ya cargado (404 si no está inscrito)."""
+    queryset = Enrollment.objects.select_related("course__teacher").prefetch_related(
+        module_tree_prefetch("course__")
+    )
+    return get_object_or_404(queryset, student=student, course_id=course_id)
+
+
+def load_teacher_course(teacher, course_id):
+    """Curso del profesor con su árbol ya cargado (404 si no le pertenece)."""
+    queryset = Course.objects.select_related("teacher").prefetch_related(module_tree_prefetch())
+    return get_object_or_404(queryset, id=course_id, teacher=teacher)
@@ -0,0 +1,289 @@
+"""
+Subidas de recursos por partes y almacenamiento direccionado por contenido.
+
+Protocolo (parecido a tus):
+  1. POST  .../blocks/<semana>/uploads/  {title, filename, size, sha256?} -> upload_id
+  2. PATCH /api/courses/uploads/<id>/    Upload-Offset: <n>, cuerpo = bytes de la parte
+  3. HEAD  /api/courses/uploads/<id>/    -> Upload-Offset para retomar tras un corte
+
+Cada parte se escribe en disco a medida que llega y se va hasheando, sin
+cargarla entera en memoria. Al completarse, el archivo se guarda una sola
+vez por SHA-256 (StoredFile) y los Resource que suben los mismos bytes
+comparten ese archivo. El hash siempre lo calcula el servidor sobre los
+bytes recibidos: el sha256 que declara el cliente solo se verifica, y
+únicamente evita la subida si el mismo profesor ya tiene ese archivo. StoredFile.ref_count cuenta los Resource que lo usan;
+al llegar a 0 se borran la fila y el archivo.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import Resource, StoredFile, UploadSession
+
+logger = logging.getLogger(__name__)
+
+IO_CHUNK_SIZE = 64 * 1024
+# Partes más chicas que esto se reciben en memoria; las más grandes, en disco
+SPOOL_MEMORY_SIZE = 1024 * 1024
+MAX_CACHED_HASHERS = 256
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    def __init__(self, offset):
+        super().__init__(f"Expected offset {offset}")
+        self.offset = offset
+
+
+class PartFile(File):
+    """Archivo ya escrito en disco: FileSystemStorage lo mueve en vez de copiarlo."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+# ---------------------------
+# Almacenamiento por contenido
+# ---------------------------
+def blob_name(digest, filename=""):
+    extension = os.path.splitext(filename)[1].lower()[:10]
+    return f"blobs/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def find_blob(digest):
+    return StoredFile.objects.select_for_update().filter(sha256=digest).first()
+
+
+def find_owned_blob(digest, user):
+    """
+    StoredFile de ese hash solo si user ya subió un recurso con él. El hash
+    lo declara el cliente: sin esta condición bastaría conocerlo para
+    adjuntar (y descargar) el archivo de otro curso.
+    """
+    owned = Resource.objects.filter(blob=OuterRef("pk"), uploaded_by=user)
+    return StoredFile.objects.select_for_update().filter(Exists(owned), sha256=digest).first()
+
+
+def store_blob(digest, size, filename, content):
+    """
+    Devuelve el StoredFile de ese hash, guardando content solo si no existía.
+    Debe llamarse dentro de una transacción: la fila queda bloqueada hasta
+    que el Resource que la referencia se crea (ver purge_blobs).
+    """
+    blob = find_blob(digest)
+    if blob is not None:
+        return blob
+
+    name = default_storage.save(blob_name(digest, filename), content)
+    try:
+        with transaction.atomic():
+            return StoredFile.objects.create(
+                sha256=digest,
+                file=name,
+                size=size,
+                content_type=mimetypes.guess_type(filename)[0] or "",
+            )
+    except IntegrityError:
+        # Otra subida de los mismos bytes creó la fila primero: se usa esa
+        default_storage.delete(name)
+        return find_blob(digest)
+
+
+def attach_blob(blob, block, user, title, filename):
+    # post_save de Resource incrementa ref_count
+    return Resource.objects.create(
+        block=block,
+        uploaded_by=user,
+        title=title,
+        file=blob.file.name,
+        blob=blob,
+        filename=filename,
+    )
+
+
+def store_uploaded_file(block, user, title, uploaded):
+    """Subida de una sola vez (request.FILES) usando el mismo almacenamiento."""
+    hasher = hashlib.sha256()
+    for chunk in uploaded.chunks(IO_CHUNK_SIZE):
+        hasher.update(chunk)
+    uploaded.seek(0)
+    with transaction.atomic():
+        blob = store_blob(hasher.hexdigest(), uploaded.size, uploaded.name, uploaded)
+        return attach_blob(blob, block, user, title, uploaded.name)
+
+
+def release_blob(blob_id):
+    StoredFile.objects.filter(pk=blob_id, ref_count__gt=0).update(ref_count=F("ref_count") - 1)
+    transaction.on_commit(lambda: purge_blobs([blob_id]))
+
+
+def purge_blobs(blob_ids=None):
+    """Borra los StoredFile sin referencias (fila + archivo). Devuelve cuántos."""
+    referenced = Resource.objects.filter(blob__isnull=False).values("blob_id")
+    with transaction.atomic():
+        blobs = StoredFile.objects.select_for_update().filter(ref_count=0).exclude(pk__in=referenced)
+        if blob_ids is not None:
+            blobs = blobs.filter(pk__in=blob_ids)
+        blobs = list(blobs)
+        if not blobs:
+            return 0
+        StoredFile.objects.filter(pk__in=[blob.pk for blob in blobs]).delete()
+        names = [blob.file.name for blob in blobs]
+        transaction.on_commit(lambda: [default_storage.delete(name) for name in names])
+    return len(blobs)
+
+
+# ---------------------------
+# Subidas por partes
+# ---------------------------
+# Hash incremental por sesión, en memoria del proceso. Si una parte llega a
+# otro worker el hash se abandona y el archivo se hashea una sola vez al
+# completarse (file_digest), en vez de releerlo en cada parte. Las sesiones
+# abandonadas no pasan por discard_upload hasta expire_uploads, así que la
+# caché se acota: se descartan las entradas vencidas y, si aun así sobran,
+# las más viejas.
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+
+
+def part_path(session):
+    upload_dir = Path(settings.RESOURCE_UPLOAD_DIR)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    return upload_dir / f"{session.pk}.part"
+
+
+def _take_hasher(session):
+    """Hasher que ya cubre los primeros session.offset bytes, o None."""
+    if not session.offset:
+        return hashlib.sha256()
+    with _hashers_lock:
+        offset, updated_at, hasher = _hashers.pop(session.pk, (None, None, None))
+    return hasher if (offset, updated_at) == (session.offset, session.updated_at) else None
+
+
+def _keep_hasher(session, hasher):
+    cutoff = timezone.now() - timedelta(hours=settings.RESOURCE_UPLOAD_EXPIRY_HOURS)
+    with _hashers_lock:
+        _hashers[session.pk] = (session.offset, session.updated_at, hasher)
+        stale = [pk for pk, (_, updated_at, _) in _hashers.items() if updated_at < cutoff]
+        for pk in stale:
+            del _hashers[pk]
+        while len(_hashers) > MAX_CACHED_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def file_digest(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for data in iter(lambda: fh.read(IO_CHUNK_SIZE), b""):
+            hasher.update(data)
+    return hasher.hexdigest()
+
+
+def check_chunk(session, offset, length):
+    if offset != session.offset:
+        raise OffsetMismatch(session.offset)
+    if length <= 0 or length > settings.RESOURCE_UPLOAD_CHUNK_SIZE:
+        raise UploadError(f"Chunk size must be between 1 and {settings.RESOURCE_UPLOAD_CHUNK_SIZE} bytes")
+    if offset + length > session.size:
+        raise UploadError("Chunk exceeds the declared upload size")
+
+
+def spool_chunk(stream, length):
+    """
+    Lee la parte entera del cliente a un archivo temporal (en memoria si es
+    chica). Se llama antes de bloquear la sesión: un cliente lento no debe
+    retener el lock de la fila mientras manda los bytes.
+    """
+    upload_dir = Path(settings.RESOURCE_UPLOAD_DIR)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    chunk = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_SIZE, dir=upload_dir)
+    remaining = length
+    try:
+        while remaining:
+            data = stream.read(min(IO_CHUNK_SIZE, remaining))
+            if not data:
+                raise UploadError("Chunk ended before Content-Length bytes")
+            chunk.write(data)
+            remaining -= len(data)
+    except BaseException:
+        chunk.close()
+        raise
+    chunk.seek(0)
+    return chunk
+
+
+def write_chunk(session, offset, chunk, length):
+    """
+    Agrega la parte ya recibida (spool_chunk) en offset y devuelve el Resource
+    si la subida quedó completa (None si faltan partes). El llamador debe tener
+    la sesión bloqueada (select_for_update) para que no se escriban dos partes a la vez.
+    """
+    check_chunk(session, offset, length)
+
+    path = part_path(session)
+    hasher = _take_hasher(session)
+    with open(path, "r+b" if offset else "wb") as fh:
+        # Descarta bytes de una parte anterior que no llegó completa
+        fh.seek(offset)
+        fh.truncate()
+        for data in iter(lambda: chunk.read(IO_CHUNK_SIZE), b""):
+            fh.write(data)
+            if hasher is not None:
+                hasher.update(data)
+
+    session.offset = offset + length
+    session.save(update_fields=["offset", "updated_at"])
+    if session.offset < session.size:
+        if hasher is not None:
+            _keep_hasher(session, hasher)
+        return None
+    return complete_upload(session, hasher.hexdigest() if hasher is not None else file_digest(path), path)
+
+
+def complete_upload(session, digest, path):
+    if session.sha256 and session.sha256 != digest:
+        discard_upload(session)
+        raise UploadError("Checksum mismatch, upload discarded")
+
+    with transaction.atomic():
+        with PartFile(open(path, "rb")) as content:
+            blob = store_blob(digest, session.size, session.filename, content)
+        resource = attach_blob(blob, session.block, session.uploaded_by, session.title, session.filename)
+        session.delete()
+    # Si el contenido ya existía, la parte no se movió: se borra
+    path.unlink(missing_ok=True)
+    return resource
+
+
+def discard_upload(session):
+    with _hashers_lock:
+        _hashers.pop(session.pk, None)
+    part_path(session).unlink(missing_ok=True)
+    session.delete()
+
+
+def expire_uploads(hours=None):
+    """Borra las sesiones abandonadas y sus archivos temporales."""
+    hours = settings.RESOURCE_UPLOAD_EXPIRY_HOURS if hours is None else hours
+    cutoff = timezone.now() - timedelta(hours=hours)
+    sessions = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+    for session in sessions:
+        discard_upload(session)
+    return len(sessions)
@@ -1,25 +1,45 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
-    StudentCourseListView, StudentCourseDetailView,
-    TeacherCourseListView, AddResourceView,
-    AdminCourseCreateView, TeacherCourseDetailView
+    StudentCourseListView, AsyncStudentCourseListView, StudentCourseDetailView, StudentCompleteBlockView,
+    StudentCourseLeaderboardView, TeacherCourseLeaderboardView,
+    TeacherCourseListView, TeacherCourseRosterView, TeacherAddPointsView, TeacherFinalizeCourseView,
+    AddResourceView, ResourceUploadCreateView, ResourceUploadView, ResourceDownloadView,
+    AdminCourseCreateView, AdminEnrollmentImportView, TeacherCourseDetailView
 )
 
+StudentCourseList = AsyncStudentCourseListView if settings.ASYNC_READ_VIEWS else StudentCourseListView
+
 urlpatterns = [
     # -------------------------
     # Student
     # -------------------------
-    path("student/courses/", StudentCourseListView.as_view(), name="student-courses"),
+    path("student/courses/", StudentCourseList.as_view(), name="student-courses"),
     path("student/courses/<int:course_id>/", StudentCourseDetailView.as_view(), name="student-course-detail"),
+    path(
+        "student/courses/<int:course_id>/blocks/<int:week_number>/complete/",
+        StudentCompleteBlockView.as_view(),
+        name="student-complete-block",
+    ),
+    path(
+        "student/courses/<int:course_id>/leaderboard/",
+        StudentCourseLeaderboardView.as_view(),
+        name="student-course-leaderboard",
+    ),
 
     # -------------------------
     # Teacher
     # -------------------------
     path("teacher/courses/", TeacherCourseListView.as_view(), name="teacher-courses"),
     path("teacher/courses/<int:course_id>/", TeacherCourseDetailView.as_view(), name="teacher-course-detail"),
-    path("teacher/courses/<int:course_id>/students/", TeacherCourseListView.as_view(), name="teacher-course-students"),
-    path("teacher/courses/<int:course_id>/add-points/", TeacherCourseListView.as_view(), name="teacher-course-add-points"),
-    path("teacher/courses/<int:course_id>/finalize/", TeacherCourseListView.as_view(), name="teacher-course-finalize"),
+    path("teacher/courses/<int:course_id>/students/", TeacherCourseRosterView.as_view(), name="teacher-course-students"),
+    path(
+        "teacher/courses/<int:course_id>/leaderboard/",
+        TeacherCourseLeaderboardView.as_view(),
+        name="teacher-course-leaderboard",
+    ),
+    path("teacher/courses/<int:course_id>/add-points/", TeacherAddPointsView.as_view(), name="teacher-course-add-points"),
+    path("teacher/courses/<int:course_id>/finalize/", TeacherFinalizeCourseView.as_view(), name="teacher-course-finalize"),
 
 
 
@@ -31,9 +51,21 @@ urlpatterns = [
         AddResourceView.as_view(),
         name="add-resource",
     ),
+    path(
+        "teacher/courses/<int:course_id>/blocks/<int:week_number>/uploads/",
+        ResourceUploadCreateView.as_view(),
+        name="resource-upload-create",
+    ),
+    path("uploads/<uuid:upload_id>/", ResourceUploadView.as_view(), name="resource-upload"),
+
+    # -------------------------
+    # Resources (descarga protegida)
+    # -------------------------
+    path("resources/<int:resource_id>/download/", ResourceDownloadView.as_view(), name="resource-download"),
 
     # -------------------------
     # Admin
     # -------------------------
     path("admin/courses/create/", AdminCourseCreateView.as_view(), name="admin-create-course"),
+    path("admin/enrollments/import/", AdminEnrollmentImportView.as_view(), name="admin-import-enrollments"),
 ]
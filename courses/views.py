@@ -1,10 +1,42 @@
+import io
+import os
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions
+from rest_framework import permissions, serializers, status
+from django.db.models import Avg, Count, Exists, F, Max, OuterRef, Q
+from django.utils import timezone
+
+from plataform_back.async_views import AsyncAPIView, json_response
+from plataform_back.conditional import make_etag, not_modified, with_validators
+from plataform_back.instrumentation import timing
+from grades.finalize import finalize_courses
+from ranking.rank_index import course_leaderboard, course_rank, sync_course_merits
+from plataform_back.pagination import InvalidCursor, decode_typed_cursor, encode_cursor, get_page_size
+
+from .models import Course, Enrollment, CourseBlock, Resource, UploadSession
+from .serializers import CourseSerializer, ResourceSerializer, CourseCreateSerializer, MeritPointsRowSerializer
+from .cache import enrollment_state, get_course_tree, get_version
+from .downloads import serve_resource
+from .imports import import_enrollments
+from .progress import BlockLocked, complete_block
+from .tree import load_student_course, load_teacher_course
+from .uploads import (
+    OffsetMismatch, UploadError, attach_blob, check_chunk, discard_upload, find_owned_blob, spool_chunk,
+    store_uploaded_file, write_chunk,
+)
+
+User = get_user_model()
 
-from .models import Course, Enrollment, CourseBlock, Resource
-from .serializers import CourseSerializer, ResourceSerializer, CourseCreateSerializer
+LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
 
 # -----------------------
 # 🔒 Custom Permissions
@@ -27,61 +59,376 @@ class IsAdmin(permissions.BasePermission):
 # -----------------------
 # 👩‍🎓 Student Views
 # -----------------------
+def student_course_aggregates():
+    """Agregados (count, max updated_at) que sirven de ETag/Last-Modified del listado."""
+    return {
+        "count": Count("id"),
+        "course_updated": Max("course__updated_at"),
+        "enrollment_updated": Max("updated_at"),
+    }
+
+
+def student_course_etag(user, validators):
+    last_modified = max(filter(None, [validators["course_updated"], validators["enrollment_updated"]]), default=None)
+    return make_etag("student-courses", user.pk, *validators.values()), last_modified
+
+
+def student_course_entry(enrollment):
+    return {
+        "id": enrollment.course.id,
+        "title": enrollment.course.title,
+        "description": enrollment.course.description,
+        "duration": enrollment.course.duration,
+        "level": enrollment.course.level,
+        "progress": enrollment.progress,
+        "status": "Completed" if enrollment.completed else "In Progress",
+    }
+
+
 class StudentCourseListView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
+    query_budget = 3
 
     def get(self, request):
+        # Validadores en una sola consulta agregada, sin armar el listado
+        validators = Enrollment.objects.filter(student=request.user).aggregate(**student_course_aggregates())
+        etag, last_modified = student_course_etag(request.user, validators)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
         enrollments = Enrollment.objects.filter(student=request.user).select_related("course")
-        data = [
-            {
-                "id": e.course.id,
-                "title": e.course.title,
-                "description": e.course.description,
-                "duration": e.course.duration,
-                "level": e.course.level,
-                "progress": getattr(e, "progress", 0),
-                "status": "Completed" if e.completed else "In Progress",
-            }
-            for e in enrollments
-        ]
-        return Response(data, status=status.HTTP_200_OK)
+        data = [student_course_entry(e) for e in enrollments]
+        return with_validators(Response(data, status=status.HTTP_200_OK), etag, last_modified)
+
+
+class AsyncStudentCourseListView(AsyncAPIView):
+    """Versión async de StudentCourseListView (ASGI)."""
+    required_role = "student"
+    query_budget = 3
+    role_message = IsStudent.message
+
+    async def get(self, request):
+        validators = await Enrollment.objects.filter(student=request.user).aaggregate(**student_course_aggregates())
+        etag, last_modified = student_course_etag(request.user, validators)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        enrollments = Enrollment.objects.filter(student=request.user).select_related("course")
+        data = [student_course_entry(e) async for e in enrollments]
+        return with_validators(json_response(data), etag, last_modified)
+
 
 class StudentCourseDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
+    query_budget = 6
+
+    def get(self, request, course_id):
+        enrollment = get_object_or_404(
+            Enrollment.objects.select_related("course"), student=request.user, course_id=course_id
+        )
+
+        # La versión de la caché cambia con cualquier cambio del árbol del curso
+        state = enrollment_state(enrollment)
+        etag = make_etag("course", course_id, get_version(course_id), state)
+        last_modified = max(enrollment.course.updated_at, enrollment.updated_at)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        def build():
+            tree = load_student_course(request.user, course_id)
+            with timing("serialize"):
+                return CourseSerializer(tree.course, context={"enrollment": tree}).data
+
+        data = get_course_tree(course_id, state, build)
+        return with_validators(Response(data, status=status.HTTP_200_OK), etag, last_modified)
+
+
+class StudentCompleteBlockView(APIView):
+    """
+    POST /api/courses/student/courses/<course_id>/blocks/<week_number>/complete/
+    Marca la semana como completada (en orden) y devuelve el avance del curso.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+    query_budget = 9
+
+    def post(self, request, course_id, week_number):
+        enrollment = get_object_or_404(Enrollment, student=request.user, course_id=course_id)
+        block = get_object_or_404(
+            CourseBlock.objects.select_related("module"), module__course_id=course_id, week_number=week_number
+        )
+        try:
+            created = complete_block(enrollment, block)
+        except BlockLocked as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            "course_id": course_id,
+            "week_number": week_number,
+            "completed_weeks": enrollment.completed_weeks,
+            "progress": enrollment.progress,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+def leaderboard_size(params):
+    return max(1, min(int(params.get("top", LEADERBOARD_SIZE)), MAX_LEADERBOARD_SIZE))
+
+
+def leaderboard_entries(course_id, size):
+    """Los primeros del curso por merit_points (índice de ranking + una consulta de nombres)."""
+    top = course_leaderboard(course_id, size)
+    students = User.objects.only("id", "username", "first_name", "last_name").in_bulk(
+        [student_id for student_id, _, _ in top]
+    )
+    entries = []
+    for student_id, merit_points, rank in top:
+        student = students.get(uuid.UUID(str(student_id)))
+        if student is None:
+            continue
+        entries.append({
+            "student_id": str(student.id),
+            "username": student.username,
+            "first_name": student.first_name,
+            "last_name": student.last_name,
+            "merit_points": merit_points,
+            "rank": rank,
+        })
+    return entries
+
+
+class StudentCourseLeaderboardView(APIView):
+    """
+    GET /api/courses/student/courses/<course_id>/leaderboard/?top=<k>
+    Los k primeros del curso por merit_points y la posición del estudiante.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+    query_budget = 3
 
     def get(self, request, course_id):
         enrollment = get_object_or_404(Enrollment, student=request.user, course_id=course_id)
-        serializer = CourseSerializer(enrollment.course)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        try:
+            size = leaderboard_size(request.query_params)
+        except ValueError:
+            return Response({"error": "top must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "course_id": course_id,
+            "leaderboard": leaderboard_entries(course_id, size),
+            "me": {
+                "merit_points": enrollment.merit_points,
+                "rank": course_rank(course_id, enrollment.merit_points),
+            },
+        }, status=status.HTTP_200_OK)
+
 
 # -----------------------
 # 👨‍🏫 Teacher Views
 # -----------------------
+def with_roster_stats(courses):
+    """Agregados por curso calculados en SQL (una sola consulta)."""
+    return courses.annotate(
+        enrolled=Count("enrollment"),
+        completed=Count("enrollment", filter=Q(enrollment__completed=True)),
+        avg_merit_points=Avg("enrollment__merit_points"),
+    )
+
+
+def course_stats(course):
+    return {
+        "enrolled": course.enrolled,
+        "completed": course.completed,
+        "avg_merit_points": round(course.avg_merit_points or 0, 2),
+    }
+
+
+def roster_entry(enrollment):
+    return {
+        "student_id": enrollment.student.id,
+        "student_name": enrollment.student.username,
+        "completed": enrollment.completed,
+        "merit_points": enrollment.merit_points,
+    }
+
+
 class TeacherCourseListView(APIView):
+    """
+    GET /api/courses/teacher/courses/
+    Cursos del profesor con sus agregados (una consulta). Los estudiantes de
+    cada curso se listan paginados en students_url (TeacherCourseRosterView).
+    """
     permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    query_budget = 2
 
     def get(self, request):
         # Filtrar por campo teacher, no created_by
-        courses = Course.objects.filter(teacher=request.user)
-        data = []
-        for course in courses:
-            students = Enrollment.objects.filter(course=course)
-            data.append({
+        courses = with_roster_stats(Course.objects.filter(teacher=request.user))
+        data = [
+            {
                 "id": course.id,
                 "title": course.title,
                 "duration": course.duration,  # no duration_weeks
                 "level": course.level,
-                "students": [
-                    {
-                        "student_id": s.student.id,
-                        "student_name": s.student.username,
-                        "completed": s.completed,
-                        "merit_points": s.merit_points
-                    } for s in students
-                ]
-            })
+                "stats": course_stats(course),
+                "students_url": reverse("teacher-course-students", args=[course.id]),
+            }
+            for course in courses
+        ]
         return Response(data, status=status.HTTP_200_OK)
 
+
+class TeacherCourseRosterView(APIView):
+    """
+    GET /api/courses/teacher/courses/<course_id>/students/?cursor=<cursor>&page_size=<n>
+    Estudiantes del curso paginados por cursor (username, id) + agregados del curso.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    query_budget = 3
+
+    def get(self, request, course_id):
+        course = get_object_or_404(with_roster_stats(Course.objects.filter(teacher=request.user)), id=course_id)
+
+        enrollments = Enrollment.objects.filter(course=course).select_related("student")
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            try:
+                username, enrollment_id = decode_typed_cursor(cursor, str, int)
+            except InvalidCursor:
+                return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+            enrollments = enrollments.filter(
+                Q(student__username__gt=username) |
+                Q(student__username=username, id__gt=enrollment_id)
+            )
+
+        page_size = get_page_size(request)
+        page = list(enrollments.order_by("student__username", "id")[:page_size + 1])
+        next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            next_cursor = encode_cursor([page[-1].student.username, page[-1].id])
+
+        return Response({
+            "id": course.id,
+            "title": course.title,
+            "stats": course_stats(course),
+            "students": [roster_entry(e) for e in page],
+            "next_cursor": next_cursor,
+        }, status=status.HTTP_200_OK)
+
+
+class TeacherCourseLeaderboardView(APIView):
+    """
+    GET /api/courses/teacher/courses/<course_id>/leaderboard/?top=<k>
+    Los k primeros del curso por merit_points.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    query_budget = 3
+
+    def get(self, request, course_id):
+        get_object_or_404(Course.objects.only("id"), id=course_id, teacher=request.user)
+        try:
+            size = leaderboard_size(request.query_params)
+        except ValueError:
+            return Response({"error": "top must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "course_id": course_id,
+            "leaderboard": leaderboard_entries(course_id, size),
+        }, status=status.HTTP_200_OK)
+
+
+class TeacherAddPointsView(APIView):
+    """
+    POST /api/courses/teacher/courses/<course_id>/add-points/
+    Body:
+    {
+        "points": [{"student_id": "<uuid>", "delta": 5}, ...]
+    }
+    - Cada fila se valida con MeritPointsRowSerializer: un delta no entero
+      (2.7, "2.7", true) deja esa fila como invalid, con sus errores
+    - Valida todo el lote contra el curso en una consulta
+    - Aplica los deltas en una sola transacción con un único UPDATE (bulk_update)
+    - Devuelve el resultado de cada fila
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    MAX_BATCH = 1000
+
+    def post(self, request, course_id):
+        course = get_object_or_404(Course, id=course_id, teacher=request.user)
+        rows = request.data.get("points")
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "points must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.MAX_BATCH:
+            return Response({"error": f"At most {self.MAX_BATCH} rows per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        row_serializer = MeritPointsRowSerializer()
+        results = []
+        deltas = {}
+        for row in rows:
+            try:
+                data = row_serializer.run_validation(row)
+            except serializers.ValidationError as exc:
+                raw_id = row.get("student_id") if isinstance(row, dict) else None
+                results.append({"student_id": raw_id, "status": "invalid", "errors": exc.detail})
+                continue
+            student_id, delta = data["student_id"], data["delta"]
+            if student_id in deltas:
+                results.append({"student_id": str(student_id), "status": "duplicate"})
+                continue
+            deltas[student_id] = delta
+            results.append({"student_id": str(student_id), "delta": delta, "status": "pending"})
+
+        with transaction.atomic():
+            enrollments = list(
+                Enrollment.objects.select_for_update().filter(course=course, student_id__in=deltas)
+            )
+            now = timezone.now()
+            for enrollment in enrollments:
+                enrollment.merit_points = F("merit_points") + deltas[enrollment.student_id]
+                enrollment.updated_at = now
+            Enrollment.objects.bulk_update(enrollments, ["merit_points", "updated_at"])
+            merit_points = dict(
+                Enrollment.objects.filter(pk__in=[e.pk for e in enrollments]).values_list("student_id", "merit_points")
+            )
+            # bulk_update no dispara post_save: el leaderboard del curso se actualiza aquí
+            transaction.on_commit(lambda: sync_course_merits(course.id, list(merit_points.items())))
+
+        for result in results:
+            if result["status"] != "pending":
+                continue
+            student_id = uuid.UUID(result["student_id"])
+            if student_id in merit_points:
+                result.update(status="ok", merit_points=merit_points[student_id])
+            else:
+                result["status"] = "not_enrolled"
+
+        return Response({
+            "course_id": course.id,
+            "updated": len(merit_points),
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
+
+class TeacherFinalizeCourseView(APIView):
+    """
+    POST /api/courses/teacher/courses/<course_id>/finalize/
+    - Marca como completadas las inscripciones que aprobaron todos los módulos
+    - Una consulta agregada + un UPDATE; repetirlo no cambia nada
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+
+    def post(self, request, course_id):
+        course = get_object_or_404(Course, id=course_id, teacher=request.user)
+        finalized = finalize_courses([course.id])
+        course = with_roster_stats(Course.objects.filter(id=course.id)).get()
+        return Response({
+            "course_id": course.id,
+            "finalized": finalized,
+            **course_stats(course),
+        }, status=status.HTTP_200_OK)
+
+
 # -----------------------
 # 🛠 Admin Course Creation
 # -----------------------
@@ -96,28 +443,238 @@ class AdminCourseCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AdminEnrollmentImportView(APIView):
+    """
+    POST /api/courses/admin/enrollments/import/
+    multipart: file = CSV con filas "email,course_id" (cabecera opcional)
+    - Se lee en streaming y se inserta por lotes (ver courses/imports.py)
+    - Devuelve el resumen: creadas, existentes, errores y filas/s
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"error": "file required"}, status=status.HTTP_400_BAD_REQUEST)
+        lines = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        try:
+            report = import_enrollments(lines)
+        except UnicodeDecodeError:
+            return Response({"error": "File must be UTF-8 encoded"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+
 # -----------------------
 # 📚 Resource Upload (Teacher)
 # -----------------------
+def get_teacher_block(teacher, course_id, week_number):
+    return get_object_or_404(
+        CourseBlock.objects.select_related("module"),
+        module__course_id=course_id,
+        module__course__teacher=teacher,
+        week_number=week_number,
+    )
+
+
+def upload_state(session):
+    return {
+        "upload_id": str(session.pk),
+        "offset": session.offset,
+        "size": session.size,
+        "chunk_size": settings.RESOURCE_UPLOAD_CHUNK_SIZE,
+    }
+
+
+def with_upload_headers(response, session):
+    response["Upload-Offset"] = str(session.offset)
+    response["Upload-Length"] = str(session.size)
+    response["Cache-Control"] = "no-store"
+    return response
+
+
 class AddResourceView(APIView):
+    """
+    POST /api/courses/teacher/courses/<course_id>/blocks/<week_number>/add-resource/
+    Subida de una sola vez (multipart). Para archivos grandes usar /uploads/.
+    """
     permission_classes = [permissions.IsAuthenticated, IsTeacher]
 
     def post(self, request, course_id, week_number):
-        block = get_object_or_404(CourseBlock, course_id=course_id, week_number=week_number)
+        block = get_teacher_block(request.user, course_id, week_number)
         title = request.data.get("title")
         file = request.FILES.get("file")
         if not title or not file:
             return Response({"error": "title and file required"}, status=status.HTTP_400_BAD_REQUEST)
-        resource = Resource.objects.create(block=block, uploaded_by=request.user, title=title, file=file)
+        resource = store_uploaded_file(block, request.user, title, file)
         serializer = ResourceSerializer(resource)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+
+class ResourceUploadCreateView(APIView):
+    """
+    POST /api/courses/teacher/courses/<course_id>/blocks/<week_number>/uploads/
+    Body:
+    {
+        "title": "Clase 1",
+        "filename": "clase1.mp4",
+        "size": 734003200,
+        "sha256": "<hex>"   # opcional
+    }
+    - Si el profesor ya subió un archivo con ese sha256 se crea el recurso sin subir nada
+    - Si no, devuelve upload_id para enviar las partes con PATCH
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+
+    def post(self, request, course_id, week_number):
+        block = get_teacher_block(request.user, course_id, week_number)
+        title = request.data.get("title")
+        filename = os.path.basename(str(request.data.get("filename") or ""))
+        sha256 = str(request.data.get("sha256") or "").lower()
+        try:
+            size = int(request.data.get("size"))
+        except (TypeError, ValueError):
+            size = 0
+        if not title or not filename:
+            return Response({"error": "title and filename required"}, status=status.HTTP_400_BAD_REQUEST)
+        if size <= 0 or size > settings.RESOURCE_UPLOAD_MAX_SIZE:
+            return Response(
+                {"error": f"size must be between 1 and {settings.RESOURCE_UPLOAD_MAX_SIZE} bytes"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if sha256 and (len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256)):
+            return Response({"error": "sha256 must be a hex digest"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if sha256:
+            with transaction.atomic():
+                blob = find_owned_blob(sha256, request.user)
+                if blob is not None and blob.size == size:
+                    resource = attach_blob(blob, block, request.user, title, filename)
+                    return Response(
+                        {"resource": ResourceSerializer(resource).data, "deduplicated": True},
+                        status=status.HTTP_201_CREATED,
+                    )
+
+        session = UploadSession.objects.create(
+            block=block, uploaded_by=request.user, title=title, filename=filename, size=size, sha256=sha256,
+        )
+        response = Response(upload_state(session), status=status.HTTP_201_CREATED)
+        response["Location"] = reverse("resource-upload", args=[session.pk])
+        return with_upload_headers(response, session)
+
+
+class ResourceUploadView(APIView):
+    """
+    GET/HEAD /api/courses/uploads/<upload_id>/
+    - Offset actual, para retomar una subida cortada
+
+    PATCH /api/courses/uploads/<upload_id>/
+    Headers: Upload-Offset: <n>, Content-Length: <bytes de la parte>
+    - El cuerpo son los bytes crudos de la parte (application/offset+octet-stream)
+    - 204 mientras falten partes; 201 con el recurso al recibir la última
+
+    DELETE /api/courses/uploads/<upload_id>/
+    - Cancela la subida
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+
+    def get_session(self, request, upload_id, lock=False):
+        sessions = UploadSession.objects.filter(uploaded_by=request.user)
+        if lock:
+            sessions = sessions.select_for_update().select_related("block", "uploaded_by")
+        return get_object_or_404(sessions, pk=upload_id)
+
+    def offset_mismatch(self, exc, session):
+        return with_upload_headers(
+            Response({"error": "Offset mismatch", "offset": exc.offset}, status=status.HTTP_409_CONFLICT),
+            session,
+        )
+
+    def get(self, request, upload_id):
+        session = self.get_session(request, upload_id)
+        return with_upload_headers(Response(upload_state(session), status=status.HTTP_200_OK), session)
+
+    def patch(self, request, upload_id):
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "Upload-Offset and Content-Length headers required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Validación previa sin lock, para no leer un cuerpo que se va a rechazar
+        session = self.get_session(request, upload_id)
+        try:
+            check_chunk(session, offset, length)
+            # El cuerpo se lee directo del socket, sin pasar por los parsers de DRF,
+            # y entero antes de bloquear la sesión
+            chunk = spool_chunk(request.stream, length)
+        except OffsetMismatch as exc:
+            return self.offset_mismatch(exc, session)
+        except UploadError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        with chunk, transaction.atomic():
+            session = self.get_session(request, upload_id, lock=True)
+            try:
+                resource = write_chunk(session, offset, chunk, length)
+            except OffsetMismatch as exc:
+                return self.offset_mismatch(exc, session)
+            except UploadError as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if resource is None:
+            return with_upload_headers(Response(status=status.HTTP_204_NO_CONTENT), session)
+        return with_upload_headers(
+            Response({"resource": ResourceSerializer(resource).data}, status=status.HTTP_201_CREATED),
+            session,
+        )
+
+    def delete(self, request, upload_id):
+        with transaction.atomic():
+            discard_upload(self.get_session(request, upload_id, lock=True))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+# -----------------------
+# 📥 Resource Download
+# -----------------------
+class ResourceDownloadView(APIView):
+    """
+    GET /api/courses/resources/<resource_id>/download/
+    - Profesor del curso, estudiante inscrito o admin
+    - La transferencia la hace el servidor web (X-Accel-Redirect / X-Sendfile)
+      o Django con soporte de Range en modo local (ver courses/downloads.py)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, resource_id):
+        resources = Resource.objects.select_related("blob")
+        user = request.user
+        if user.role != "admin":
+            enrolled = Enrollment.objects.filter(course_id=OuterRef("block__module__course_id"), student=user)
+            resources = resources.filter(Q(block__module__course__teacher=user) | Q(Exists(enrolled)))
+        resource = get_object_or_404(resources, pk=resource_id)
+
+        response = serve_resource(request, resource)
+        if response is None:
+            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+        return response
+
+
 # 👨‍🏫 Detalle de curso para profesores
 class TeacherCourseDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    query_budget = 6
 
     def get(self, request, course_id):
         # Validamos que el curso le pertenezca al profesor
-        course = get_object_or_404(Course, id=course_id, teacher=request.user)
-        serializer = CourseSerializer(course)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if not Course.objects.filter(id=course_id, teacher=request.user).exists():
+            raise Http404
+
+        def build():
+            course = load_teacher_course(request.user, course_id)
+            with timing("serialize"):
+                return CourseSerializer(course).data
+
+        data = get_course_tree(course_id, enrollment_state(None), build)
+        return Response(data, status=status.HTTP_200_OK)
@@ -0,0 +1,53 @@
+"""
+Cierre de cursos basado en conjuntos.
+
+La elegibilidad se decide con una sola consulta agregada sobre ModuleGrade y
+se aplica con un único UPDATE, así que cerrar uno o cien cursos cuesta lo
+mismo en idas a la base de datos. Las inscripciones ya completadas no se
+tocan: ejecutarlo dos veces no cambia nada.
+"""
+from django.db.models import Avg, Count, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from courses.models import Enrollment, Module
+from .models import ModuleGrade
+
+# Escala 1-5: se aprueba con promedio >= 3 y todos los módulos calificados
+PASSING_GRADE = 3
+
+
+def eligible_enrollments(course_ids, passing_grade=PASSING_GRADE):
+    """
+    ids de inscripciones pendientes que cumplen los requisitos de cierre
+    (consulta agregada, se usa como subconsulta del UPDATE).
+    """
+    module_count = (
+        Module.objects.filter(course_id=OuterRef("enrollment__course_id"))
+        .order_by()
+        .values("course_id")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    return (
+        ModuleGrade.objects.filter(
+            enrollment__course_id__in=course_ids,
+            enrollment__completed=False,
+        )
+        .order_by()
+        .values("enrollment_id")
+        .annotate(
+            graded=Count("id", filter=Q(grade__gte=1)),
+            average=Avg("grade"),
+        )
+        .filter(graded=Subquery(module_count), average__gte=passing_grade)
+        .values("enrollment_id")
+    )
+
+
+def finalize_courses(course_ids, passing_grade=PASSING_GRADE):
+    """Marca como completadas las inscripciones elegibles. Devuelve cuántas cambiaron."""
+    now = timezone.now()
+    return Enrollment.objects.filter(
+        pk__in=eligible_enrollments(course_ids, passing_grade),
+        completed=False,
+    ).update(completed=True, completed_at=now, updated_at=now)
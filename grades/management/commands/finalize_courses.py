@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import Course
+from grades.finalize import PASSING_GRADE, finalize_courses
+
+
+class Command(BaseCommand):
+    help = "Cierra cursos: marca como completadas las inscripciones que aprobaron todos los módulos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("course_ids", nargs="*", type=int)
+        parser.add_argument("--all", action="store_true", help="Cierra todos los cursos")
+        parser.add_argument("--passing-grade", type=int, default=PASSING_GRADE)
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            course_ids = Course.objects.values_list("id", flat=True)
+        elif options["course_ids"]:
+            course_ids = options["course_ids"]
+        else:
+            raise CommandError("Indica ids de cursos o usa --all")
+
+        finalized = finalize_courses(course_ids, options["passing_grade"])
+        self.stdout.write(f"{finalized} inscripciones completadas")
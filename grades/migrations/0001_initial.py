@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('courses', '0008_module_courseblock_module'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModuleGrade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade', models.PositiveIntegerField(default=0)),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='module_grades', to='courses.enrollment')),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='courses.module')),
+            ],
+            options={
+                'unique_together': {('enrollment', 'module')},
+            },
+        ),
+    ]
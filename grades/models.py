@@ -1,9 +1,35 @@
+from collections import defaultdict
+
 from django.db import models
 from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from courses.models import Course, Module, Enrollment
 
 User = settings.AUTH_USER_MODEL
 
+class ModuleGradeManager(models.Manager):
+    def create_missing(self, enrollments):
+        """
+        Crea en bloque las notas (grade=0) que falten para las inscripciones dadas.
+        2 consultas sin importar cuántas inscripciones o módulos haya.
+        """
+        enrollments = list(enrollments)
+        modules_by_course = defaultdict(list)
+        course_ids = {enrollment.course_id for enrollment in enrollments}
+        for module_id, course_id in Module.objects.filter(course_id__in=course_ids).values_list("id", "course_id"):
+            modules_by_course[course_id].append(module_id)
+
+        return self.bulk_create(
+            [
+                self.model(enrollment_id=enrollment.pk, module_id=module_id)
+                for enrollment in enrollments
+                for module_id in modules_by_course[enrollment.course_id]
+            ],
+            ignore_conflicts=True,
+        )
+
+
 class ModuleGrade(models.Model):
     enrollment = models.ForeignKey(
         Enrollment,
@@ -16,6 +42,8 @@ class ModuleGrade(models.Model):
     )
     grade = models.PositiveIntegerField(default=0)  # escala 1-5
 
+    objects = ModuleGradeManager()
+
     class Meta:
         unique_together = ("enrollment", "module")
 
@@ -25,3 +53,12 @@ class ModuleGrade(models.Model):
 
     def __str__(self):
         return f"{self.enrollment.student.username} - {self.module} : {self.grade}"
+
+
+# ---------------------------
+# Signals
+# ---------------------------
+@receiver(post_save, sender=Enrollment)
+def create_enrollment_grades(sender, instance, created, **kwargs):
+    if created:
+        ModuleGrade.objects.create_missing([instance])
@@ -1,3 +1,131 @@
-from django.test import TestCase
+import io
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from benchmarks.explain import QueryPlanAssertions
+from benchmarks.seed import seed_dataset
+from courses.models import Course, Enrollment, Module
+from students.models import User
+from .finalize import finalize_courses
+from .models import ModuleGrade
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class StudentGradesTests(QueryPlanAssertions, TestCase):
+    """Notas del estudiante sobre el dataset de los benchmarks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(students=20, teachers=2, courses=4, courses_per_student=2, resources_per_block=0)
+        cls.student = User.objects.get(email="student0@bench.test")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_grades_match_module_grades(self):
+        response = self.client.get(reverse("student-grades"), {"student_id": str(self.student.pk)})
+        self.assertEqual(response.status_code, 200)
+
+        expected = {
+            (str(course_id), number): grade
+            for course_id, number, grade in ModuleGrade.objects.filter(enrollment__student=self.student)
+            .values_list("enrollment__course_id", "module__number", "grade")
+        }
+        data = response.json()
+        self.assertEqual(len(data), 2)
+        got = {(entry["course_id"], m["module_number"]): m["grade"] for entry in data for m in entry["modules"]}
+        self.assertEqual(got, expected)
+        self.assertEqual(len(got), 6)
+
+    def test_missing_grades_shown_as_zero(self):
+        enrollment = Enrollment.objects.filter(student=self.student).first()
+        enrollment.module_grades.filter(module__number=2).delete()
+        response = self.client.get(reverse("student-grades"), {"student_id": str(self.student.pk)})
+        entry = next(e for e in response.json() if e["course_id"] == str(enrollment.course_id))
+        self.assertEqual([m["module_number"] for m in entry["modules"]], [1, 2, 3])
+        self.assertEqual(entry["modules"][1]["grade"], 0)
+
+    def test_student_id_required(self):
+        response = self.client.get(reverse("student-grades"))
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_plans(self):
+        # Los módulos de varios cursos (course_id IN ...) se ordenan por número: pocas filas
+        self.assertPlansUseIndexes(
+            lambda: self.client.get(reverse("student-grades"), {"student_id": str(self.student.pk)}),
+            allow=['"courses_module"."course_id" IN'],
+        )
+
+
+class FinalizeCoursesTests(TestCase):
+    """Cierre de cursos: promedio y módulos calificados decididos en SQL, idempotente."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        cls.teacher = User.objects.create_user("teacher@test.com", "teacher", "x", role="teacher")
+        cls.course = Course.objects.create(title="Lógica", created_by=cls.admin, teacher=cls.teacher)
+        cls.other_course = Course.objects.create(title="Ética", created_by=cls.admin, teacher=cls.teacher)
+        cls.enrollments = {}
+        cases = {
+            "passed": [3, 3, 3],     # promedio justo en el mínimo
+            "high": [5, 4, 3],
+            "low": [5, 1, 1],        # promedio 2.33
+            "ungraded": [5, 5, 0],   # falta un módulo
+        }
+        for name, grades in cases.items():
+            student = User.objects.create_user(f"{name}@test.com", name, "x")
+            enrollment = Enrollment.objects.create(student=student, course=cls.course)
+            for grade, module_grade in zip(grades, enrollment.module_grades.order_by("module__number")):
+                module_grade.grade = grade
+                module_grade.save(update_fields=["grade"])
+            cls.enrollments[name] = enrollment
+        elsewhere = Enrollment.objects.create(student=cls.enrollments["low"].student, course=cls.other_course)
+        elsewhere.module_grades.update(grade=5)
+
+    def completed(self):
+        return set(
+            Enrollment.objects.filter(course=self.course, completed=True).values_list("student__username", flat=True)
+        )
+
+    def test_averages(self):
+        self.assertEqual(Module.objects.filter(course=self.course).count(), 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(finalize_courses([self.course.id]), 2)
+        self.assertEqual(self.completed(), {"passed", "high"})
+        self.assertFalse(Enrollment.objects.filter(course=self.other_course, completed=True).exists())
+        self.assertIsNotNone(Enrollment.objects.get(pk=self.enrollments["high"].pk).completed_at)
+
+    def test_passing_grade(self):
+        self.assertEqual(finalize_courses([self.course.id], passing_grade=4), 1)
+        self.assertEqual(self.completed(), {"high"})
+
+    def test_idempotent(self):
+        finalize_courses([self.course.id])
+        completed_at = Enrollment.objects.get(pk=self.enrollments["passed"].pk).completed_at
+        self.assertEqual(finalize_courses([self.course.id]), 0)
+        self.assertEqual(Enrollment.objects.get(pk=self.enrollments["passed"].pk).completed_at, completed_at)
+
+        # Una nota nueva habilita solo a esa inscripción
+        self.enrollments["ungraded"].module_grades.filter(grade=0).update(grade=3)
+        self.assertEqual(finalize_courses([self.course.id, self.other_course.id]), 2)
+        self.assertEqual(self.completed(), {"passed", "high", "ungraded"})
+
+    def test_view_and_command(self):
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.post(reverse("teacher-course-finalize", args=[self.course.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["finalized"], response.json()["completed"]), (2, 2))
+
+        out = io.StringIO()
+        call_command("finalize_courses", "--all", stdout=out)
+        self.assertIn("1 inscripciones completadas", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("finalize_courses", stdout=out)
@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.urls import path
-from .views import StudentGradesView
+from .views import AsyncStudentGradesView, StudentGradesView
+
+StudentGrades = AsyncStudentGradesView if settings.ASYNC_READ_VIEWS else StudentGradesView
 
 urlpatterns = [
     # Estudiante consulta sus cursos y notas
-    path('', StudentGradesView.as_view(), name='student-grades'),
+    path('', StudentGrades.as_view(), name='student-grades'),
 ]
@@ -1,16 +1,45 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from courses.models import Enrollment, Module
+from courses.models import Enrollment
+from plataform_back.async_views import AsyncAPIView, json_response
+from plataform_back.instrumentation import timing
 from .models import ModuleGrade
 from .serializers import StudentGradeSerializer
 
+def student_enrollments(student_id):
+    # Solo lectura: 3 consultas (inscripciones + módulos + notas), sin escrituras
+    return (
+        Enrollment.objects.filter(student_id=student_id)
+        .select_related("course")
+        .prefetch_related("course__modules", "module_grades")
+    )
+
+
+def grades_entry(enroll):
+    grades = {grade.module_id: grade for grade in enroll.module_grades.all()}
+    module_grades = []
+    for module in enroll.course.modules.all():
+        # Las notas que aún no existen se muestran como valor por defecto
+        grade = grades.get(module.id) or ModuleGrade(enrollment=enroll)
+        grade.module = module
+        module_grades.append(grade)
+
+    return {
+        "course_id": str(enroll.course.id),
+        "course_title": enroll.course.title,
+        "completed": enroll.completed,
+        "modules": module_grades
+    }
+
+
 class StudentGradesView(APIView):
     """
     GET /api/grades/?student_id=<id>
     Muestra los cursos y notas de módulos del estudiante.
     """
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 4
 
     def get(self, request):
         student_id = request.query_params.get("student_id")
@@ -18,23 +47,22 @@ class StudentGradesView(APIView):
         if not student_id:
             return Response({"error": "student_id is required"}, status=status.HTTP_400_BAD_REQUEST)
         
-        enrollments = Enrollment.objects.filter(student_id=student_id)
-        data = []
-
-        for enroll in enrollments:
-            # Crear notas si no existen
-            for module in enroll.course.modules.all():
-                ModuleGrade.objects.get_or_create(enrollment=enroll, module=module)
-
-            # Traer las notas de los módulos
-            module_grades = ModuleGrade.objects.filter(enrollment=enroll)
-
-            data.append({
-                "course_id": str(enroll.course.id),
-                "course_title": enroll.course.title,
-                "completed": enroll.completed,
-                "modules": module_grades
-            })
-
-        serializer = StudentGradeSerializer(data, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        entries = [grades_entry(e) for e in student_enrollments(student_id)]
+        with timing("serialize"):
+            data = StudentGradeSerializer(entries, many=True).data
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class AsyncStudentGradesView(AsyncAPIView):
+    """Versión async de StudentGradesView (ASGI)."""
+    query_budget = 4
+
+    async def get(self, request):
+        student_id = request.GET.get("student_id")
+        if not student_id:
+            return json_response({"error": "student_id is required"}, status=400)
+
+        entries = [grades_entry(e) async for e in student_enrollments(student_id)]
+        with timing("serialize"):
+            data = StudentGradeSerializer(entries, many=True).data
+        return json_response(data)
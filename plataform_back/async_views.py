@@ -0,0 +1,66 @@
+"""
+Base para las vistas async de lectura (modo ASGI).
+
+DRF 3.16 no ejecuta handlers async, así que estas vistas extienden la View
+de Django y replican lo que usan nuestras APIView: autenticación JWT
+cacheada (students/authentication.py), chequeo de rol y respuestas JSON con
+el mismo encoder y el mismo formato de error que DRF.
+
+Se activan con ASYNC_READ_VIEWS (ver los urls.py de cada app); bajo gunicorn
+con workers de uvicorn un worker atiende muchas requests mientras espera a
+Postgres o Redis, en vez de una por hilo.
+"""
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, JsonResponse
+from django.views import View
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from students.authentication import CachedJWTAuthentication
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
+
+
+class AsyncAPIView(View):
+    authentication_class = CachedJWTAuthentication
+    # None = acceso anónimo permitido; "any" = cualquier usuario autenticado
+    required_role = "any"
+    role_message = "You do not have permission to perform this action."
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            result = await self.authentication_class().aauthenticate(request)
+        except (InvalidToken, AuthenticationFailed) as exc:
+            return self.unauthorized(exc.detail)
+        request.user, request.auth = result if result else (AnonymousUser(), None)
+
+        if self.required_role is not None:
+            if not request.user.is_authenticated:
+                return self.unauthorized("Authentication credentials were not provided.")
+            if self.required_role != "any" and request.user.role != self.required_role:
+                return json_response({"detail": self.role_message}, status=403)
+
+        # Como DRF, el método se valida después de autenticar
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return self.method_not_allowed(request)
+
+        try:
+            return await handler(request, *args, **kwargs)
+        except Http404 as exc:
+            # Como el exception handler de DRF: el mensaje del Http404 si lo trae
+            return json_response({"detail": str(exc) or "Not found."}, status=404)
+
+    def method_not_allowed(self, request):
+        response = json_response({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+        response["Allow"] = ", ".join(self._allowed_methods())
+        return response
+
+    def unauthorized(self, detail):
+        # Mismo cuerpo que DRF: InvalidToken trae un dict, el resto un mensaje
+        body = detail if isinstance(detail, dict) else {"detail": detail}
+        response = json_response(body, status=401)
+        response["WWW-Authenticate"] = 'Bearer realm="api"'
+        return response
@@ -0,0 +1,31 @@
+"""
+GET condicional (ETag / Last-Modified) para vistas de DRF.
+
+Las vistas calculan validadores baratos (versiones, max(updated_at)) antes de
+construir el payload; si el cliente ya tiene esa versión se responde 304 sin
+serializar nada.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """Devuelve la respuesta 304/412 si los validadores coinciden, o None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def with_validators(response, etag=None, last_modified=None):
+    if etag:
+        response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # El cliente puede guardar la respuesta pero debe revalidar cada vez
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
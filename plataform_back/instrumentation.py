@@ -0,0 +1,178 @@
+"""
+Instrumentación por request: consultas SQL, tiempo en la base, aciertos de
+caché y tiempo de serialización.
+
+RequestMetricsMiddleware abre un RequestStats por request y al terminar:
+  - agrega el header Server-Timing (si REQUEST_METRICS_HEADER)
+  - registra histogramas por vista en plataform_back/metrics.py
+  - compara las consultas con el query_budget declarado en la vista; si se
+    excede lo registra en el log, o lanza QueryBudgetExceeded con
+    QUERY_BUDGET_STRICT (así los tests fallan)
+
+Las consultas se cuentan con un execute_wrapper instalado en cada conexión;
+como el RequestStats vive en un contextvar, también se cuentan las que
+corren en los hilos de sync_to_async de las vistas async.
+"""
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Tiempos con nombre (p. ej. "serialize"), en segundos
+        self.spans = {}
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        parts = [
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+        ]
+        parts += [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.spans.items()]
+        parts.append(f"total;dur={self.elapsed * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def current_stats():
+    return _current.get()
+
+
+# ---------------------------
+# Registro desde el código de la app
+# ---------------------------
+def record_cache(hit):
+    stats = _current.get()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+@contextmanager
+def timing(name):
+    """Suma el tiempo del bloque al span name del request actual."""
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.spans[name] = stats.spans.get(name, 0.0) + time.perf_counter() - started
+
+
+# ---------------------------
+# Conteo de consultas
+# ---------------------------
+def count_queries(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def install_query_counter(connection):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+@receiver(connection_created)
+def on_connection_created(sender, connection, **kwargs):
+    install_query_counter(connection)
+
+
+# ---------------------------
+# Middleware
+# ---------------------------
+class RequestMetricsMiddleware:
+    # Híbrido: bajo ASGI no debe envolverse en sync_to_async (serializaría las
+    # vistas async en el hilo único de thread_sensitive)
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    def start(self):
+        # Conexiones abiertas antes de cargar este módulo (p. ej. la de los tests)
+        for connection in connections.all():
+            install_query_counter(connection)
+        stats = RequestStats()
+        return stats, _current.set(stats)
+
+    def finish(self, request, response, stats):
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unmatched"
+        elapsed = stats.elapsed
+        metrics.observe("http_request_duration_seconds", elapsed, view=view, method=request.method)
+        metrics.observe("http_request_db_queries", stats.queries, buckets=QUERY_COUNT_BUCKETS, view=view)
+        metrics.incr("http_request_db_seconds_total", stats.db_time, view=view)
+        if settings.REQUEST_METRICS_HEADER:
+            response["Server-Timing"] = stats.server_timing()
+
+        budget = getattr(request, "query_budget", None)
+        if budget is not None and stats.queries > budget:
+            metrics.incr("query_budget_violations_total", view=view)
+            message = f"{view}: {stats.queries} queries, budget is {budget} ({request.method} {request.path})"
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning("Query budget exceeded: %s", message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # query_budget se declara como atributo de la clase de la vista
+        view_class = getattr(view_func, "view_class", None) or getattr(view_func, "cls", None)
+        request.query_budget = getattr(view_class, "query_budget", None)
@@ -0,0 +1,95 @@
+"""
+Métricas en proceso expuestas en formato de texto de Prometheus (GET /metrics/).
+Cada worker expone sus propios contadores e histogramas; Prometheus los suma al consultar.
+
+El endpoint no es público: responde a las IPs de METRICS_ALLOWED_IPS o a
+quien mande "Authorization: Bearer <METRICS_TOKEN>" (bearer_token en el
+scrape_config de Prometheus).
+"""
+import bisect
+import hmac
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_histograms = {}
+
+# Segundos: de 5 ms a 10 s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def incr(name, value=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] += value
+
+
+def get_counter(name, **labels):
+    return _counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    """Registra value en el histograma name (buckets acumulativos al exponer)."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": buckets, "counts": [0] * (len(buckets) + 1), "sum": 0.0}
+        histogram["counts"][bisect.bisect_left(buckets, value)] += 1
+        histogram["sum"] += value
+
+
+def get_histogram_count(name, **labels):
+    histogram = _histograms.get((name, tuple(sorted(labels.items()))))
+    return sum(histogram["counts"]) if histogram else 0
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def _render_histogram(name, labels, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip((*histogram["buckets"], "+Inf"), histogram["counts"]):
+        cumulative += count
+        lines.append(f"{name}_bucket{_format_labels((*labels, ('le', bound)))} {cumulative}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+    lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return lines
+
+
+def render():
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(
+            (key, {**value, "counts": list(value["counts"])}) for key, value in _histograms.items()
+        )
+    lines = [f"{name}{_format_labels(labels)} {value}" for (name, labels), value in counters]
+    typed = set()
+    for (name, labels), histogram in histograms:
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        lines.extend(_render_histogram(name, labels, histogram))
+    return "\n".join(lines) + "\n"
+
+
+def metrics_allowed(request):
+    if request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(header.encode(), f"Bearer {token}".encode())
+
+
+def metrics_view(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4")
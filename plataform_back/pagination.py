@@ -0,0 +1,89 @@
+"""
+Paginación por cursor (keyset) compartida por las vistas de listado.
+
+El cursor es la llave de ordenamiento de la última fila entregada,
+serializada como JSON en base64 url-safe. Así cada página es un
+"WHERE (llave) > (cursor) ... LIMIT n" que usa el índice, sin OFFSET.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(values, list):
+        raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def decode_typed_cursor(cursor, *types):
+    """decode_cursor que además exige un valor de cada tipo, en orden (ej. int, str)."""
+    values = decode_cursor(cursor)
+    if len(values) != len(types) or not all(
+        isinstance(value, kind) and not isinstance(value, bool) for value, kind in zip(values, types)
+    ):
+        raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def get_page_size(request, default=None):
+    default = default or settings.PAGE_SIZE
+    try:
+        # Request de DRF (query_params) o HttpRequest de Django (GET, vistas async)
+        params = getattr(request, "query_params", request.GET)
+        page_size = int(params.get("page_size", default))
+    except ValueError:
+        page_size = default
+    return max(1, min(page_size, settings.MAX_PAGE_SIZE))
+
+
+# ---------------------------
+# Admin: conteo estimado
+# ---------------------------
+def estimated_count(queryset):
+    """Filas de la tabla según las estadísticas de PostgreSQL (pg_class.reltuples); None si no hay."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # -1: la tabla nunca se analizó
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator para los changelists de tablas grandes: sin filtros ni
+    búsqueda, el total sale de las estadísticas en vez de un COUNT(*) que
+    recorre la tabla entera. Con filtros, o si la tabla es chica, cuenta
+    de verdad.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, "query", None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_MIN:
+                return estimate
+        return super().count
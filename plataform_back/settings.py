@@ -27,6 +27,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero: mide el request completo (plataform_back/instrumentation.py)
+    "plataform_back.instrumentation.RequestMetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -73,27 +75,88 @@ DATABASES = {
     }
 }
 
+# Estáticos del admin (python manage.py collectstatic)
+STATIC_URL = "/static/"
+STATIC_ROOT = os.getenv("DJANGO_STATIC_ROOT", BASE_DIR / "staticfiles")
+
+# Archivos subidos (recursos de cursos)
+MEDIA_URL = "/media/"
+MEDIA_ROOT = os.getenv("DJANGO_MEDIA_ROOT", BASE_DIR / "media")
+
+# Subidas por partes (courses/uploads.py): temporales fuera de MEDIA_ROOT
+RESOURCE_UPLOAD_DIR = os.getenv("RESOURCE_UPLOAD_DIR", BASE_DIR / "uploads")
+RESOURCE_UPLOAD_CHUNK_SIZE = int(os.getenv("RESOURCE_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+RESOURCE_UPLOAD_MAX_SIZE = int(os.getenv("RESOURCE_UPLOAD_MAX_SIZE", str(5 * 1024 ** 3)))
+RESOURCE_UPLOAD_EXPIRY_HOURS = int(os.getenv("RESOURCE_UPLOAD_EXPIRY_HOURS", "24"))
+
+# Descargas protegidas (courses/downloads.py): "local", "nginx" (X-Accel-Redirect) o "sendfile" (X-Sendfile)
+RESOURCE_DOWNLOAD_BACKEND = os.getenv("RESOURCE_DOWNLOAD_BACKEND", "local")
+# Location internal de nginx que apunta a MEDIA_ROOT
+RESOURCE_ACCEL_PREFIX = os.getenv("RESOURCE_ACCEL_PREFIX", "/protected-media/")
+
 # Usuario custom
 AUTH_USER_MODEL = "students.User"
 
 # DRF
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "students.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",
     )
 }
 
+# Paginación por cursor (plataform_back/pagination.py)
+PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "500"))
+# Changelists del admin: desde cuántas filas (estimadas) una tabla sin filtros
+# muestra el total estimado en vez de contarlo (EstimatedCountPaginator)
+ADMIN_ESTIMATED_COUNT_MIN = int(os.getenv("ADMIN_ESTIMATED_COUNT_MIN", "100000"))
+
+# Instrumentación por request: header Server-Timing y presupuestos de consultas
+# (query_budget en las vistas). En modo estricto un exceso lanza una excepción.
+REQUEST_METRICS_HEADER = os.getenv("REQUEST_METRICS_HEADER", str(DEBUG)).lower() == "true"
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "False").lower() == "true"
+
+# GET /metrics/ (plataform_back/metrics.py): solo estas IPs o con "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip.strip()]
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 # Redis cache
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
-        "LOCATION": os.getenv("REDIS_URL", "redis://redis:6379/0"),
+        "LOCATION": REDIS_URL,
     }
 }
 
+# Segundos que se cachea el usuario resuelto desde el JWT (students/authentication.py)
+JWT_USER_CACHE_TIMEOUT = int(os.getenv("JWT_USER_CACHE_TIMEOUT", "60"))
+
+# Caché del árbol de cursos (courses/cache.py): TTL en Redis y en memoria del proceso
+COURSE_TREE_CACHE_TIMEOUT = int(os.getenv("COURSE_TREE_CACHE_TIMEOUT", "3600"))
+COURSE_TREE_L1_TIMEOUT = int(os.getenv("COURSE_TREE_L1_TIMEOUT", "5"))
+
+# Vistas de lectura async (ranking, perfil, cursos del estudiante, notas).
+# Activar al correr con workers ASGI (uvicorn); bajo WSGI conviene dejarlas síncronas.
+ASYNC_READ_VIEWS = os.getenv("DJANGO_ASYNC_VIEWS", "False").lower() == "true"
+
+# Máximo de resultados de la búsqueda de estudiantes
+STUDENT_SEARCH_LIMIT = int(os.getenv("STUDENT_SEARCH_LIMIT", "20"))
+
+# Índice de ranking: "redis" (sorted set) o "memory" (en proceso, para desarrollo)
+RANK_INDEX_BACKEND = os.getenv("RANK_INDEX_BACKEND", "redis")
+# Segundos que vive en Redis el leaderboard de mérito de un curso
+COURSE_RANK_INDEX_TTL = int(os.getenv("COURSE_RANK_INDEX_TTL", "86400"))
+
+# Snapshots del ranking (python manage.py snapshot_ranking): cada cuántos
+# segundos se toma uno y cuántos días se guardan
+RANKING_SNAPSHOT_INTERVAL = int(os.getenv("RANKING_SNAPSHOT_INTERVAL", "3600"))
+RANKING_SNAPSHOT_RETENTION_DAYS = int(os.getenv("RANKING_SNAPSHOT_RETENTION_DAYS", "90"))
+
 # Internacionalización
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
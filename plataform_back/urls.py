@@ -1,7 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
+from .metrics import metrics_view
 
 
 urlpatterns = [
@@ -10,6 +9,8 @@ urlpatterns = [
     path("api/ranking/", include("ranking.urls")), 
     path("api/courses/", include("courses.urls")),
     path("api/grades/", include("grades.urls")),  
+    path("metrics/", metrics_view, name="metrics"),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Los archivos de MEDIA_ROOT no se publican: los recursos se descargan por
+# /api/courses/resources/<id>/download/, que valida el acceso (courses/downloads.py)
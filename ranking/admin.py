@@ -1 +1,17 @@
 # ranking/admin.py
+from django.contrib import admin
+from .models import AuraEvent, RankingSnapshot
+
+
+@admin.register(AuraEvent)
+class AuraEventAdmin(admin.ModelAdmin):
+    list_display = ('user', 'delta', 'reason', 'created_at', 'applied_at')
+    list_filter = ('reason',)
+    list_select_related = ('user',)
+    raw_id_fields = ('user', 'enrollment', 'module_grade')
+
+
+@admin.register(RankingSnapshot)
+class RankingSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('taken_at', 'students')
+    date_hierarchy = 'taken_at'
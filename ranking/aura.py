@@ -0,0 +1,79 @@
+"""
+Otorgar aura sin read-modify-write sobre la fila del usuario.
+
+award_aura / award_aura_bulk solo insertan en el ledger (AuraEvent).
+flush_aura_events toma un lote de eventos pendientes, suma los deltas por
+usuario en SQL y los aplica con un único UPDATE ... SET aura = aura + CASE ...,
+actualizando en la misma pasada el índice de ranking y la caché del JWT.
+Miles de premios por segundo se convierten en unos pocos UPDATE.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from .models import AuraEvent
+from .rank_index import sync_students
+
+FLUSH_BATCH_SIZE = 5000
+
+
+def award_aura(user, delta, reason, enrollment=None, module_grade=None):
+    return AuraEvent.objects.create(
+        user=user, delta=delta, reason=reason, enrollment=enrollment, module_grade=module_grade
+    )
+
+
+def award_aura_bulk(events, batch_size=FLUSH_BATCH_SIZE):
+    """events: AuraEvent sin guardar."""
+    return AuraEvent.objects.bulk_create(events, batch_size=batch_size)
+
+
+def flush_aura_events(batch_size=FLUSH_BATCH_SIZE):
+    """Aplica un lote de eventos pendientes. Devuelve cuántos eventos se aplicaron."""
+    User = get_user_model()
+
+    with transaction.atomic():
+        # skip_locked permite correr varios flushers en paralelo (PostgreSQL)
+        event_ids = list(
+            AuraEvent.objects.filter(applied_at__isnull=True)
+            .select_for_update(skip_locked=True)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not event_ids:
+            return 0
+
+        totals = {
+            row["user_id"]: row["total"]
+            for row in AuraEvent.objects.filter(id__in=event_ids)
+            .values("user_id")
+            .annotate(total=Sum("delta"))
+            .order_by()
+            if row["total"]
+        }
+        if totals:
+            User.objects.filter(pk__in=totals).update(
+                aura=F("aura") + Case(
+                    *[When(pk=user_id, then=Value(total)) for user_id, total in totals.items()],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+            )
+        AuraEvent.objects.filter(id__in=event_ids).update(applied_at=timezone.now())
+
+        new_values = list(User.objects.filter(pk__in=totals, role="student").values_list("id", "aura"))
+        transaction.on_commit(lambda: _after_flush(totals.keys(), new_values))
+
+    return len(event_ids)
+
+
+def _after_flush(user_ids, new_values):
+    # UPDATE no dispara post_save: sincronizamos a mano índice y caché de auth
+    from students.authentication import invalidate_cached_users
+
+    try:
+        # sync_students registra el error y sigue: el ledger ya está confirmado
+        sync_students(new_values)
+    finally:
+        invalidate_cached_users(user_ids)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ranking.aura import FLUSH_BATCH_SIZE, flush_aura_events
+
+
+class Command(BaseCommand):
+    help = "Aplica en lote los eventos de aura pendientes (User.aura + índice de ranking)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=FLUSH_BATCH_SIZE)
+        parser.add_argument("--interval", type=float, default=1.0, help="Segundos entre pasadas")
+        parser.add_argument("--once", action="store_true", help="Vacía la cola una vez y termina")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        while True:
+            total = 0
+            while True:
+                applied = flush_aura_events(batch_size)
+                total += applied
+                if applied < batch_size:
+                    break
+            if total:
+                self.stdout.write(f"{total} eventos de aura aplicados")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ranking.rank_index import STUDENT_INDEX, get_rank_index, rebuild_student_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de ranking de estudiantes (arranque en frío)."
+
+    def handle(self, *args, **options):
+        # Mismo lock que la reconstrucción en la lectura: dos a la vez se pisarían la llave temporal
+        index = get_rank_index(STUDENT_INDEX)
+        token = index.acquire_rebuild()
+        if not token:
+            raise CommandError("Otro proceso está reconstruyendo el índice")
+        try:
+            count = rebuild_student_index()
+        finally:
+            index.release_rebuild(token)
+        self.stdout.write(self.style.SUCCESS(f"Índice de ranking reconstruido: {count} estudiantes"))
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ranking.snapshots import purge_snapshots, take_snapshot
+
+
+class Command(BaseCommand):
+    help = "Guarda snapshots periódicos del ranking global (posición, aura y percentil)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=settings.RANKING_SNAPSHOT_INTERVAL, help="Segundos entre snapshots"
+        )
+        parser.add_argument("--retention-days", type=int, default=settings.RANKING_SNAPSHOT_RETENTION_DAYS)
+        parser.add_argument("--once", action="store_true", help="Toma un snapshot y termina")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            snapshot = take_snapshot()
+            purged = purge_snapshots(options["retention_days"])
+            self.stdout.write(
+                f"Snapshot {snapshot.pk}: {snapshot.students} estudiantes en {time.monotonic() - started:.2f}s"
+                + (f", {purged} filas viejas borradas" if purged else "")
+            )
+            if options["once"]:
+                return
+            time.sleep(max(0.0, options["interval"] - (time.monotonic() - started)))
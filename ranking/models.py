@@ -1,3 +1,103 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
-# Create your models here.
+from .rank_index import on_commit_sync_student, remove_course_member, sync_course_merits
+
+
+class AuraEvent(models.Model):
+    """
+    Registro append-only de cambios de aura. User.aura no se toca al otorgar:
+    el flusher (ranking/aura.py) aplica los eventos pendientes en lote.
+    """
+    REASON_CHOICES = (
+        ("enrollment", "Enrollment"),
+        ("module_grade", "Module grade"),
+        ("adjustment", "Adjustment"),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="aura_events")
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    enrollment = models.ForeignKey(
+        "courses.Enrollment", on_delete=models.SET_NULL, null=True, blank=True, related_name="aura_events"
+    )
+    module_grade = models.ForeignKey(
+        "grades.ModuleGrade", on_delete=models.SET_NULL, null=True, blank=True, related_name="aura_events"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # El flusher solo recorre los pendientes
+            models.Index(fields=["id"], condition=Q(applied_at__isnull=True), name="auraevent_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.delta:+d} ({self.reason})"
+
+
+class RankingSnapshot(models.Model):
+    """Foto del ranking global de estudiantes (ranking/snapshots.py)."""
+    taken_at = models.DateTimeField(db_index=True)
+    students = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-taken_at"]
+
+    def __str__(self):
+        return f"Ranking {self.taken_at:%Y-%m-%d %H:%M} ({self.students})"
+
+
+class RankingSnapshotEntry(models.Model):
+    snapshot = models.ForeignKey(RankingSnapshot, on_delete=models.CASCADE, related_name="entries")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="ranking_snapshots")
+    rank = models.PositiveIntegerField()
+    aura = models.IntegerField()
+    # Porcentaje de estudiantes con aura menor o igual (CUME_DIST)
+    percentile = models.FloatField()
+    # Copia de snapshot.taken_at: el historial de un usuario es un rango sobre (user, taken_at)
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("snapshot", "user")
+        indexes = [
+            models.Index(fields=["snapshot", "rank", "user"], name="rankingsnap_page_idx"),
+            models.Index(fields=["user", "taken_at"], name="rankingsnap_history_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} #{self.rank} ({self.taken_at:%Y-%m-%d %H:%M})"
+
+
+# ---------------------------
+# Signals
+# ---------------------------
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def sync_user_rank(sender, instance, update_fields=None, **kwargs):
+    # Solo interesa cuando cambia el aura o el rol
+    if update_fields is not None and not {"aura", "role"} & set(update_fields):
+        return
+    on_commit_sync_student(instance.pk, instance.role, instance.aura)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def remove_user_rank(sender, instance, **kwargs):
+    on_commit_sync_student(instance.pk, None, None)
+
+
+@receiver(post_save, sender="courses.Enrollment")
+def sync_enrollment_merit(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "merit_points" not in update_fields:
+        return
+    course_id, pair = instance.course_id, (instance.student_id, instance.merit_points)
+    transaction.on_commit(lambda: sync_course_merits(course_id, [pair]))
+
+
+@receiver(post_delete, sender="courses.Enrollment")
+def remove_enrollment_merit(sender, instance, **kwargs):
+    course_id, student_id = instance.course_id, instance.student_id
+    transaction.on_commit(lambda: remove_course_member(course_id, student_id))
@@ -0,0 +1,502 @@
+"""
+Índice de ranking mantenido incrementalmente.
+
+Guarda el puntaje de cada miembro en un sorted set de Redis para responder
+la posición de un usuario en O(log N) sin recorrer la tabla de usuarios.
+Si RANK_INDEX_BACKEND = "memory" se usa un índice en memoria del proceso
+(útil en desarrollo y tests; cada worker mantiene su propia copia).
+
+La posición sigue la semántica de Rank(): los empates comparten posición,
+es decir, rank = 1 + cantidad de miembros con puntaje estrictamente mayor.
+"""
+import bisect
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+STUDENT_INDEX = "aura:students"
+REBUILD_BATCH_SIZE = 5000
+# Segundos que dura el lock de reconstrucción: cubre toda la reconstrucción
+REBUILD_TIMEOUT = 600
+
+# Borra el lock solo si sigue siendo de quien lo tomó
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+# ---------------------------
+# Backends
+# ---------------------------
+class RedisRankIndex:
+    def __init__(self, name, client, ttl=None):
+        self.key = f"rank:{name}"
+        self.ready_key = f"{self.key}:ready"
+        self.lock_key = f"{self.key}:lock"
+        # Estado de una reconstrucción en curso (ver rebuild)
+        self.tmp_key = f"{self.key}:rebuild"
+        self.rebuilding_key = f"{self.key}:rebuilding"
+        self.removed_key = f"{self.key}:rebuild:removed"
+        self.client = client
+        # Con ttl el índice expira y se reconstruye en la próxima lectura
+        self.ttl = ttl
+
+    def is_ready(self):
+        return bool(self.client.exists(self.ready_key))
+
+    def invalidate(self):
+        self.client.delete(self.ready_key)
+
+    def acquire_rebuild(self, timeout=REBUILD_TIMEOUT):
+        """Token del lock, o None si otro proceso lo tiene."""
+        token = uuid.uuid4().hex
+        if self.client.set(self.lock_key, token, nx=True, ex=timeout):
+            return token
+        return None
+
+    def release_rebuild(self, token):
+        self.client.eval(RELEASE_LOCK_SCRIPT, 1, self.lock_key, token)
+
+    def rebuilding(self):
+        return bool(self.client.exists(self.rebuilding_key))
+
+    def update(self, member, score):
+        self.update_many([(member, score)])
+
+    def update_many(self, pairs):
+        mapping = {str(member): score for member, score in pairs}
+        if not mapping:
+            return
+        if not self.rebuilding():
+            self.client.zadd(self.key, mapping)
+            return
+        # Durante una reconstrucción también va a la llave temporal: el RENAME pisaría la actual
+        pipe = self.client.pipeline()
+        pipe.zadd(self.key, mapping)
+        pipe.zadd(self.tmp_key, mapping)
+        pipe.srem(self.removed_key, *mapping)
+        pipe.execute()
+
+    def remove(self, member):
+        member = str(member)
+        if not self.rebuilding():
+            self.client.zrem(self.key, member)
+            return
+        pipe = self.client.pipeline()
+        pipe.zrem(self.key, member)
+        pipe.zrem(self.tmp_key, member)
+        pipe.sadd(self.removed_key, member)
+        pipe.execute()
+
+    def rank_of_score(self, score):
+        # "(" hace el límite exclusivo: solo puntajes estrictamente mayores
+        return self.client.zcount(self.key, f"({score}", "+inf") + 1
+
+    def ranks_of_scores(self, scores):
+        scores = list(dict.fromkeys(scores))
+        pipe = self.client.pipeline(transaction=False)
+        for score in scores:
+            pipe.zcount(self.key, f"({score}", "+inf")
+        return {score: count + 1 for score, count in zip(scores, pipe.execute())}
+
+    def rank(self, member):
+        score = self.client.zscore(self.key, str(member))
+        if score is None:
+            return None
+        return self.rank_of_score(score)
+
+    def top(self, k):
+        """Los k primeros [(member, score)], de mayor a menor puntaje."""
+        return [(member, int(score)) for member, score in self.client.zrevrange(self.key, 0, k - 1, withscores=True)]
+
+    def rebuild(self, pairs, batch_size=REBUILD_BATCH_SIZE, timeout=REBUILD_TIMEOUT):
+        """
+        Se construye en una llave temporal y se reemplaza con RENAME (atómico).
+        Mientras dura, update/remove escriben también en la temporal y las
+        filas leídas de la base se agregan con NX, así una fila vieja no pisa
+        un cambio más nuevo; las bajas quedan en removed_key y se aplican
+        justo antes del RENAME.
+        """
+        pipe = self.client.pipeline()
+        pipe.delete(self.tmp_key, self.removed_key)
+        pipe.set(self.rebuilding_key, 1, ex=timeout)
+        pipe.execute()
+        try:
+            count = 0
+            batch = {}
+            for member, score in pairs:
+                batch[str(member)] = score
+                if len(batch) >= batch_size:
+                    self.client.zadd(self.tmp_key, batch, nx=True)
+                    count += len(batch)
+                    batch = {}
+            if batch:
+                self.client.zadd(self.tmp_key, batch, nx=True)
+                count += len(batch)
+            self._swap()
+        finally:
+            self.client.delete(self.rebuilding_key)
+        return count
+
+    def _swap(self):
+        from redis import WatchError
+
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    # Un update o remove concurrente entre la lectura y el EXEC reintenta
+                    pipe.watch(self.tmp_key, self.removed_key)
+                    removed = list(pipe.smembers(self.removed_key))
+                    remaining = pipe.zcard(self.tmp_key)
+                    if removed:
+                        remaining -= sum(score is not None for score in pipe.zmscore(self.tmp_key, removed))
+                    pipe.multi()
+                    if removed:
+                        pipe.zrem(self.tmp_key, *removed)
+                    if remaining:
+                        pipe.rename(self.tmp_key, self.key)
+                    else:
+                        pipe.delete(self.key)
+                    pipe.delete(self.removed_key, self.rebuilding_key)
+                    pipe.set(self.ready_key, 1)
+                    if self.ttl:
+                        pipe.expire(self.key, self.ttl)
+                        pipe.expire(self.ready_key, self.ttl)
+                    pipe.execute()
+                    return
+                except WatchError:
+                    continue
+
+
+class MemoryRankIndex:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._scores = {}
+        # Tuplas (-score, member) ordenadas: el orden del ranking
+        self._entries = []
+        self._ready = False
+        # Cambios recibidos durante rebuild: member -> score (None = baja)
+        self._pending = None
+
+    def is_ready(self):
+        return self._ready
+
+    def invalidate(self):
+        self._ready = False
+
+    def acquire_rebuild(self, timeout=REBUILD_TIMEOUT):
+        return True
+
+    def release_rebuild(self, token):
+        pass
+
+    def _discard(self, member):
+        old = self._scores.pop(member, None)
+        if old is not None:
+            pos = bisect.bisect_left(self._entries, (-old, member))
+            del self._entries[pos]
+
+    def update(self, member, score):
+        member = str(member)
+        with self._lock:
+            self._discard(member)
+            self._scores[member] = score
+            bisect.insort(self._entries, (-score, member))
+            if self._pending is not None:
+                self._pending[member] = score
+
+    def update_many(self, pairs):
+        for member, score in pairs:
+            self.update(member, score)
+
+    def remove(self, member):
+        member = str(member)
+        with self._lock:
+            self._discard(member)
+            if self._pending is not None:
+                self._pending[member] = None
+
+    def rank_of_score(self, score):
+        # (-score,) es menor que cualquier (-score, member): cuenta solo los mayores
+        return bisect.bisect_left(self._entries, (-score,)) + 1
+
+    def ranks_of_scores(self, scores):
+        return {score: self.rank_of_score(score) for score in scores}
+
+    def rank(self, member):
+        score = self._scores.get(str(member))
+        if score is None:
+            return None
+        return self.rank_of_score(score)
+
+    def top(self, k):
+        return [(member, -score) for score, member in self._entries[:k]]
+
+    def rebuild(self, pairs, batch_size=REBUILD_BATCH_SIZE):
+        with self._lock:
+            self._pending = {}
+        try:
+            scores = {str(member): score for member, score in pairs}
+            count = len(scores)
+            with self._lock:
+                # Los cambios hechos mientras se leía la base son más nuevos que esas filas
+                for member, score in self._pending.items():
+                    if score is None:
+                        scores.pop(member, None)
+                    else:
+                        scores[member] = score
+                self._scores = scores
+                self._entries = sorted((-score, member) for member, score in scores.items())
+                self._ready = True
+        finally:
+            with self._lock:
+                self._pending = None
+        return count
+
+
+# ---------------------------
+# Registro de índices
+# ---------------------------
+# Solo los índices en memoria guardan datos en el objeto: se conservan los
+# más usados y el resto se descarta (vuelve frío y se reconstruye al leerlo).
+# Los de Redis son un envoltorio liviano sobre la llave y no se cachean.
+MAX_MEMORY_INDEXES = 256
+
+_memory_indexes = OrderedDict()
+_memory_indexes_lock = threading.Lock()
+_redis_client = None
+
+
+def _get_redis_client():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
+def _memory_index(name):
+    with _memory_indexes_lock:
+        index = _memory_indexes.get(name)
+        if index is None:
+            index = _memory_indexes[name] = MemoryRankIndex(name)
+            while len(_memory_indexes) > MAX_MEMORY_INDEXES:
+                _memory_indexes.popitem(last=False)
+        else:
+            _memory_indexes.move_to_end(name)
+        return index
+
+
+def get_rank_index(name, ttl=None):
+    if getattr(settings, "RANK_INDEX_BACKEND", "redis") == "memory":
+        return _memory_index(name)
+    return RedisRankIndex(name, _get_redis_client(), ttl=ttl)
+
+
+def ready_index(name, rebuild, ttl=None):
+    """
+    Índice listo para leer; si está frío lo reconstruye con rebuild() (un
+    solo proceso a la vez). None si otro proceso lo está reconstruyendo.
+    """
+    index = get_rank_index(name, ttl)
+    if index.is_ready():
+        return index
+    token = index.acquire_rebuild()
+    if not token:
+        return None
+    try:
+        rebuild()
+    finally:
+        index.release_rebuild(token)
+    return index
+
+
+# ---------------------------
+# Ranking global de estudiantes (aura)
+# ---------------------------
+def rebuild_student_index():
+    User = get_user_model()
+    rows = (
+        User.objects.filter(role="student")
+        .values_list("id", "aura")
+        .iterator(chunk_size=REBUILD_BATCH_SIZE)
+    )
+    return get_rank_index(STUDENT_INDEX).rebuild(rows)
+
+
+def student_rank_index():
+    """
+    Devuelve el índice listo para leer, o None si está frío y otro proceso
+    lo está reconstruyendo (el llamador debe usar la consulta de respaldo).
+    """
+    return ready_index(STUDENT_INDEX, rebuild_student_index)
+
+
+def student_rank(user):
+    """Posición de un estudiante en el ranking global por aura."""
+    if user.role != "student" or user.aura is None:
+        return None
+    try:
+        index = student_rank_index()
+        if index is not None:
+            return index.rank_of_score(user.aura)
+    except Exception:
+        logger.exception("Rank index unavailable, falling back to database")
+
+    User = get_user_model()
+    return User.objects.filter(role="student", aura__gt=user.aura).count() + 1
+
+
+def student_ranks(auras):
+    """Posición para cada valor de aura (una sola ida a Redis)."""
+    auras = [aura for aura in auras if aura is not None]
+    if not auras:
+        return {}
+    try:
+        index = student_rank_index()
+        if index is not None:
+            return index.ranks_of_scores(auras)
+    except Exception:
+        logger.exception("Rank index unavailable, falling back to database")
+
+    User = get_user_model()
+    students = User.objects.filter(role="student")
+    return {aura: students.filter(aura__gt=aura).count() + 1 for aura in set(auras)}
+
+
+def sync_student(user_id, role, aura):
+    index = get_rank_index(STUDENT_INDEX)
+    try:
+        if role == "student":
+            index.update(user_id, aura)
+        else:
+            index.remove(user_id)
+    except Exception:
+        logger.exception("Could not update rank index for user %s", user_id)
+
+
+def sync_students(pairs):
+    """Agrega o actualiza varios estudiantes (user_id, aura) de una vez."""
+    try:
+        get_rank_index(STUDENT_INDEX).update_many(pairs)
+    except Exception:
+        logger.exception("Could not update rank index for %d users", len(pairs))
+
+
+def on_commit_sync_student(user_id, role, aura):
+    transaction.on_commit(lambda: sync_student(user_id, role, aura))
+
+
+# ---------------------------
+# Leaderboard de mérito por curso (Enrollment.merit_points)
+# ---------------------------
+def course_index_name(course_id):
+    return f"merit:course:{course_id}"
+
+
+def course_merit_index(course_id):
+    """
+    Índice del curso listo para leer o None (ver ready_index). En Redis los
+    índices expiran a los COURSE_RANK_INDEX_TTL segundos, así los cursos sin
+    uso no ocupan memoria; se reconstruyen en la siguiente lectura.
+    """
+    return ready_index(
+        course_index_name(course_id),
+        lambda: rebuild_course_index(course_id),
+        ttl=settings.COURSE_RANK_INDEX_TTL,
+    )
+
+
+def rebuild_course_index(course_id):
+    from courses.models import Enrollment
+
+    rows = (
+        Enrollment.objects.filter(course_id=course_id)
+        .values_list("student_id", "merit_points")
+        .iterator(chunk_size=REBUILD_BATCH_SIZE)
+    )
+    return get_rank_index(course_index_name(course_id), settings.COURSE_RANK_INDEX_TTL).rebuild(rows)
+
+
+def with_ranks(entries):
+    """[(member, score)] ordenados -> [(member, score, rank)] con empates compartidos."""
+    ranked = []
+    for position, (member, score) in enumerate(entries, start=1):
+        if ranked and ranked[-1][1] == score:
+            position = ranked[-1][2]
+        ranked.append((member, score, position))
+    return ranked
+
+
+def course_leaderboard(course_id, k):
+    """Los k primeros del curso [(student_id, merit_points, rank)] en O(log N + k)."""
+    try:
+        index = course_merit_index(course_id)
+        if index is not None:
+            return with_ranks(index.top(k))
+    except Exception:
+        logger.exception("Rank index unavailable, falling back to database")
+
+    from courses.models import Enrollment
+
+    rows = (
+        Enrollment.objects.filter(course_id=course_id)
+        .order_by("-merit_points", "student_id")
+        .values_list("student_id", "merit_points")[:k]
+    )
+    return with_ranks([(str(student_id), merit_points) for student_id, merit_points in rows])
+
+
+def course_rank(course_id, merit_points):
+    """Posición de un puntaje en el leaderboard del curso."""
+    try:
+        index = course_merit_index(course_id)
+        if index is not None:
+            return index.rank_of_score(merit_points)
+    except Exception:
+        logger.exception("Rank index unavailable, falling back to database")
+
+    from courses.models import Enrollment
+
+    return Enrollment.objects.filter(course_id=course_id, merit_points__gt=merit_points).count() + 1
+
+
+def sync_course_merits(course_id, pairs):
+    """Actualiza (student_id, merit_points) en el índice del curso si está cargado."""
+    index = get_rank_index(course_index_name(course_id), settings.COURSE_RANK_INDEX_TTL)
+    try:
+        # Un índice frío se reconstruye entero en la próxima lectura
+        if index.is_ready():
+            index.update_many(pairs)
+    except Exception:
+        logger.exception("Could not update merit index for course %s", course_id)
+
+
+def remove_course_member(course_id, student_id):
+    index = get_rank_index(course_index_name(course_id), settings.COURSE_RANK_INDEX_TTL)
+    try:
+        if index.is_ready():
+            index.remove(student_id)
+    except Exception:
+        logger.exception("Could not update merit index for course %s", course_id)
+
+
+def invalidate_course_indexes(course_ids):
+    """Marca los índices como fríos (p. ej. tras un bulk_create de inscripciones)."""
+    for course_id in course_ids:
+        try:
+            get_rank_index(course_index_name(course_id), settings.COURSE_RANK_INDEX_TTL).invalidate()
+        except Exception:
+            logger.exception("Could not invalidate merit index for course %s", course_id)
@@ -0,0 +1,96 @@
+"""
+Snapshots periódicos del ranking global de estudiantes.
+
+take_snapshot materializa el ranking completo (posición, aura y percentil)
+con un solo INSERT ... SELECT con funciones de ventana, sin traer filas a
+Python. Las páginas del ranking se leen del último snapshot ordenadas por
+(snapshot, rank), y el historial de un estudiante es un rango sobre el
+índice (user, taken_at).
+
+El último snapshot se guarda en la caché para no buscarlo en cada request.
+Las páginas solo lo usan mientras es reciente (fresh_snapshot): si el
+comando snapshot_ranking deja de correr, el ranking vuelve a leerse en vivo
+en vez de quedar congelado.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import RankingSnapshot, RankingSnapshotEntry
+
+LATEST_CACHE_KEY = "ranking:latest-snapshot"
+
+
+def take_snapshot():
+    """Crea un snapshot del ranking actual. Devuelve el RankingSnapshot."""
+    User = get_user_model()
+    quote = connection.ops.quote_name
+    taken_at = timezone.now()
+
+    with transaction.atomic():
+        snapshot = RankingSnapshot.objects.create(taken_at=taken_at)
+        sql = f"""
+            INSERT INTO {quote(RankingSnapshotEntry._meta.db_table)}
+                (snapshot_id, user_id, {quote("rank")}, aura, percentile, taken_at)
+            SELECT %s, id,
+                   RANK() OVER (ORDER BY aura DESC),
+                   aura,
+                   CUME_DIST() OVER (ORDER BY aura) * 100,
+                   %s
+            FROM {quote(User._meta.db_table)}
+            WHERE role = %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [snapshot.pk, taken_at, "student"])
+            snapshot.students = cursor.rowcount
+        snapshot.save(update_fields=["students"])
+        transaction.on_commit(lambda: cache.set(LATEST_CACHE_KEY, snapshot, None))
+    return snapshot
+
+
+def latest_snapshot():
+    snapshot = cache.get(LATEST_CACHE_KEY)
+    if snapshot is None:
+        snapshot = RankingSnapshot.objects.order_by("-taken_at").first()
+        if snapshot is not None:
+            cache.set(LATEST_CACHE_KEY, snapshot, None)
+    return snapshot
+
+
+def fresh_snapshot():
+    """Último snapshot si no tiene más de dos intervalos (RANKING_SNAPSHOT_INTERVAL), si no None."""
+    snapshot = latest_snapshot()
+    max_age = timedelta(seconds=2 * settings.RANKING_SNAPSHOT_INTERVAL)
+    if snapshot is None or snapshot.taken_at < timezone.now() - max_age:
+        return None
+    return snapshot
+
+
+def purge_snapshots(retention_days):
+    """Borra los snapshots más viejos que retention_days (el último nunca)."""
+    latest = RankingSnapshot.objects.order_by("-taken_at").values_list("pk", flat=True).first()
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = RankingSnapshot.objects.filter(taken_at__lt=cutoff).exclude(pk=latest).delete()
+    cache.delete(LATEST_CACHE_KEY)
+    return deleted
+
+
+def snapshot_entry(snapshot, user_id):
+    """{rank, aura, percentile} del estudiante en el snapshot, o None si no figura."""
+    return (
+        RankingSnapshotEntry.objects.filter(snapshot=snapshot, user_id=user_id)
+        .values("rank", "aura", "percentile")
+        .first()
+    )
+
+
+def rank_history(user_id, since=None):
+    """[(taken_at, rank, aura, percentile)] del estudiante, del más viejo al más nuevo."""
+    entries = RankingSnapshotEntry.objects.filter(user_id=user_id)
+    if since is not None:
+        entries = entries.filter(taken_at__gte=since)
+    return entries.order_by("taken_at").values("taken_at", "rank", "aura", "percentile")
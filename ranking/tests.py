@@ -1,3 +1,459 @@
-from django.test import TestCase
+import io
+import unittest
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from benchmarks.explain import QueryPlanAssertions, capture_queries, plan_problems
+from benchmarks.run import ENDPOINTS, run_benchmark
+from benchmarks.seed import seed_dataset
+from courses.models import Course
+from plataform_back.pagination import encode_cursor
+from students.authentication import cache_user, user_cache_key
+from students.models import User
+from . import rank_index
+from .aura import award_aura, award_aura_bulk, flush_aura_events
+from .rank_index import (
+    STUDENT_INDEX, RedisRankIndex, course_leaderboard, course_rank, get_rank_index, rebuild_student_index,
+    student_rank, student_ranks, with_ranks,
+)
+from .models import AuraEvent, RankingSnapshot, RankingSnapshotEntry
+from .snapshots import purge_snapshots, take_snapshot
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, REQUEST_METRICS_HEADER=True)
+class RankingBenchmarkTests(TestCase):
+    """Ranking y runner de benchmarks sobre el dataset del seed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(students=60, teachers=2, courses=4, courses_per_student=2, resources_per_block=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_ranking_order_and_user_rank(self):
+        student = User.objects.filter(role="student").order_by("aura", "id").first()
+        client = APIClient()
+        client.force_authenticate(student)
+        data = client.get(reverse("ranking"), {"page_size": 10}).json()
+
+        expected = list(
+            User.objects.filter(role="student").order_by("-aura", "id").values_list("id", flat=True)[:10]
+        )
+        self.assertEqual([row["id"] for row in data["ranking"]], [str(pk) for pk in expected])
+        higher = User.objects.filter(role="student", aura__gt=student.aura).count()
+        self.assertEqual(data["user_rank"]["rank"], higher + 1)
+        self.assertIsNotNone(data["next_cursor"])
+
+    def test_runner_reports_every_endpoint(self):
+        results = run_benchmark(list(ENDPOINTS), [1], requests=5, warmup=2, users=5)
+        self.assertEqual([r["endpoint"] for r in results], list(ENDPOINTS))
+        for result in results:
+            self.assertEqual(result["requests"], 5)
+            self.assertEqual(result["errors"], 0, result["endpoint"])
+            self.assertGreaterEqual(result["p99_ms"], result["p50_ms"])
+            self.assertIsNotNone(result["queries_max"])
+
+
+class RankingQueryPlanTests(QueryPlanAssertions, TestCase):
+    """Las consultas del ranking usan índices: sin recorrer tablas ni ordenar en memoria."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(students=60, teachers=2, courses=4, courses_per_student=2, resources_per_block=0)
+        cls.student = User.objects.filter(role="student").order_by("aura", "id").first()
+        cls.course = Course.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def get(self, params):
+        return self.assertPlansUseIndexes(lambda: self.client.get(reverse("ranking"), params))
+
+    def test_live_pages(self):
+        data = self.get({"live": 1, "page_size": 10}).json()
+        self.get({"live": 1, "page_size": 10, "cursor": data["next_cursor"]})
+        self.get({"around": 5})
+
+    def test_snapshot_pages(self):
+        take_snapshot()
+        data = self.get({"page_size": 10}).json()
+        self.assertIsNotNone(data["snapshot_at"])
+        self.get({"page_size": 10, "cursor": data["next_cursor"]})
+
+    def test_history(self):
+        take_snapshot()
+        self.assertPlansUseIndexes(lambda: self.client.get(reverse("ranking-history", args=[self.student.pk])))
+
+    def test_database_fallbacks(self):
+        # Sin índice de ranking (Redis caído o reconstruyéndose) se cuenta en SQL
+        with mock.patch("ranking.rank_index.student_rank_index", return_value=None), \
+                mock.patch("ranking.rank_index.course_merit_index", return_value=None), \
+                capture_queries() as queries:
+            student_rank(self.student)
+            course_leaderboard(self.course.id, 10)
+            course_rank(self.course.id, 50)
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(plan_problems(queries), [])
+
+
+class RankingSnapshotTests(TestCase):
+    """Snapshots: contenido, páginas del snapshot, cursor estable, live=1 e historial."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [
+            User.objects.create_user(f"s{i}@test.com", f"s{i}", "x", aura=aura)
+            for i, aura in enumerate((50, 30, 30, 10))
+        ]
+        User.objects.create_user("teacher@test.com", "teacher", "x", role="teacher", aura=99)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.students[3])
+
+    def page(self, **params):
+        return self.client.get(reverse("ranking"), params).json()
+
+    def test_snapshot_contents(self):
+        snapshot = take_snapshot()
+        self.assertEqual(snapshot.students, 4)
+        entries = {e.user_id: (e.rank, e.aura, round(e.percentile, 2)) for e in snapshot.entries.all()}
+        self.assertEqual(entries, {
+            self.students[0].pk: (1, 50, 100.0),
+            self.students[1].pk: (2, 30, 75.0),
+            self.students[2].pk: (2, 30, 75.0),
+            self.students[3].pk: (4, 10, 25.0),
+        })
+
+    def test_pages_read_snapshot(self):
+        snapshot = take_snapshot()
+        User.objects.filter(pk=self.students[3].pk).update(aura=100)
+
+        data = self.page(page_size=10)
+        self.assertEqual(data["snapshot_at"], snapshot.taken_at.isoformat().replace("+00:00", "Z"))
+        self.assertEqual([row["aura"] for row in data["ranking"]], [50, 30, 30, 10])
+        self.assertEqual(data["user_rank"]["rank"], 4)
+        self.assertEqual(data["user_rank"]["percentile"], 25.0)
+
+        live = self.page(page_size=10, live=1)
+        self.assertIsNone(live["snapshot_at"])
+        self.assertEqual([row["aura"] for row in live["ranking"]], [100, 50, 30, 30])
+
+    def test_cursor_stays_on_its_snapshot(self):
+        first = take_snapshot()
+        data = self.page(page_size=2)
+        User.objects.filter(pk=self.students[0].pk).update(aura=0)
+        take_snapshot()
+
+        rest = self.page(page_size=2, cursor=data["next_cursor"])
+        self.assertEqual(rest["snapshot_at"], data["snapshot_at"])
+        ids = [row["id"] for row in data["ranking"] + rest["ranking"]]
+        expected = first.entries.order_by("rank", "user_id").values_list("user_id", flat=True)
+        self.assertEqual(ids, [str(pk) for pk in expected])
+        self.assertIsNone(rest["next_cursor"])
+
+    def test_malformed_cursor(self):
+        snapshot = take_snapshot()
+        user_id = str(self.students[0].pk)
+        cursors = [
+            "not a cursor!",
+            encode_cursor({"aura": 1}),
+            encode_cursor([1, 2]),                          # ids que no son texto
+            encode_cursor([[1], user_id]),
+            encode_cursor([True, user_id]),
+            encode_cursor([10, "no-es-uuid"]),
+            encode_cursor([10]),
+            encode_cursor(["s", snapshot.pk, 1, 2]),
+            encode_cursor(["s", snapshot.pk, "1", user_id]),
+            encode_cursor(["s", snapshot.pk + 1, 1, user_id]),
+            encode_cursor(["s", {}]),
+        ]
+        for cursor in cursors:
+            response = self.client.get(reverse("ranking"), {"cursor": cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.json(), {"error": "Invalid cursor"})
+
+    def test_stale_snapshot_falls_back_to_live(self):
+        snapshot = take_snapshot()
+        snapshot.taken_at -= timedelta(seconds=3 * settings.RANKING_SNAPSHOT_INTERVAL)
+        snapshot.save(update_fields=["taken_at"])
+        cache.clear()
+        self.assertIsNone(self.page(page_size=10)["snapshot_at"])
+
+    def test_history(self):
+        student = self.students[3]
+        take_snapshot()
+        User.objects.filter(pk=student.pk).update(aura=40)
+        take_snapshot()
+
+        history = self.client.get(reverse("ranking-history", args=[student.pk])).json()["history"]
+        self.assertEqual([(row["rank"], row["aura"]) for row in history], [(4, 10), (2, 40)])
+
+        RankingSnapshotEntry.objects.filter(user=student).update(taken_at=timezone.now() - timedelta(days=10))
+        history = self.client.get(reverse("ranking-history", args=[student.pk]), {"days": 5}).json()["history"]
+        self.assertEqual(history, [])
+
+    def test_purge_keeps_latest(self):
+        old, latest = take_snapshot(), take_snapshot()
+        RankingSnapshot.objects.filter(pk=old.pk).update(taken_at=timezone.now() - timedelta(days=101))
+        RankingSnapshot.objects.filter(pk=latest.pk).update(taken_at=timezone.now() - timedelta(days=100))
+        self.assertEqual(purge_snapshots(90), 1 + 4)  # snapshot + sus entradas
+        self.assertEqual(list(RankingSnapshot.objects.values_list("pk", flat=True)), [latest.pk])
+        self.assertFalse(RankingSnapshotEntry.objects.filter(snapshot_id=old.pk).exists())
+
+
+class AuraLedgerTests(TestCase):
+    """Ledger de aura: award solo inserta y el flusher aplica los eventos en lote."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user("ana@test.com", "ana", "x", aura=10)
+        cls.beto = User.objects.create_user("beto@test.com", "beto", "x", aura=20)
+
+    def setUp(self):
+        cache.clear()
+        rebuild_student_index()
+
+    def aura(self, user):
+        return User.objects.values_list("aura", flat=True).get(pk=user.pk)
+
+    def test_award_only_inserts(self):
+        award_aura(self.ana, 5, "adjustment")
+        self.assertEqual(self.aura(self.ana), 10)
+        self.assertEqual(AuraEvent.objects.filter(applied_at__isnull=True).count(), 1)
+
+    def test_flush_sums_per_user_in_one_update(self):
+        award_aura_bulk([
+            AuraEvent(user=self.ana, delta=5, reason="adjustment"),
+            AuraEvent(user=self.ana, delta=7, reason="adjustment"),
+            AuraEvent(user=self.beto, delta=-3, reason="adjustment"),
+        ])
+        with capture_queries() as queries:
+            self.assertEqual(flush_aura_events(), 3)
+        user_updates = [sql for sql, _ in queries if sql.startswith('UPDATE "students_user"')]
+        self.assertEqual(len(user_updates), 1)
+        self.assertEqual((self.aura(self.ana), self.aura(self.beto)), (22, 17))
+        self.assertFalse(AuraEvent.objects.filter(applied_at__isnull=True).exists())
+
+    def test_batches(self):
+        award_aura_bulk([AuraEvent(user=self.ana, delta=1, reason="adjustment") for _ in range(3)])
+        self.assertEqual(flush_aura_events(batch_size=2), 2)
+        self.assertEqual(self.aura(self.ana), 12)
+        self.assertEqual(flush_aura_events(batch_size=2), 1)
+        self.assertEqual(flush_aura_events(batch_size=2), 0)
+        self.assertEqual(self.aura(self.ana), 13)
+
+        call_command("flush_aura_events", "--once", stdout=io.StringIO())
+        self.assertEqual(self.aura(self.ana), 13)
+
+    def test_rank_index_and_jwt_cache_refreshed(self):
+        cache_user(self.ana)
+        self.assertEqual(student_rank(self.ana), 2)
+        award_aura(self.ana, 50, "adjustment")
+        with self.captureOnCommitCallbacks(execute=True):
+            flush_aura_events()
+        self.ana.refresh_from_db()
+        self.assertEqual(student_rank(self.ana), 1)
+        self.assertEqual(get_rank_index(STUDENT_INDEX).rank(self.ana.pk), 1)
+        self.assertIsNone(cache.get(user_cache_key(self.ana.pk)))
+
+    def test_index_failure_still_invalidates_cache(self):
+        cache_user(self.ana)
+        award_aura(self.ana, 50, "adjustment")
+        index = get_rank_index(STUDENT_INDEX)
+        with mock.patch.object(type(index), "update_many", side_effect=ConnectionError), \
+                self.assertLogs("ranking.rank_index", "ERROR"), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_aura_events(), 1)
+        self.assertEqual(self.aura(self.ana), 60)
+        self.assertIsNone(cache.get(user_cache_key(self.ana.pk)))
+
+    def test_skip_locked(self):
+        award_aura(self.ana, 1, "adjustment")
+        select_for_update = QuerySet.select_for_update
+        with mock.patch.object(QuerySet, "select_for_update", autospec=True, side_effect=select_for_update) as lock:
+            flush_aura_events()
+        self.assertTrue(lock.call_args.kwargs["skip_locked"])
+
+
+class RankIndexTests(TestCase):
+    """Índice de ranking: registro acotado, empates, reconstrucción y respaldo en la base."""
+
+    def test_memory_indexes_bounded(self):
+        with mock.patch("ranking.rank_index.MAX_MEMORY_INDEXES", 2), \
+                mock.patch.dict(rank_index._memory_indexes, clear=True):
+            first = get_rank_index("test:a")
+            first.rebuild([(1, 10)])
+            get_rank_index("test:b")
+            self.assertIs(get_rank_index("test:a"), first)  # a pasa a ser el más reciente
+            get_rank_index("test:c")                          # descarta b
+            self.assertIs(get_rank_index("test:a"), first)
+            self.assertEqual(len(rank_index._memory_indexes), 2)
+            self.assertNotIn("test:b", rank_index._memory_indexes)
+
+    def test_redis_indexes_not_cached(self):
+        with override_settings(RANK_INDEX_BACKEND="redis"), \
+                mock.patch("ranking.rank_index._get_redis_client"):
+            self.assertIsNot(get_rank_index("merit:course:1"), get_rank_index("merit:course:1"))
+
+    def index(self, name="test:ranking"):
+        index = get_rank_index(name)
+        self.addCleanup(index.rebuild, [])
+        return index
+
+    def test_ties(self):
+        index = self.index()
+        index.rebuild([("a", 50), ("b", 30), ("c", 30), ("d", 10)])
+        self.assertEqual([index.rank(member) for member in "abcd"], [1, 2, 2, 4])
+        self.assertEqual(index.ranks_of_scores([30, 40, 5]), {30: 2, 40: 2, 5: 5})
+        self.assertEqual(with_ranks(index.top(4)), [("a", 50, 1), ("b", 30, 2), ("c", 30, 2), ("d", 10, 4)])
+
+        index.update("d", 30)
+        index.remove("a")
+        self.assertEqual([index.rank(member) for member in "bcd"], [1, 1, 1])
+        self.assertIsNone(index.rank("a"))
+
+    def test_rebuild_keeps_concurrent_changes(self):
+        index = self.index()
+        index.rebuild([("a", 1), ("b", 2), ("c", 3)])
+
+        def rows():
+            # Filas leídas antes de los cambios: llegan viejas
+            yield "a", 1
+            index.update("a", 100)
+            index.remove("b")
+            index.update("d", 4)
+            yield "b", 2
+            yield "c", 3
+
+        self.assertEqual(index.rebuild(rows()), 3)
+        self.assertEqual(index.top(10), [("a", 100), ("d", 4), ("c", 3)])
+        index.update("c", 200)  # terminada la reconstrucción ya no se registran cambios
+        self.assertEqual(index.rank("c"), 1)
+
+    def test_student_index(self):
+        User.objects.create_user("a@test.com", "a", "x", aura=30)
+        tied = User.objects.create_user("b@test.com", "b", "x", aura=30)
+        User.objects.create_user("t@test.com", "t", "x", role="teacher", aura=99)
+        low = User.objects.create_user("c@test.com", "c", "x", aura=10)
+        self.assertEqual(rebuild_student_index(), 3)
+        self.assertEqual((student_rank(tied), student_rank(low)), (1, 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            low.aura = 40
+            low.save(update_fields=["aura"])
+            tied.role = "teacher"
+            tied.save(update_fields=["role"])
+        index = get_rank_index(STUDENT_INDEX)
+        self.assertEqual((index.rank(low.pk), index.rank(tied.pk)), (1, None))
+
+    def test_rebuild_command_takes_the_lock(self):
+        User.objects.create_user("a@test.com", "a", "x", aura=3)
+        index = get_rank_index(STUDENT_INDEX)
+        out = io.StringIO()
+        with mock.patch.object(type(index), "release_rebuild") as release:
+            call_command("rebuild_rank_index", stdout=out)
+        self.assertIn("1 estudiantes", out.getvalue())
+        release.assert_called_once_with(True)
+
+        with mock.patch.object(type(index), "acquire_rebuild", return_value=None), \
+                self.assertRaises(CommandError):
+            call_command("rebuild_rank_index", stdout=out)
+
+    def test_fallback(self):
+        ana = User.objects.create_user("ana@test.com", "ana", "x", aura=5)
+        User.objects.create_user("beto@test.com", "beto", "x", aura=7)
+        index = get_rank_index(STUDENT_INDEX)
+        index.rebuild([])  # índice vacío: si se usara, ana sería la primera
+
+        # Otro proceso está reconstruyendo el índice frío
+        index.invalidate()
+        with mock.patch.object(type(index), "acquire_rebuild", return_value=None), \
+                self.assertNumQueries(3):
+            self.assertEqual(student_rank(ana), 2)
+            self.assertEqual(student_ranks([5, 7]), {5: 2, 7: 1})
+
+        # Redis caído
+        with mock.patch.object(type(index), "is_ready", side_effect=ConnectionError), \
+                self.assertLogs("ranking.rank_index", "ERROR"):
+            self.assertEqual(student_rank(ana), 2)
+
+
+class RedisRankIndexTests(SimpleTestCase):
+    """Reconstrucción en Redis con cambios concurrentes (requiere un Redis en REDIS_URL)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        try:
+            import redis
+
+            cls.client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+            cls.client.ping()
+        except Exception:
+            raise unittest.SkipTest("Redis not available")
+
+    def setUp(self):
+        self.index = RedisRankIndex("test:rebuild", self.client)
+        self.addCleanup(self.delete_keys)
+
+    def delete_keys(self):
+        keys = self.client.keys(f"{self.index.key}*")
+        if keys:
+            self.client.delete(*keys)
+
+    def test_rebuild_keeps_concurrent_changes(self):
+        index = self.index
+        index.rebuild([("a", 1), ("b", 2), ("c", 3)])
+
+        def rows():
+            yield "a", 1
+            index.update("a", 100)
+            index.remove("b")
+            index.update("d", 4)
+            yield "b", 2
+            yield "c", 3
+
+        self.assertEqual(index.rebuild(rows(), batch_size=1), 3)
+        self.assertEqual(index.top(10), [("a", 100), ("d", 4), ("c", 3)])
+        self.assertTrue(index.is_ready())
+        self.assertFalse(index.rebuilding())
+        self.assertFalse(self.client.exists(index.tmp_key, index.removed_key))
+
+    def test_ties_and_empty_rebuild(self):
+        self.index.rebuild([("a", 50), ("b", 30), ("c", 30)])
+        self.assertEqual([self.index.rank(member) for member in "abc"], [1, 2, 2])
+
+        def rows():
+            yield "a", 50
+            self.index.remove("a")
+
+        self.index.rebuild(rows())
+        self.assertEqual(self.index.top(10), [])
+        self.assertTrue(self.index.is_ready())
+
+    def test_rebuild_lock(self):
+        token = self.index.acquire_rebuild()
+        self.assertTrue(token)
+        self.assertIsNone(self.index.acquire_rebuild())
+        # El lock dura al menos lo que la reconstrucción
+        self.assertGreater(self.client.ttl(self.index.lock_key), 60)
+
+        # Solo lo libera quien lo tomó (p. ej. no un worker cuyo lock ya expiró)
+        self.index.release_rebuild("otro")
+        self.assertIsNone(self.index.acquire_rebuild())
+        self.index.release_rebuild(token)
+        self.assertTrue(self.index.acquire_rebuild())
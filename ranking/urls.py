@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import path
-from .views import RankingView
+from .views import AsyncRankingView, RankingHistoryView, RankingView
+
+Ranking = AsyncRankingView if settings.ASYNC_READ_VIEWS else RankingView
 
 urlpatterns = [
-    path('', RankingView.as_view(), name='ranking'),
+    path('', Ranking.as_view(), name='ranking'),
+    path('history/<uuid:user_id>/', RankingHistoryView.as_view(), name='ranking-history'),
 ]
@@ -1,60 +1,396 @@
+import json
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q, F, Window
-from django.db.models.functions import Rank
+from django.db.models import Q
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from plataform_back.async_views import AsyncAPIView, json_response
+from plataform_back.pagination import (
+    InvalidCursor, decode_cursor, decode_typed_cursor, encode_cursor, get_page_size,
+)
+from students.search import search_students
+from .models import RankingSnapshot, RankingSnapshotEntry
+from .rank_index import student_rank, student_ranks
+from .snapshots import fresh_snapshot, rank_history, snapshot_entry
 
 User = get_user_model()
 
+RANKING_FIELDS = ("id", "first_name", "last_name", "aura")
+SNAPSHOT_FIELDS = ("user_id", "user__first_name", "user__last_name", "aura", "rank", "percentile")
+EXPORT_CHUNK_SIZE = 2000
+HISTORY_DAYS = 90
+MAX_HISTORY_DAYS = 365
+
+
+def serialize_rows(rows):
+    """Convierte filas de values() en entradas de ranking con su posición global."""
+    return ranking_entries(rows, student_ranks(row["aura"] for row in rows))
+
+
+def ranking_entries(rows, ranks):
+    return [
+        {
+            "id": str(row["id"]),
+            "first_name": row["first_name"],
+            "last_name": row["last_name"],
+            "aura": row["aura"],
+            "rank": ranks.get(row["aura"]),
+        }
+        for row in rows
+    ]
+
+
+def after(aura, user_id):
+    """Filas que van después de (aura, id) en el orden (-aura, id)."""
+    return Q(aura__lt=aura) | Q(aura=aura, id__gt=user_id)
+
+
+def before(aura, user_id):
+    return Q(aura__gt=aura) | Q(aura=aura, id__lt=user_id)
+
+
+def stream_ranking(students):
+    """
+    Genera el ranking completo como un arreglo JSON, fila por fila.
+    La posición se calcula sobre la marcha (Rank(): empates comparten posición).
+    """
+    yield "["
+    rank = 0
+    previous_aura = None
+    rows = students.order_by("-aura", "id").values_list(*RANKING_FIELDS)
+    for position, (user_id, first_name, last_name, aura) in enumerate(
+        rows.iterator(chunk_size=EXPORT_CHUNK_SIZE), start=1
+    ):
+        if aura != previous_aura:
+            rank, previous_aura = position, aura
+        entry = {"id": str(user_id), "first_name": first_name, "last_name": last_name, "aura": aura, "rank": rank}
+        yield ("," if position > 1 else "") + json.dumps(entry)
+    yield "]"
+
+
+async def astream_ranking(students):
+    yield "["
+    rank = 0
+    previous_aura = None
+    position = 0
+    # values() y no values_list(): el iterable de values_list() ejecuta la consulta
+    # al crearse, fuera del hilo sync de aiterator()
+    rows = students.order_by("-aura", "id").values(*RANKING_FIELDS)
+    async for row in rows.aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+        position += 1
+        if row["aura"] != previous_aura:
+            rank, previous_aura = position, row["aura"]
+        entry = {**row, "id": str(row["id"]), "rank": rank}
+        yield ("," if position > 1 else "") + json.dumps(entry)
+    yield "]"
+
+
+def user_rank_entry(user, rank):
+    return {
+        "id": str(user.id),
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "aura": user.aura,
+        "rank": rank,
+    }
+
+
+def page_query(students, cursor, page_size):
+    """Página (page_size + 1 filas) después del cursor. InvalidCursor si no es válido."""
+    if cursor:
+        try:
+            aura, user_id = decode_typed_cursor(cursor, int, str)
+            students = students.filter(after(aura, uuid.UUID(user_id)))
+        except ValueError as exc:
+            raise InvalidCursor(str(exc))
+    return students.order_by("-aura", "id").values(*RANKING_FIELDS)[:page_size + 1]
+
+
+def split_page(rows, page_size):
+    """Recorta la fila extra y arma next_cursor si hay más."""
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor([rows[-1]["aura"], rows[-1]["id"]])
+    return rows, None
+
+
+# ---------------------------
+# Páginas desde el último snapshot (ranking/snapshots.py)
+# ---------------------------
+def page_snapshot(params):
+    """
+    Snapshot del que se lee la página, o None para leer en vivo (live=1, sin
+    snapshot reciente o cursor de una página en vivo). Con cursor se sigue en
+    el mismo snapshot aunque haya uno más nuevo.
+    """
+    if params.get("live"):
+        return None
+    cursor = params.get("cursor")
+    if not cursor:
+        return fresh_snapshot()
+    values = decode_cursor(cursor)
+    if not values or values[0] != "s":
+        return None
+    try:
+        return RankingSnapshot.objects.get(pk=int(values[1]))
+    except (IndexError, TypeError, ValueError, RankingSnapshot.DoesNotExist):
+        raise InvalidCursor("Invalid cursor")
+
+
+def snapshot_page_query(snapshot, cursor, page_size):
+    """Página (page_size + 1 filas) del snapshot en orden (rank, user_id)."""
+    entries = RankingSnapshotEntry.objects.filter(snapshot=snapshot)
+    if cursor:
+        try:
+            _, _, rank, user_id = decode_typed_cursor(cursor, str, int, int, str)
+            entries = entries.filter(Q(rank__gt=rank) | Q(rank=rank, user_id__gt=uuid.UUID(user_id)))
+        except ValueError as exc:
+            raise InvalidCursor(str(exc))
+    return entries.order_by("rank", "user_id").values(*SNAPSHOT_FIELDS)[:page_size + 1]
+
+
+def split_snapshot_page(snapshot, rows, page_size):
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(["s", snapshot.pk, rows[-1]["rank"], rows[-1]["user_id"]])
+    return rows, None
+
+
+def snapshot_entries(rows):
+    return [
+        {
+            "id": str(row["user_id"]),
+            "first_name": row["user__first_name"],
+            "last_name": row["user__last_name"],
+            "aura": row["aura"],
+            "rank": row["rank"],
+            "percentile": round(row["percentile"], 2),
+        }
+        for row in rows
+    ]
+
+
+def snapshot_user_rank(snapshot, user, live_rank):
+    """Posición del usuario en el snapshot (la del índice si entró después)."""
+    entry = snapshot_entry(snapshot, user.id)
+    if entry is None:
+        return live_rank
+    return {**user_rank_entry(user, entry["rank"]), "aura": entry["aura"], "percentile": round(entry["percentile"], 2)}
+
+
+def history_since(params):
+    days = max(1, min(int(params.get("days", HISTORY_DAYS)), MAX_HISTORY_DAYS))
+    return timezone.now() - timedelta(days=days)
+
+
+def around_size(params):
+    return max(1, min(int(params["around"]), settings.MAX_PAGE_SIZE))
+
+
+def around_queries(students, user, size):
+    above = students.filter(before(user.aura, user.id)).order_by("aura", "-id").values(*RANKING_FIELDS)[:size]
+    below = students.filter(after(user.aura, user.id)).order_by("-aura", "id").values(*RANKING_FIELDS)[:size + 1]
+    return above, below
+
+
+def around_rows(user, above, below, size):
+    below, next_cursor = split_page(below, size)
+    me = {field: getattr(user, field) for field in RANKING_FIELDS}
+    return above[::-1] + [me] + below, next_cursor
+
+
 class RankingView(APIView):
     """
-    GET /api/ranking/?search=<name>
+    GET /api/ranking/?cursor=<cursor>&page_size=<n>&live=<0|1>
     - Devuelve:
       1. Posición del estudiante logueado (obtenido vía JWT)
-      2. Ranking general ordenado por aura
+      2. Una página del ranking general ordenado por aura (-aura, id)
+      3. next_cursor para pedir la página siguiente (null si no hay más)
+      4. snapshot_at: las páginas se leen del último snapshot del ranking
+         (con percentil); con live=1, o si no hay uno reciente, se calculan en vivo
+
+    GET /api/ranking/?search=<texto>
+    - Estudiantes que coinciden por nombre, apellido o email (máx. STUDENT_SEARCH_LIMIT)
+
+    GET /api/ranking/?around=<n>
+    - Las n filas arriba y abajo del estudiante logueado
+
+    GET /api/ranking/?export=1
+    - Ranking completo como JSON en streaming
     """
-    authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    query_budget = 4
 
     def get(self, request):
         search_query = request.query_params.get("search", "")
 
         students = User.objects.filter(role="student")
 
+        if request.query_params.get("export"):
+            response = StreamingHttpResponse(stream_ranking(students), content_type="application/json")
+            response["Content-Disposition"] = 'attachment; filename="ranking.json"'
+            return response
+
+        # Posición del usuario logueado, sin recorrer el ranking
+        user = request.user
+        user_rank = None
+        if user.role == "student":
+            user_rank = user_rank_entry(user, student_rank(user))
+
+        # Búsqueda: resultados acotados y ordenados por relevancia, sin cursor
         if search_query:
-            students = students.filter(
-                Q(first_name__icontains=search_query) |
-                Q(last_name__icontains=search_query) |
-                Q(email__icontains=search_query)
-            )
+            rows = list(search_students(search_query, get_page_size(request)).values(*RANKING_FIELDS))
+            return Response({
+                "user_rank": user_rank,
+                "ranking": serialize_rows(rows),
+                "next_cursor": None,
+                "snapshot_at": None,
+            }, status=status.HTTP_200_OK)
 
-        # Anotar ranking
-        ranked_students = students.annotate(
-            rank=Window(
-                expression=Rank(),
-                order_by=F('aura').desc()
-            )
-        ).order_by('-aura')
-
-        # Preparar datos del ranking general
-        ranking = [
-            {
-                "id": str(s.id),
-                "first_name": s.first_name,
-                "last_name": s.last_name,
-                "aura": s.aura,
-                "rank": s.rank
-            }
-            for s in ranked_students
-        ]
+        if request.query_params.get("around"):
+            return self.get_around(request, students, user_rank)
+
+        page_size = get_page_size(request)
+        cursor = request.query_params.get("cursor")
+        try:
+            snapshot = page_snapshot(request.query_params)
+            if snapshot is not None:
+                rows = list(snapshot_page_query(snapshot, cursor, page_size))
+            else:
+                rows = list(page_query(students, cursor, page_size))
+        except InvalidCursor:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if snapshot is not None:
+            rows, next_cursor = split_snapshot_page(snapshot, rows, page_size)
+            if user.role == "student":
+                user_rank = snapshot_user_rank(snapshot, user, user_rank)
+            ranking = snapshot_entries(rows)
+        else:
+            rows, next_cursor = split_page(rows, page_size)
+            ranking = serialize_rows(rows)
+
+        return Response({
+            "user_rank": user_rank,
+            "ranking": ranking,
+            "next_cursor": next_cursor,
+            "snapshot_at": snapshot.taken_at if snapshot else None,
+        }, status=status.HTTP_200_OK)
 
-        # Encontrar posición del usuario logueado
-        user_rank = next((s for s in ranking if s["id"] == str(request.user.id)), None)
+    def get_around(self, request, students, user_rank):
+        if user_rank is None:
+            return Response({"error": "Only students have a ranking position"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            size = around_size(request.query_params)
+        except ValueError:
+            return Response({"error": "around must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
 
+        above, below = around_queries(students, request.user, size)
+        rows, next_cursor = around_rows(request.user, list(above), list(below), size)
         return Response({
             "user_rank": user_rank,
-            "ranking": ranking
+            "ranking": serialize_rows(rows),
+            "next_cursor": next_cursor,
+            "snapshot_at": None,
         }, status=status.HTTP_200_OK)
+
+
+class RankingHistoryView(APIView):
+    """
+    GET /api/ranking/history/<user_id>/?days=<n>
+    - Posición, aura y percentil del estudiante en cada snapshot de los
+      últimos n días (por defecto 90), del más viejo al más nuevo
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 2
+
+    def get(self, request, user_id):
+        try:
+            since = history_since(request.query_params)
+        except ValueError:
+            return Response({"error": "days must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        history = [
+            {**row, "percentile": round(row["percentile"], 2)}
+            for row in rank_history(user_id, since)
+        ]
+        return Response({"user_id": str(user_id), "history": history}, status=status.HTTP_200_OK)
+
+
+# ---------------------------
+# Async (ASGI, ver plataform_back/async_views.py)
+# ---------------------------
+class AsyncRankingView(AsyncAPIView):
+    """Mismos parámetros y respuestas que RankingView, con ORM y caché async."""
+    query_budget = 4
+
+    async def get(self, request):
+        params = request.GET
+        students = User.objects.filter(role="student")
+
+        if params.get("export"):
+            response = StreamingHttpResponse(astream_ranking(students), content_type="application/json")
+            response["Content-Disposition"] = 'attachment; filename="ranking.json"'
+            return response
+
+        user = request.user
+        user_rank = None
+        if user.role == "student":
+            user_rank = user_rank_entry(user, await sync_to_async(student_rank)(user))
+
+        next_cursor = None
+        if params.get("search"):
+            query = search_students(params["search"], get_page_size(request)).values(*RANKING_FIELDS)
+            rows = [row async for row in query]
+        elif params.get("around"):
+            if user_rank is None:
+                return json_response({"error": "Only students have a ranking position"}, status=400)
+            try:
+                size = around_size(params)
+            except ValueError:
+                return json_response({"error": "around must be an integer"}, status=400)
+            above, below = around_queries(students, user, size)
+            rows, next_cursor = around_rows(
+                user, [row async for row in above], [row async for row in below], size
+            )
+        else:
+            page_size = get_page_size(request)
+            try:
+                snapshot = await sync_to_async(page_snapshot)(params)
+                if snapshot is not None:
+                    query = snapshot_page_query(snapshot, params.get("cursor"), page_size)
+                else:
+                    query = page_query(students, params.get("cursor"), page_size)
+                rows = [row async for row in query]
+            except InvalidCursor:
+                return json_response({"error": "Invalid cursor"}, status=400)
+
+            if snapshot is not None:
+                rows, next_cursor = split_snapshot_page(snapshot, rows, page_size)
+                if user.role == "student":
+                    user_rank = await sync_to_async(snapshot_user_rank)(snapshot, user, user_rank)
+                return json_response({
+                    "user_rank": user_rank,
+                    "ranking": snapshot_entries(rows),
+                    "next_cursor": next_cursor,
+                    "snapshot_at": snapshot.taken_at,
+                })
+            rows, next_cursor = split_page(rows, page_size)
+
+        # El índice de ranking es síncrono (Redis); se consulta fuera del event loop
+        ranks = await sync_to_async(student_ranks)([row["aura"] for row in rows])
+        return json_response({
+            "user_rank": user_rank,
+            "ranking": ranking_entries(rows, ranks),
+            "next_cursor": next_cursor,
+            "snapshot_at": None,
+        })
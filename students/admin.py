@@ -1,5 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+
+from plataform_back.pagination import EstimatedCountPaginator
 from .models import User
 
 @admin.register(User)
@@ -8,6 +10,9 @@ class UserAdmin(BaseUserAdmin):
     list_display = ["email", "username", "first_name", "last_name", "role", "is_active", "is_staff", "verified"]
     search_fields = ["email", "username", "first_name", "last_name"]
     list_filter = ["role", "is_active", "is_staff", "verified"]
+    # Sin filtros, el total sale de las estadísticas de la tabla (no un COUNT(*))
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     # Campos solo lectura (ej: last_login)
     readonly_fields = ("last_login",)
@@ -18,7 +23,7 @@ class UserAdmin(BaseUserAdmin):
         ("Personal Info", {
             "fields": (
                 "username", "first_name", "last_name",
-                "birthday", "aura", "specialty", "profile_picture"
+                "birthday", "aura", "specialty"
             )
         }),
         ("Teacher Info", {"fields": ("experience_years", "verified", "hourly_rate")}),
@@ -32,7 +37,7 @@ class UserAdmin(BaseUserAdmin):
             "classes": ("wide",),
             "fields": (
                 "email", "username", "first_name", "last_name", "role",
-                "birthday", "aura", "specialty", "profile_picture",
+                "birthday", "aura", "specialty",
                 "experience_years", "verified", "hourly_rate",
                 "password1", "password2"
             ),
@@ -0,0 +1,135 @@
+"""
+Autenticación JWT sin consulta a la base en cada request.
+
+JWTAuthentication de simplejwt hace un SELECT del usuario por request. Aquí
+el usuario se reconstruye desde una caché de TTL corto (JWT_USER_CACHE_TIMEOUT);
+los claims que agrega MyTokenObtainPairSerializer (role, username, email) se
+comparan con la copia cacheada y, si no coinciden, se vuelve a leer de la base.
+
+La caché se invalida en post_save/post_delete de User (ver students/models.py),
+lo que incluye los cambios de contraseña.
+
+Solo se cachean los campos que usan las vistas (CACHED_FIELDS), nunca el
+hash de la contraseña: para CHECK_REVOKE_TOKEN se guarda el mismo md5 que
+simplejwt pone en el token. El usuario que sale de la caché es parcial: las
+vistas que lo modifican o muestran el perfil completo lo leen de la base.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from plataform_back.instrumentation import record_cache
+
+CLAIM_FIELDS = ("role", "username", "email")
+CACHED_FIELDS = ("id", *CLAIM_FIELDS, "first_name", "last_name", "aura", "is_active", "is_staff")
+
+
+def user_cache_key(user_id):
+    return f"jwt-user:{user_id}"
+
+
+def user_cache_data(user):
+    data = {field: getattr(user, field) for field in CACHED_FIELDS}
+    data["password_digest"] = get_md5_hash_password(user.password)
+    return data
+
+
+def cache_user(user):
+    cache.set(user_cache_key(user.pk), user_cache_data(user), settings.JWT_USER_CACHE_TIMEOUT)
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def invalidate_cached_users(user_ids):
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        data = cache.get(user_cache_key(user_id))
+        fresh = self.is_fresh(data, validated_token)
+        record_cache(hit=fresh)
+        if not fresh:
+            user = super().get_user(validated_token)
+            cache_user(user)
+            return user
+        return self.check_user(self.user_from_cache(data), validated_token)
+
+    async def aauthenticate(self, request):
+        """Versión async de authenticate() para las vistas async (plataform_back/async_views.py)."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        data = await cache.aget(user_cache_key(user_id))
+        fresh = self.is_fresh(data, validated_token)
+        record_cache(hit=fresh)
+        if fresh:
+            return self.check_user(self.user_from_cache(data), validated_token)
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        user = self.check_user(user, validated_token)
+        await cache.aset(user_cache_key(user.pk), user_cache_data(user), settings.JWT_USER_CACHE_TIMEOUT)
+        return user
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+    def is_fresh(self, data, validated_token):
+        return data is not None and not any(
+            field in validated_token and validated_token[field] != data[field] for field in CLAIM_FIELDS
+        )
+
+    def user_from_cache(self, data):
+        data = dict(data)
+        password_digest = data.pop("password_digest")
+        user = self.user_model(**data)
+        user._state.adding = False
+        user._state.db = "default"
+        user.password_digest = password_digest
+        return user
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Usuario cacheado: el md5 guardado; leído de la base: el del hash
+            password_digest = getattr(user, "password_digest", None) or get_md5_hash_password(user.password)
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_digest:
+                raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        return user
+
+
+class OptionalJWTAuthentication(CachedJWTAuthentication):
+    """Un token inválido o vencido se trata como usuario anónimo en vez de 401."""
+
+    def authenticate(self, request):
+        try:
+            return super().authenticate(request)
+        except (InvalidToken, AuthenticationFailed):
+            return None
+
+    async def aauthenticate(self, request):
+        try:
+            return await super().aauthenticate(request)
+        except (InvalidToken, AuthenticationFailed):
+            return None
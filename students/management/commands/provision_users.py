@@ -0,0 +1,42 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.provisioning import PROVISION_BATCH_SIZE, provision_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea usuarios en bloque desde un CSV con cabecera "
+        "(email,username,password,first_name,last_name,role). Usa '-' para leer de stdin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--dry-run", action="store_true", help="Solo valida, no crea nada")
+        parser.add_argument("--workers", type=int, default=None, help="Procesos para el hash (por defecto, todos los núcleos)")
+        parser.add_argument("--batch-size", type=int, default=PROVISION_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        def progress(report):
+            self.stderr.write(f"{report.created}/{report.valid} usuarios creados")
+
+        path = options["csv_path"]
+        try:
+            lines = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8-sig")
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with lines:
+            report = provision_users(
+                csv.DictReader(lines),
+                dry_run=options["dry_run"],
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                progress=progress,
+            )
+
+        summary = report.as_dict()
+        for error in summary.pop("errors"):
+            self.stderr.write(f"fila {error['line']}: {error['error']}")
+        self.stdout.write(", ".join(f"{key}={value}" for key, value in summary.items()))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:12
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def fill_search_text(apps, schema_editor):
+    User = apps.get_model("students", "User")
+    fields = ("first_name", "last_name", "email", "username")
+    batch = []
+    for user in User.objects.only("id", *fields).iterator(chunk_size=2000):
+        parts = (getattr(user, field) for field in fields)
+        user.search_text = " ".join(part.lower() for part in parts if part)
+        batch.append(user)
+        if len(batch) >= 2000:
+            User.objects.bulk_update(batch, ["search_text"])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ["search_text"])
+
+
+def create_trigram_index(apps, schema_editor):
+    # Solo PostgreSQL: en SQLite la búsqueda funciona sin índice
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS students_user_search_trgm "
+        "ON students_user USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS students_user_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_remove_user_profile_picture_alter_user_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('students', '0004_user_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('role', 'student')), fields=['-aura', 'id'], name='user_student_ranking_idx'),
+        ),
+    ]
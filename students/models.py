@@ -1,5 +1,7 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 
@@ -69,10 +71,46 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     joined_at = models.DateTimeField(auto_now_add=True)
 
+    # Texto normalizado para la búsqueda de estudiantes (students/search.py).
+    # En PostgreSQL tiene un índice GIN gin_trgm_ops creado en la migración 0004.
+    search_text = models.TextField(blank=True, default="", editable=False)
+
     objects = UserManager()
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username"]
+    SEARCH_FIELDS = ("first_name", "last_name", "email", "username")
+
+    def build_search_text(self):
+        parts = (getattr(self, field) for field in self.SEARCH_FIELDS)
+        return " ".join(part.lower() for part in parts if part)
+
+    def save(self, *args, **kwargs):
+        self.search_text = self.build_search_text()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(self.SEARCH_FIELDS) & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "search_text"}
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # Ranking: páginas por (-aura, id), vecinos (around) y conteo aura > x, solo estudiantes
+            models.Index(
+                fields=["-aura", "id"], condition=models.Q(role="student"), name="user_student_ranking_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.role})"
+
+
+# ---------------------------
+# Signals
+# ---------------------------
+@receiver([post_save, post_delete], sender=User)
+def invalidate_auth_cache(sender, instance, **kwargs):
+    # Cualquier cambio (incluida la contraseña) invalida el usuario cacheado del JWT
+    from .authentication import invalidate_cached_user
+
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
@@ -0,0 +1,206 @@
+"""
+Alta masiva de usuarios.
+
+Casi todo el costo de crear usuarios es el hash de la contraseña (PBKDF2),
+que es CPU puro: aquí se reparte en un ProcessPoolExecutor entre todos los
+núcleos y los usuarios se insertan con bulk_create por lotes, a medida que
+van saliendo los hashes. El pool es para el comando provision_users; la API
+(ProvisionUsersView) usa workers=1 para no hacer fork del worker web.
+
+La validación de email/username únicos contra la base de datos es una sola
+consulta y puede correrse sola (dry_run) antes de importar.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+
+PROVISION_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+ROW_FIELDS = ("email", "username", "password", "role", "first_name", "last_name")
+
+
+def _init_worker():
+    # Con el método "spawn" el proceso hijo arranca sin Django configurado
+    django.setup()
+
+
+def _hash_password(password):
+    return make_password(password or None)
+
+
+class ProvisionReport:
+    def __init__(self):
+        self.rows = 0
+        self.valid = 0
+        self.created = 0
+        self.invalid = 0
+        self.conflicts = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def error(self, line, message):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "valid": self.valid,
+            "created": self.created,
+            "invalid": self.invalid,
+            "conflicts": self.conflicts,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "users_per_second": round(self.created / self.elapsed, 1) if self.elapsed else 0.0,
+            "errors": self.errors,
+        }
+
+
+def text_fields(row):
+    """
+    Campos de la fila como texto: los números se convierten con str() y los
+    vacíos (None, "") se omiten. None si la fila no es un objeto o trae una
+    lista, un objeto o un booleano en algún campo.
+    """
+    if not isinstance(row, dict):
+        return None
+    fields = {}
+    for name in ROW_FIELDS:
+        value = row.get(name)
+        if value is None or value == "":
+            continue
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            return None
+        fields[name] = str(value)
+    return fields
+
+
+def clean_rows(rows, report):
+    """
+    Normaliza y valida las filas ({email, username, password, role, first_name,
+    last_name}). Devuelve las válidas; los duplicados dentro del archivo y
+    contra la base de datos (una consulta) se reportan como conflictos.
+    """
+    User = get_user_model()
+    roles = {role for role, _ in User.ROLE_CHOICES}
+    cleaned = []
+    emails, usernames = set(), set()
+    for line, row in enumerate(rows, start=1):
+        report.rows += 1
+        fields = text_fields(row)
+        if fields is None:
+            report.invalid += 1
+            report.error(line, "Fields must be text")
+            continue
+        email = User.objects.normalize_email(fields.get("email", "").strip())
+        username = fields.get("username", "").strip()
+        role = fields.get("role", "").strip() or "student"
+        if not email or "@" not in email or not username:
+            report.invalid += 1
+            report.error(line, "email and username required")
+            continue
+        if role not in roles:
+            report.invalid += 1
+            report.error(line, f"Invalid role: {role}")
+            continue
+        if email in emails or username in usernames:
+            report.conflicts += 1
+            report.error(line, f"Repeated in file: {email} / {username}")
+            continue
+        emails.add(email)
+        usernames.add(username)
+        cleaned.append({
+            "line": line,
+            "email": email,
+            "username": username,
+            "role": role,
+            "first_name": fields.get("first_name", "").strip(),
+            "last_name": fields.get("last_name", "").strip(),
+            "password": fields.get("password", ""),
+        })
+
+    taken = User.objects.filter(Q(email__in=emails) | Q(username__in=usernames)).values_list("email", "username")
+    taken_emails, taken_usernames = set(), set()
+    for email, username in taken:
+        taken_emails.add(email)
+        taken_usernames.add(username)
+
+    valid = []
+    for row in cleaned:
+        if row["email"] in taken_emails or row["username"] in taken_usernames:
+            report.conflicts += 1
+            report.error(row["line"], f"Already exists: {row['email']} / {row['username']}")
+        else:
+            valid.append(row)
+    report.valid = len(valid)
+    return valid
+
+
+def hash_passwords(passwords, workers=None):
+    """Hashes en el mismo orden que passwords, calculados en paralelo (iterador)."""
+    workers = workers or os.cpu_count() or 1
+    passwords = list(passwords)
+    if workers == 1 or len(passwords) < 2:
+        yield from map(_hash_password, passwords)
+        return
+    chunksize = max(1, len(passwords) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        yield from executor.map(_hash_password, passwords, chunksize=chunksize)
+
+
+def insert_batch(users):
+    from ranking.rank_index import sync_students
+
+    User = get_user_model()
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        # bulk_create no dispara post_save: el índice de ranking se actualiza aquí
+        students = [(user.pk, user.aura) for user in users if user.role == "student"]
+        transaction.on_commit(lambda: sync_students(students))
+
+
+def provision_users(rows, dry_run=False, batch_size=PROVISION_BATCH_SIZE, workers=None, progress=None):
+    """
+    Crea los usuarios válidos de rows. Con dry_run solo valida (sin hashear
+    ni insertar). progress(report) se llama después de cada lote.
+    """
+    User = get_user_model()
+    report = ProvisionReport()
+    valid = clean_rows(rows, report)
+    if dry_run or not valid:
+        return report
+
+    batch = []
+    hashes = hash_passwords((row["password"] for row in valid), workers)
+    for row, password in zip(valid, hashes):
+        user = User(
+            email=row["email"],
+            username=row["username"],
+            role=row["role"],
+            first_name=row["first_name"],
+            last_name=row["last_name"],
+            password=password,
+        )
+        user.search_text = user.build_search_text()
+        batch.append(user)
+        if len(batch) >= batch_size:
+            insert_batch(batch)
+            report.created += len(batch)
+            batch = []
+            if progress:
+                progress(report)
+    if batch:
+        insert_batch(batch)
+        report.created += len(batch)
+        if progress:
+            progress(report)
+    return report
@@ -0,0 +1,44 @@
+"""
+Búsqueda de estudiantes por nombre, apellido, email o username.
+
+Se busca sobre User.search_text (los campos ya normalizados en minúsculas).
+En PostgreSQL la columna tiene un índice GIN con gin_trgm_ops, así que el
+LIKE '%término%' resuelve con el índice y no con un recorrido secuencial.
+En SQLite la misma consulta funciona sin índice (fallback para desarrollo).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Case, IntegerField, Value, When
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+def search_students(query, limit=None, queryset=None):
+    """
+    Estudiantes que contienen el término, ordenados por relevancia:
+    primero los que empiezan con el término, luego los que tienen una
+    palabra que empieza con él y al final el resto; a igualdad, por aura.
+    """
+    User = get_user_model()
+    if queryset is None:
+        queryset = User.objects.filter(role="student")
+    limit = min(limit or settings.STUDENT_SEARCH_LIMIT, settings.STUDENT_SEARCH_LIMIT)
+
+    term = normalize_query(query)
+    if not term:
+        return queryset.none()
+
+    return (
+        queryset.filter(search_text__contains=term)
+        .annotate(
+            match=Case(
+                When(search_text__startswith=term, then=Value(0)),
+                When(search_text__contains=f" {term}", then=Value(1)),
+                default=Value(2),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("match", "-aura", "id")[:limit]
+    )
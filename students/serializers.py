@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.utils.timezone import localtime
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from ranking.rank_index import student_rank
 
 User = get_user_model()
 
@@ -29,13 +30,9 @@ class UserPublicSerializer(serializers.ModelSerializer):
         ]
 
     def get_ranking(self, obj):
-        if obj.aura is None:
-            return None
-        users = User.objects.order_by("-aura").values_list("id", flat=True)
-        try:
-            return list(users).index(obj.id) + 1
-        except ValueError:
-            return None
+        if "ranking" in self.context:
+            return self.context["ranking"]
+        return student_rank(obj)
 
     def get_member_since(self, obj):
         if getattr(obj, "joined_at", None):
@@ -72,13 +69,9 @@ class UserFullSerializer(serializers.ModelSerializer):
         ]
 
     def get_ranking(self, obj):
-        if obj.aura is None:
-            return None
-        users = User.objects.order_by("-aura").values_list("id", flat=True)
-        try:
-            return list(users).index(obj.id) + 1
-        except ValueError:
-            return None
+        if "ranking" in self.context:
+            return self.context["ranking"]
+        return student_rank(obj)
 
     def get_member_since(self, obj):
         if getattr(obj, "joined_at", None):
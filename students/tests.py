@@ -1,3 +1,220 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import CachedJWTAuthentication, user_cache_key
+from .models import User
+from .provisioning import provision_users
+from .search import search_students
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """Usuario del JWT desde la caché: campos cacheados, aciertos e invalidación."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("ana@test.com", "ana", "OldPass1234", first_name="Ana")
+
+    def setUp(self):
+        cache.clear()
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def token(self):
+        return str(RefreshToken.for_user(self.user).access_token)
+
+    def test_cache_hit(self):
+        token = self.token()
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual((user.role, user.first_name, user.aura), ("student", "Ana", 0))
+
+    def test_no_secrets_in_cache(self):
+        self.authenticate(self.token())
+        data = cache.get(user_cache_key(self.user.pk))
+        self.assertNotIn("password", data)
+        self.assertNotIn("is_superuser", data)
+        self.assertNotIn("last_login", data)
+        self.assertNotIn(self.user.password, data.values())
+
+    def test_invalidated_on_save(self):
+        token = self.token()
+        self.authenticate(token)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).first().save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+        self.user.aura = 40
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=["aura"])
+        self.assertEqual(self.authenticate(token).aura, 40)
+
+    def test_password_change(self):
+        token = self.token()
+        self.authenticate(token)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                reverse("change-password"), {"old_password": "OldPass1234", "new_password": "NewPass5678"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+        # La fila completa no se pisó con la copia parcial de la caché
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("NewPass5678"))
+        self.assertEqual(self.user.first_name, "Ana")
+
+    def test_revoked_token_rejected_from_cache(self):
+        # simplejwt no recarga api_settings en los módulos que ya lo importaron
+        with mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True):
+            old_token = self.token()
+            self.user.set_password("NewPass5678")
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.save()
+            self.authenticate(self.token())
+
+            # El token viejo llega a la copia cacheada: el md5 guardado ya no coincide
+            with self.assertNumQueries(0), self.assertRaises(AuthenticationFailed):
+                self.authenticate(old_token)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ProvisionUsersTests(TestCase):
+    """Alta masiva: validación (dry_run), creación y límites de la API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin@test.com", "admin", "x", role="admin")
+        User.objects.create_user("taken@test.com", "taken", "x")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse("provision-users")
+
+    def rows(self, count, prefix="new"):
+        return [
+            {"email": f"{prefix}{i}@test.com", "username": f"{prefix}{i}", "password": "Secret1234"}
+            for i in range(count)
+        ]
+
+    def test_validation(self):
+        rows = self.rows(2) + [
+            {"email": "new0@test.com", "username": "other"},    # repetido en el archivo
+            {"email": "taken@test.com", "username": "fresh"},   # ya existe
+            {"email": "", "username": "noemail"},
+            {"email": "x@test.com", "username": "x", "role": "root"},
+        ]
+        report = provision_users(rows, dry_run=True)
+        self.assertEqual((report.rows, report.valid, report.invalid, report.conflicts), (6, 2, 2, 2))
+        self.assertEqual([error["line"] for error in report.errors], [3, 5, 6, 4])
+        self.assertEqual(report.created, 0)
+        self.assertFalse(User.objects.filter(username="new0").exists())
+
+    def test_non_text_values(self):
+        rows = [
+            {"email": "n1@test.com", "username": 123, "password": "Secret1234"},   # número: se convierte
+            {"email": "n2@test.com", "username": ["x"]},
+            {"email": "n3@test.com", "username": "n3", "first_name": {"a": 1}},
+            {"email": "n4@test.com", "username": "n4", "role": True},
+        ]
+        report = provision_users(rows, workers=1)
+        self.assertEqual((report.created, report.invalid), (1, 3))
+        self.assertEqual([error["line"] for error in report.errors], [2, 3, 4])
+        self.assertTrue(User.objects.filter(username="123").exists())
+
+        response = self.client.post(self.url, {"users": [{"email": "n5@test.com", "username": [1]}]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["errors"], [{"line": 1, "error": "Fields must be text"}])
+
+    def test_create(self):
+        report = provision_users(self.rows(3), batch_size=2, workers=1)
+        self.assertEqual(report.created, 3)
+        user = User.objects.get(email="new2@test.com")
+        self.assertTrue(user.check_password("Secret1234"))
+        self.assertEqual(user.role, "student")
+        self.assertEqual(user.search_text, "new2@test.com new2")
+
+    def test_api_dry_run(self):
+        response = self.client.post(self.url, {"users": self.rows(150), "dry_run": True}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["valid"], response.json()["created"]), (150, 0))
+        self.assertFalse(User.objects.filter(username="new0").exists())
+
+    def test_api_create_capped(self):
+        response = self.client.post(self.url, {"users": self.rows(101)}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        with mock.patch("students.provisioning.ProcessPoolExecutor") as pool:
+            response = self.client.post(self.url, {"users": self.rows(3)}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 3)
+        pool.assert_not_called()
+
+    def test_api_requires_admin(self):
+        self.client.force_authenticate(User.objects.get(username="taken"))
+        response = self.client.post(self.url, {"users": self.rows(1)}, format="json")
+        self.assertEqual(response.status_code, 403)
+
+
+class StudentSearchTests(TestCase):
+    """Búsqueda sobre search_text: relevancia, campos buscados y límite."""
+
+    @classmethod
+    def setUpTestData(cls):
+        def student(username, aura=0, **fields):
+            return User.objects.create_user(f"{username}@test.com", username, "x", aura=aura, **fields)
+
+        cls.mariana = student("u1", aura=5, first_name="Mariana")
+        cls.marco = student("u2", aura=20, first_name="Marco")
+        cls.ana = student("u3", aura=50, first_name="Ana", last_name="Martínez")
+        cls.omar = student("omar", aura=90)
+        student("zeta99", first_name="Zoe")
+        User.objects.create_user("mario@test.com", "mario", "x", role="teacher", first_name="Mario")
+
+    def search(self, query, limit=None):
+        return [user.username for user in search_students(query, limit)]
+
+    def test_ranked_matches(self):
+        # Empieza con el término, luego una palabra que empieza con él, luego el resto; a igualdad por aura
+        self.assertEqual(self.search("mar"), ["u2", "u1", "u3", "omar"])
+        self.assertEqual(self.search("  MAR "), self.search("mar"))
+        self.assertEqual(self.search("martínez"), ["u3"])
+
+    def test_username_and_email_match(self):
+        self.assertEqual(self.search("zeta99"), ["zeta99"])
+        self.assertEqual(self.search("omar@test"), ["omar"])
+        self.assertEqual(self.search("mario"), [])  # solo estudiantes
+        self.assertEqual(self.search("   "), [])
+
+    def test_search_text_follows_updates(self):
+        self.ana.last_name = "Quiroga"
+        self.ana.save(update_fields=["last_name"])
+        self.assertEqual(self.search("quiroga"), ["u3"])
+        self.assertNotIn("u3", self.search("mar"))
+
+    def test_limit(self):
+        self.assertEqual(len(self.search("mar", limit=2)), 2)
+        with override_settings(STUDENT_SEARCH_LIMIT=3):
+            self.assertEqual(self.search("mar"), ["u2", "u1", "u3"])
+            self.assertEqual(len(self.search("mar", limit=50)), 3)
+
+    def test_ranking_search_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.marco)
+        data = client.get(reverse("ranking"), {"search": "mar", "page_size": 2}).json()
+        self.assertEqual([row["id"] for row in data["ranking"]], [str(self.marco.id), str(self.mariana.id)])
+        self.assertIsNone(data["next_cursor"])
@@ -1,9 +1,13 @@
+from django.conf import settings
 from django.urls import path
-from .views import LoginView, ProfileView, ChangePasswordView
+from .views import LoginView, ProfileView, AsyncProfileView, ChangePasswordView, ProvisionUsersView
 from uuid import UUID
 
+Profile = AsyncProfileView if settings.ASYNC_READ_VIEWS else ProfileView
+
 urlpatterns = [
     path("login/", LoginView.as_view(), name="login"),
-    path("profile/<uuid:user_id>/", ProfileView.as_view(), name="profile"),  # <-- cambiar int a uuid
+    path("profile/<uuid:user_id>/", Profile.as_view(), name="profile"),  # <-- cambiar int a uuid
     path("change-password/", ChangePasswordView.as_view(), name="change-password"),
+    path("admin/provision/", ProvisionUsersView.as_view(), name="provision-users"),
 ]
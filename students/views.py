@@ -1,14 +1,19 @@
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
 from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import OptionalJWTAuthentication
+from .provisioning import provision_users
 from .serializers import UserPublicSerializer, UserFullSerializer, MyTokenObtainPairSerializer
-from django.shortcuts import get_object_or_404
-from django.db.models import F, Window
-from django.db.models.functions import Rank
-from rest_framework_simplejwt.tokens import AccessToken
+from courses.views import IsAdmin
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from plataform_back.async_views import AsyncAPIView, json_response
+from plataform_back.conditional import make_etag, not_modified, with_validators
+from plataform_back.instrumentation import timing
+from ranking.rank_index import student_rank
 
 User = get_user_model()
 
@@ -60,7 +65,8 @@ class ChangePasswordView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        user = request.user
+        # request.user puede venir de la caché del JWT (sin contraseña): se lee la fila completa
+        user = User.objects.get(pk=request.user.pk)
         old_password = request.data.get("old_password")
         new_password = request.data.get("new_password")
 
@@ -113,9 +119,58 @@ class LogoutView(APIView):
             return Response({"error": "Invalid or expired token"}, status=status.HTTP_400_BAD_REQUEST)
 
 
+# ---------------------------
+# ALTA MASIVA (admin)
+# ---------------------------
+class ProvisionUsersView(APIView):
+    """
+    POST /api/students/admin/provision/
+    Body:
+    {
+        "users": [{"email": "...", "username": "...", "password": "...",
+                   "first_name": "...", "last_name": "...", "role": "student"}, ...],
+        "dry_run": false
+    }
+    - dry_run valida email/username únicos en una sola consulta sin crear nada
+      (hasta MAX_DRY_RUN_USERS filas)
+    - Sin dry_run crea a lo sumo MAX_USERS, hasheando en el mismo proceso: cada
+      hash PBKDF2 cuesta CPU del worker web. Las altas grandes van por el
+      comando provision_users, que reparte el hash entre procesos.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+    MAX_USERS = 100
+    MAX_DRY_RUN_USERS = 5000
+
+    def post(self, request):
+        rows = request.data.get("users")
+        dry_run = bool(request.data.get("dry_run"))
+        if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+            return Response({"error": "users must be a non-empty list of objects"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = self.MAX_DRY_RUN_USERS if dry_run else self.MAX_USERS
+        if len(rows) > limit:
+            return Response(
+                {"error": f"At most {limit} users per request, use the provision_users command"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        report = provision_users(rows, dry_run=dry_run, workers=1)
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+
 # ---------------------------
 # PERFIL
 # ---------------------------
+def profile_serializer_class(request, user):
+    if request.user.is_authenticated and request.user.pk == user.pk:
+        return UserFullSerializer
+    return UserPublicSerializer
+
+
+def profile_etag(serializer_class, user, ranking):
+    # ETag a partir de los campos expuestos + ranking, sin serializar
+    fields = [field for field in serializer_class.Meta.fields if hasattr(user, field)]
+    return make_etag("profile", serializer_class.__name__, ranking, *(getattr(user, f) for f in fields))
+
+
 class ProfileView(APIView):
     """
     GET /api/users/profile/<user_id>/
@@ -125,42 +180,44 @@ class ProfileView(APIView):
     - Si el token corresponde al mismo user_id → perfil completo
     - Si no → perfil público
     """
+    # El token es opcional: si es inválido se muestra el perfil público
+    authentication_classes = [OptionalJWTAuthentication]
     permission_classes = [permissions.AllowAny]
+    query_budget = 2
 
     def get(self, request, user_id):
-        logged_id = None
-
-        # Si el usuario mandó token en headers
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-            try:
-                payload = AccessToken(token)
-                logged_id = str(payload["user_id"])
-            except Exception:
-                logged_id = None
-
-        # Buscar usuario o devolver 404
+        # Siempre de la base: el usuario cacheado del JWT no tiene todos los campos del perfil
         user = get_object_or_404(User, id=user_id)
 
-        # Calcular ranking solo si es el propio usuario
-        user_rank = None
-        if logged_id and str(user.id) == logged_id and user.role == "student":
-            user_rank = (
-                User.objects.filter(role="student")
-                .annotate(rank=Window(expression=Rank(), order_by=F("aura").desc()))
-                .filter(id=user.id)
-                .values_list("rank", flat=True)
-                .first()
-            )
-
-        # Serializar usuario
-        if logged_id and str(user.id) == logged_id:
-            serializer = UserFullSerializer(user)
-            data = serializer.data
-            data["ranking"] = user_rank
-        else:
-            serializer = UserPublicSerializer(user)
-            data = serializer.data
-
-        return Response(data, status=status.HTTP_200_OK)
+        # Serializar usuario (el ranking sale del índice de ranking, O(log N))
+        serializer_class = profile_serializer_class(request, user)
+        ranking = student_rank(user)
+        etag = profile_etag(serializer_class, user, ranking)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+        with timing("serialize"):
+            data = serializer_class(user, context={"ranking": ranking}).data
+        return with_validators(Response(data, status=status.HTTP_200_OK), etag)
+
+
+class AsyncProfileView(AsyncAPIView):
+    """Versión async de ProfileView (ASGI): mismo ETag y mismas respuestas."""
+    authentication_class = OptionalJWTAuthentication
+    required_role = None
+    query_budget = 2
+
+    async def get(self, request, user_id):
+        user = await aget_object_or_404(User, id=user_id)
+
+        serializer_class = profile_serializer_class(request, user)
+        ranking = await sync_to_async(student_rank)(user)
+        etag = profile_etag(serializer_class, user, ranking)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+        with timing("serialize"):
+            data = serializer_class(user, context={"ranking": ranking}).data
+        return with_validators(json_response(data), etag)